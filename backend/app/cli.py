@@ -0,0 +1,234 @@
+"""
+Offline cache warm-up. Run from backend/:
+
+    python -m app.cli warm catalog.xlsx            # enrich every part not freshly cached
+    python -m app.cli warm catalog.csv --force     # re-enrich every part in the file
+    python -m app.cli refresh                      # re-enrich stale/outdated cached records
+    python -m app.cli refresh --all                # re-enrich the whole cache
+
+Parts are enriched in parallel (--workers) through the same pipeline as the API and
+written to the cache, search index and fuzzy index. Progress is checkpointed to a JSON
+file every --checkpoint-every parts; running the same command again resumes after the
+last checkpoint, and --restart starts over. The checkpoint is removed once a run
+completes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
+from app.core.config import CACHE_DB_PATH, ENRICH_MAX_WORKERS
+from app.models.battery import EnrichItem
+from app.services import cache, search  # noqa: F401  (search keeps its index current through a cache listener)
+from app.services.dedup import canonical_mpn
+from app.services.enrich import PIPELINE_VERSION, refresh_item
+from app.services.excel_io import iter_input
+from app.core.logging import logger
+
+
+# Parts whose cache state is read in one query
+_LOOKUP_CHUNK = 500
+
+
+def catalog_items(path: Path) -> Iterator[EnrichItem]:
+    """Unique parts of a catalog file (Excel, CSV, Parquet or Feather), in file order."""
+    # The cache holds one record per canonical MPN, so a part listed under several
+    # manufacturers is warmed once, for the first of them
+    seen: Set[str] = set()
+    with open(path, "rb") as f:
+        for row in iter_input(f, path.name):
+            mpn = canonical_mpn(row["mpn"])
+            if mpn not in seen:
+                seen.add(mpn)
+                yield EnrichItem(mpn=mpn, manufacturer=row["manufacturer"])
+
+
+def cached_items() -> Iterator[EnrichItem]:
+    """Every cached part, in storage order."""
+    for mpn, record in cache.iter_records():
+        yield EnrichItem(mpn=mpn, manufacturer=record.get("manufacturer") or "")
+
+
+class Checkpoint:
+    """
+    Progress of one run: `position` is the number of parts, in input order, that are
+    all finished, so a resumed run skips exactly those. Saved atomically.
+    """
+
+    def __init__(self, path: Path, key: str):
+        self.path = path
+        self.key = key
+        self.position = 0
+        self.counts = {"enriched": 0, "skipped": 0, "failed": 0}
+        self.started_at = time.time()
+
+    def load(self) -> bool:
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return False
+        if state.get("key") != self.key:
+            logger.warning(f"Ignoring checkpoint {self.path}: it belongs to a different run")
+            return False
+        self.position = state["position"]
+        self.counts = state["counts"]
+        self.started_at = state["started_at"]
+        return True
+
+    def save(self) -> None:
+        state = {"key": self.key, "position": self.position, "counts": self.counts, "started_at": self.started_at}
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _default_checkpoint(key: str) -> Path:
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return CACHE_DB_PATH.parent / f"warm-{digest}.checkpoint.json"
+
+
+def _needs_enrichment(entry: Optional[cache.CacheEntry], force: bool, since: float) -> bool:
+    if entry is None:
+        return True
+    # On a forced run, anything written since the run first started is already done
+    if force:
+        return entry.created_at < since
+    return not entry.is_fresh(PIPELINE_VERSION)
+
+
+def _chunks(items: Iterable[EnrichItem], size: int) -> Iterator[List[EnrichItem]]:
+    chunk: List[EnrichItem] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _enrich(item: EnrichItem) -> bool:
+    _, warnings = refresh_item(item, source="cli")
+    return not any(warning.startswith("Enrichment error:") for warning in warnings)
+
+
+def run(items: Iterable[EnrichItem], checkpoint: Checkpoint, workers: int, force: bool, checkpoint_every: int) -> Dict[str, int]:
+    """Enrich `items` in parallel from `checkpoint.position` on, saving progress as it goes."""
+    counts = checkpoint.counts
+    # Finished flags by input position, for positions past the checkpoint still being tracked
+    finished: Dict[int, bool] = {}
+    in_flight: Dict[Future, int] = {}
+    last_saved = checkpoint.position
+    last_report = time.monotonic()
+
+    def settle(done: Iterable[Future]) -> None:
+        nonlocal last_saved, last_report
+        for future in done:
+            position = in_flight.pop(future)
+            try:
+                ok = future.result()
+            except Exception as e:
+                logger.error(f"Error warming item {position}: {e}")
+                ok = False
+            counts["enriched" if ok else "failed"] += 1
+            finished[position] = True
+        while finished.pop(checkpoint.position, False):
+            checkpoint.position += 1
+        if checkpoint.position - last_saved >= checkpoint_every:
+            checkpoint.save()
+            last_saved = checkpoint.position
+        if time.monotonic() - last_report >= 10:
+            logger.info(f"Warm-up at {checkpoint.position} part(s): {counts}")
+            last_report = time.monotonic()
+
+    position = -1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warm") as pool:
+        for chunk in _chunks(items, _LOOKUP_CHUNK):
+            # Parts before the checkpoint are read (to keep positions aligned) but not looked up
+            if position + len(chunk) < checkpoint.position:
+                position += len(chunk)
+                continue
+            entries = cache.peek_entries([item.mpn for item in chunk])
+            for item in chunk:
+                position += 1
+                if position < checkpoint.position:
+                    continue
+                if not _needs_enrichment(entries.get(item.mpn), force, checkpoint.started_at):
+                    counts["skipped"] += 1
+                    finished[position] = True
+                    continue
+                in_flight[pool.submit(_enrich, item)] = position
+                # Keep a bounded window in flight so huge catalogs are streamed, not queued
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    settle(done)
+            settle(())
+        while in_flight:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            settle(done)
+    return counts
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm = commands.add_parser("warm", help="enrich the parts of a catalog file into the cache")
+    warm.add_argument("catalog", type=Path, help="Excel, CSV, Parquet or Feather file with an MPN column")
+    warm.add_argument("--force", action="store_true", help="re-enrich parts that are already freshly cached")
+
+    refresh = commands.add_parser("refresh", help="re-enrich records already in the cache")
+    refresh.add_argument("--all", dest="force", action="store_true", help="refresh every record, not only stale ones")
+
+    for command in (warm, refresh):
+        command.add_argument("--workers", type=int, default=ENRICH_MAX_WORKERS)
+        command.add_argument("--checkpoint", type=Path, help="checkpoint file (default: next to the cache database)")
+        command.add_argument("--checkpoint-every", type=int, default=500, help="parts between checkpoint saves")
+        command.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.command == "warm":
+        if not args.catalog.is_file():
+            print(f"No such file: {args.catalog}", file=sys.stderr)
+            return 2
+        key = f"warm:{args.catalog.resolve()}:{args.force}"
+        items: Iterable[EnrichItem] = catalog_items(args.catalog)
+    else:
+        key = f"refresh:{CACHE_DB_PATH.resolve()}:{args.force}"
+        items = cached_items()
+
+    checkpoint = Checkpoint(args.checkpoint or _default_checkpoint(key), key)
+    if not args.restart and checkpoint.load():
+        logger.info(f"Resuming from checkpoint {checkpoint.path} at part {checkpoint.position}")
+
+    started = time.perf_counter()
+    try:
+        counts = run(items, checkpoint, max(args.workers, 1), args.force, max(args.checkpoint_every, 1))
+    except KeyboardInterrupt:
+        checkpoint.save()
+        print(f"Interrupted at part {checkpoint.position}; run the same command again to resume", file=sys.stderr)
+        return 130
+    finally:
+        cache.flush_hits()
+    checkpoint.remove()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{args.command}: {counts['enriched']} enriched, {counts['skipped']} already fresh, "
+        f"{counts['failed']} failed in {elapsed:.1f}s"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
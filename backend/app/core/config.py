@@ -10,3 +10,83 @@ BASE_DIR = Path(__file__).parent.parent.parent.parent
 CACHE_DIR = BASE_DIR / "data" / "cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+
+# Enrichment worker pool: size of the shared thread pool and per-request concurrency cap
+ENRICH_MAX_WORKERS = int(os.getenv("ENRICH_MAX_WORKERS", "8"))
+ENRICH_REQUEST_CONCURRENCY = int(os.getenv("ENRICH_REQUEST_CONCURRENCY", str(ENRICH_MAX_WORKERS)))
+
+# Background enrichment jobs are tracked in a local SQLite database
+DATA_DIR = BASE_DIR / "data"
+JOBS_DB_PATH = Path(os.getenv("JOBS_DB_PATH", str(DATA_DIR / "jobs.db")))
+
+# Enrichment cache: single SQLite file plus a bounded in-process LRU in front of it
+CACHE_DB_PATH = Path(os.getenv("CACHE_DB_PATH", str(CACHE_DIR / "cache.db")))
+CACHE_LRU_SIZE = int(os.getenv("CACHE_LRU_SIZE", "10000"))
+# Hits are counted per record; the most requested CACHE_PRELOAD_COUNT records are
+# loaded into the LRU at startup (0 = off)
+CACHE_PRELOAD_COUNT = int(os.getenv("CACHE_PRELOAD_COUNT", "1000"))
+CACHE_HIT_FLUSH_COUNT = int(os.getenv("CACHE_HIT_FLUSH_COUNT", "1000"))
+
+# Cache freshness: entries older than the TTL (seconds, 0 = never expire) or written by
+# an older pipeline version are stale; with stale-while-revalidate they are served
+# immediately and refreshed in the background
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "0"))
+CACHE_STALE_WHILE_REVALIDATE = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "true").lower() in ("1", "true", "yes")
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "2"))
+
+# Single-flight enrichment: a part missing from the cache is enriched by one caller at a
+# time across all worker processes, under a lease in the cache database; the others wait
+# for its result. Leases expire after LEASE_TTL_SECONDS in case the holder dies
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "60"))
+LEASE_POLL_SECONDS = float(os.getenv("LEASE_POLL_SECONDS", "0.02"))
+
+# Gemini overview generation: records are packed into batched prompts, calls are
+# rate limited (requests per minute) and retried with exponential backoff.
+# GEMINI_FAKE=true swaps in a local fake model for offline tests and benchmarks.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "20"))
+GEMINI_BATCH_WINDOW_MS = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "50"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+GEMINI_RATE_PER_MINUTE = float(os.getenv("GEMINI_RATE_PER_MINUTE", "60"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_FAKE = os.getenv("GEMINI_FAKE", "false").lower() in ("1", "true", "yes")
+GEMINI_FAKE_LATENCY_MS = float(os.getenv("GEMINI_FAKE_LATENCY_MS", "0"))
+
+# Overviews are shared between parts with identical prompt-relevant specs
+OVERVIEW_MEMO_SIZE = int(os.getenv("OVERVIEW_MEMO_SIZE", "5000"))
+
+# Candidate sources: each source gets its own timeout, result cache TTL and circuit breaker
+SOURCE_TIMEOUT_SECONDS = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "2.0"))
+SOURCE_CACHE_TTL_SECONDS = float(os.getenv("SOURCE_CACHE_TTL_SECONDS", "3600"))
+SOURCE_CACHE_SIZE = int(os.getenv("SOURCE_CACHE_SIZE", "10000"))
+SOURCE_BREAKER_FAILURES = int(os.getenv("SOURCE_BREAKER_FAILURES", "5"))
+SOURCE_BREAKER_RESET_SECONDS = float(os.getenv("SOURCE_BREAKER_RESET_SECONDS", "30"))
+
+# Shared outbound HTTP client (created at app startup, used by candidate sources)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "10"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_DNS_TTL_SECONDS = float(os.getenv("HTTP_DNS_TTL_SECONDS", "300"))
+# Optional JSON candidate API queried as an extra source; "{mpn}" is replaced per part
+CANDIDATE_API_URL = os.getenv("CANDIDATE_API_URL", "")
+
+# Fuzzy MPN matching for parts no source knows: near matches scoring at least the
+# minimum similarity are suggested, and suffix variants of a known part inherit its specs
+FUZZY_MIN_SIMILARITY = float(os.getenv("FUZZY_MIN_SIMILARITY", "0.35"))
+FUZZY_MAX_SUGGESTIONS = int(os.getenv("FUZZY_MAX_SUGGESTIONS", "3"))
+FUZZY_INHERIT_SPECS = os.getenv("FUZZY_INHERIT_SPECS", "true").lower() in ("1", "true", "yes")
+
+# Logging and metrics: per-item events are logged at DEBUG for a sampled fraction only
+# (LOG_SAMPLE_RATE, 1 = all); TRACE_REQUESTS gives each request a trace ID and logs
+# per-stage spans at DEBUG. Prometheus metrics are served at /metrics
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() in ("1", "true", "yes")
+
+# Cold start: spreadsheet/columnar libraries and the Gemini SDK are imported on first
+# use; with PREWARM=true they are loaded in the background after startup and /ready
+# answers 503 until that is done
+PREWARM = os.getenv("PREWARM", "true").lower() in ("1", "true", "yes")
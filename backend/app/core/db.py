@@ -0,0 +1,40 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Union
+
+
+def connect(path: Union[str, Path]) -> sqlite3.Connection:
+    """Open a SQLite connection tuned for many short concurrent transactions."""
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+class LocalConnection:
+    """
+    One SQLite connection per thread for a single database file.
+    The schema script runs once, on the first connection.
+    """
+
+    def __init__(self, path: Union[str, Path], schema: str = ""):
+        self.path = Path(path)
+        self.schema = schema
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = connect(self.path)
+            with self._init_lock:
+                if not self._initialized and self.schema:
+                    conn.executescript(self.schema)
+                self._initialized = True
+            self._local.conn = conn
+        return conn
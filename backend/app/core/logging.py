@@ -1,9 +1,19 @@
 import logging
+import random
+from app.core.config import LOG_LEVEL, LOG_SAMPLE_RATE
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
 logger = logging.getLogger(__name__)
 
+
+def sampled(rate: float = LOG_SAMPLE_RATE) -> bool:
+    """
+    Whether to emit one per-item DEBUG line. Per-item events (cache hits, writes,
+    overviews) happen thousands of times per upload, so only a `rate` fraction is
+    logged; the metrics at /metrics count all of them.
+    """
+    return rate > 0 and logger.isEnabledFor(logging.DEBUG) and (rate >= 1 or random.random() < rate)
@@ -0,0 +1,365 @@
+import bisect
+import contextvars
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from app.core.config import TRACE_REQUESTS
+from app.core.logging import logger
+
+
+# Latency buckets in seconds, from in-memory cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(map(labels.__getitem__, self.labelnames))
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+    def labels(self, **labels: str) -> "_Bound":
+        """This metric with its label values fixed, for hot paths that record the same series."""
+        return _Bound(self, self._key(labels))
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every series of the metric."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. cache hits or Gemini fallbacks."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key: Tuple[str, ...], amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. items currently being enriched."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds unless stated otherwise) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)], sum, count
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            state[0][index] += 1
+            state[1][0] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, self._key(labels))
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Context manager observing the block's duration (a plain class: cheaper than @contextmanager)."""
+
+    __slots__ = ("_histogram", "_key", "_started")
+
+    def __init__(self, histogram: Histogram, key: Tuple[str, ...]):
+        self._histogram = histogram
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram._observe(self._key, time.perf_counter() - self._started)
+
+
+class _Bound:
+    """A metric with fixed label values; see _Metric.labels."""
+
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: _Metric, key: Tuple[str, ...]):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, -amount)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._metric, self._key)
+
+
+class Registry:
+    """Named metrics of one process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# Pipeline stage metrics, shared by the services that record them
+
+STAGE_SECONDS = histogram(
+    "battery_stage_duration_seconds",
+    "Time spent in each pipeline stage (cache_lookup, cache_write, fetch_candidates, fuzzy_match, normalize, overview, upload_parse, export)",
+    ["stage"],
+)
+CACHE_LOOKUPS = counter("battery_cache_lookups_total", "Enrichment cache lookups by result (memory, store, miss)", ["result"])
+CACHE_FRESHNESS = counter("battery_cache_served_total", "Cached records served to enrichment, by freshness (fresh, stale)", ["freshness"])
+ENRICH_INFLIGHT = gauge("battery_enrich_inflight", "Items currently being enriched")
+ENRICH_SECONDS = histogram(
+    "battery_enrich_item_duration_seconds", "End-to-end time to enrich one item, by outcome (cached, enriched, error)", ["outcome"]
+)
+GEMINI_SECONDS = histogram("battery_gemini_request_duration_seconds", "Gemini round-trip latency, including retries", ["kind"])
+GEMINI_REQUESTS = counter("battery_gemini_requests_total", "Gemini requests by kind (single, batch) and outcome (ok, error)", ["kind", "outcome"])
+GEMINI_TOKENS = counter(
+    "battery_gemini_tokens_total",
+    "Gemini tokens by direction (prompt, completion); estimated from text length when the response has no usage data",
+    ["direction"],
+)
+GEMINI_FALLBACKS = counter("battery_gemini_fallbacks_total", "Overviews that fell back to the template, by reason", ["reason"])
+UPLOADS = counter("battery_uploads_total", "Uploads by fingerprint result (identical, changed, new)", ["result"])
+ROWS = counter("battery_rows_total", "Rows read from uploads and written to exports", ["stage", "format"])
+HTTP_SECONDS = histogram("battery_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"])
+HTTP_INFLIGHT = gauge("battery_http_inflight_requests", "HTTP requests currently being served")
+
+
+def timed(stage: str):
+    """Context manager recording the block's duration under battery_stage_duration_seconds{stage=...}."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+# Request tracing: with TRACE_REQUESTS on, every request gets a trace ID (taken from an
+# incoming X-Trace-Id header or generated) and each span() inside it logs its duration
+# at DEBUG with its own span ID and its parent's, so one request's stages can be followed
+
+_trace: contextvars.ContextVar[Optional[Tuple[str, Optional[str]]]] = contextvars.ContextVar("trace", default=None)
+
+
+def _new_id(length: int = 8) -> str:
+    return secrets.token_hex(length)
+
+
+def current_trace_id() -> Optional[str]:
+    context = _trace.get()
+    return context[0] if context else None
+
+
+@contextmanager
+def start_trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    """Run the block as one trace; spans inside it (including in copied contexts) share its ID."""
+    trace_id = trace_id or _new_id(16)
+    token = _trace.set((trace_id, None))
+    try:
+        yield trace_id
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage of the current trace. A no-op outside a trace."""
+    context = _trace.get()
+    if context is None:
+        yield
+        return
+    trace_id, parent_id = context
+    span_id = _new_id()
+    token = _trace.set((trace_id, span_id))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+        logger.debug(
+            f"span trace={trace_id} span={span_id} parent={parent_id or '-'} name={name} "
+            f"duration_ms={(time.perf_counter() - started) * 1000:.2f}"
+        )
+
+
+def stage(name: str):
+    """Record a pipeline stage in the stage histogram and, when tracing, as a span."""
+    if _trace.get() is None:
+        return timed(name)
+    return _traced_stage(name)
+
+
+@contextmanager
+def _traced_stage(name: str) -> Iterator[None]:
+    with timed(name), span(name):
+        yield
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests. With
+    TRACE_REQUESTS it also opens a trace per request and returns its ID in X-Trace-Id.
+    """
+
+    def __init__(self, app, trace: bool = TRACE_REQUESTS):
+        self.app = app
+        self.trace = trace
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        trace_id = None
+        if self.trace:
+            incoming = dict(scope.get("headers") or ()).get(b"x-trace-id", b"").decode("latin-1").strip()
+            trace_id = incoming[:64] or _new_id(16)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trace_id:
+                    message = dict(message, headers=list(message.get("headers", [])) + [(b"x-trace-id", trace_id.encode("latin-1"))])
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_INFLIGHT.inc()
+        try:
+            if trace_id:
+                with start_trace(trace_id), span(f"{scope['method']} {scope['path']}"):
+                    await self.app(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT.dec()
+            # The matched route template keeps label cardinality bounded (/jobs/{job_id}, not every ID)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=path, status=str(status["code"]))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format."""
+    return REGISTRY.render()
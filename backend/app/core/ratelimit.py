@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+from typing import Callable, Tuple, Type, TypeVar
+from app.core.logging import logger
+
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available, then take them."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_with_backoff(
+    fn: Callable[[], T],
+    retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+) -> T:
+    """Call `fn`, retrying failures with exponential backoff and full jitter."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            logger.warning(f"Attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
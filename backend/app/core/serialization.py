@@ -0,0 +1,24 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib produces the same JSON, just slower
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
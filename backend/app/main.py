@@ -1,10 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.web.routes import router
+from app.core.config import CACHE_PRELOAD_COUNT, CANDIDATE_API_URL, PREWARM
+from app.core.metrics import MetricsMiddleware
+from app.services import cache, jobs, prewarm, sources
+from app.services.executor import shutdown_executor
 from app.core.logging import logger
 
-app = FastAPI(title="Partly Battery MVP", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One outbound HTTP pool for the app's lifetime, shared by all HTTP sources
+    await sources.start_http_client()
+    if CANDIDATE_API_URL:
+        sources.register_source(sources.JsonApiSource("candidate-api", CANDIDATE_API_URL))
+
+    # Start with the most requested records already in memory
+    await asyncio.to_thread(cache.preload, CACHE_PRELOAD_COUNT)
+
+    # Pick up enrichment jobs interrupted by a previous restart
+    resumed = jobs.resume_jobs()
+    if resumed:
+        logger.info(f"Resumed {resumed} enrichment job(s)")
+
+    # Serve right away; /ready turns 200 once the lazily imported libraries are loaded
+    warmup: Optional[asyncio.Task] = None
+    if PREWARM:
+        warmup = asyncio.create_task(asyncio.to_thread(prewarm.run))
+    else:
+        prewarm.mark_ready()
+    yield
+    if warmup is not None:
+        # Cancelling would not stop the import thread, only stop waiting for it; let it
+        # finish so shutdown does not tear down what it is still setting up
+        await warmup
+    prewarm.mark_not_ready()
+    await jobs.cancel_running_jobs()
+    shutdown_executor()
+    await sources.stop_http_client()
+    cache.flush_hits()
+
+
+app = FastAPI(title="Partly Battery MVP", version="1.0.0", lifespan=lifespan)
 
 # CORS: allow the Lovable/Vercel frontend (and local dev) to call this API from the browser.
 # For MVP/demo we allow all origins. Later, restrict this to your frontend domain(s).
@@ -15,6 +57,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency histograms for /metrics, plus request trace IDs with TRACE_REQUESTS=true
+app.add_middleware(MetricsMiddleware)
 
 # Optional friendly root route so visiting / doesn't show 404
 @app.get("/")
@@ -1,4 +1,16 @@
-from .battery import BatteryRecord, EnrichItem, EnrichRequest, EnrichResponse, ExportRequest
-
-__all__ = ["BatteryRecord", "EnrichItem", "EnrichRequest", "EnrichResponse", "ExportRequest"]
+from .battery import BatteryRecord, CachedExportRequest, EnrichItem, EnrichRequest, EnrichResponse, ExportRequest, SearchResponse
+from .job import JobResultItem, JobResultsPage, JobStatus, JobSubmitResponse
 
+__all__ = [
+    "BatteryRecord",
+    "CachedExportRequest",
+    "EnrichItem",
+    "EnrichRequest",
+    "EnrichResponse",
+    "ExportRequest",
+    "JobResultItem",
+    "JobResultsPage",
+    "JobStatus",
+    "JobSubmitResponse",
+    "SearchResponse",
+]
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -10,13 +10,19 @@ class BatteryRecord(BaseModel):
     chemistry: Optional[str] = None
     voltage_v: Optional[float] = None
     capacity: Optional[str] = None
+    capacity_mah: Optional[float] = None
     wh: Optional[float] = None
     form_factor: Optional[str] = None
     dimensions: Optional[str] = None
+    diameter_mm: Optional[float] = None
+    length_mm: Optional[float] = None
     termination: Optional[str] = None
     rechargeable: Optional[bool] = None
     operating_temp: Optional[str] = None
+    temp_min_c: Optional[float] = None
+    temp_max_c: Optional[float] = None
     weight: Optional[str] = None
+    weight_g: Optional[float] = None
     datasheet_url: Optional[str] = None
     source_urls: List[str] = []
     warnings: List[str] = []
@@ -37,11 +43,32 @@ class EnrichResult(BaseModel):
     error: Optional[str] = None
 
 
+class EnrichStats(BaseModel):
+    total_items: int
+    unique_items: int  # distinct canonical (MPN, manufacturer) keys actually enriched
+    dedup_ratio: float  # fraction of rows served from another row's enrichment
+    reused_items: int = 0  # distinct keys answered from an earlier version of the same upload
+
+
 class EnrichResponse(BaseModel):
     results: List[EnrichResult]
+    stats: Optional[EnrichStats] = None
+
+
+class SearchResponse(BaseModel):
+    total: int  # matches across all pages
+    results: List[BatteryRecord]
+    facets: Dict[str, Dict[str, int]]  # counts per facet value over all matches
+    took_ms: float
 
 
 class ExportRequest(BaseModel):
     records: List[BatteryRecord]
-    format: str  # "xlsx" | "csv"
+    format: str  # "xlsx" | "csv" | "parquet" | "feather"
+
 
+class CachedExportRequest(BaseModel):
+    """Export records already held server-side, by MPN list or enrichment job id."""
+    mpns: Optional[List[str]] = None
+    job_id: Optional[str] = None
+    format: str  # "xlsx" | "csv" | "parquet" | "feather"
@@ -0,0 +1,35 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from app.models.battery import EnrichResult
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str  # "queued" | "running" | "completed"
+    total: int
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    pending: int
+    source: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class JobResultItem(BaseModel):
+    seq: int  # completion order, 1-based
+    index: int  # position in the submitted items
+    result: EnrichResult
+
+
+class JobResultsPage(BaseModel):
+    job_id: str
+    status: str
+    results: List[JobResultItem]
+    next_after: int
+    done: bool
@@ -0,0 +1,68 @@
+"""
+Production server: several uvicorn worker processes behind one socket. Run from backend/:
+
+    python -m app.serve                     # WEB_CONCURRENCY workers on HOST:PORT
+    python -m app.serve --workers 4 --port 8080
+
+Workers share the SQLite cache, job store and leases, so a part missing from the
+cache is enriched once across all of them (see SINGLE_FLIGHT). Per-process limits
+that talk to external services are split between workers: GEMINI_RATE_PER_MINUTE is
+the total for the server, not per worker. /metrics reports the worker that answers.
+"""
+import argparse
+import os
+import sys
+from typing import Optional, Sequence
+
+
+def _default_workers() -> int:
+    # Enrichment is I/O bound and runs on a thread pool per worker; one process per
+    # core is enough to keep request parsing and serialization off a single GIL
+    return int(os.getenv("WEB_CONCURRENCY", str(min(os.cpu_count() or 1, 8))))
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=_default_workers())
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE_SECONDS", "30")), help="idle keep-alive timeout")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("BACKLOG", "2048")))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    # Loads .env, so that settings kept there count here as they do in the workers
+    from app.core.config import GEMINI_RATE_PER_MINUTE
+
+    args = _parse_args(argv)
+    workers = max(args.workers, 1)
+
+    # Settings are read when each worker imports the app, so split shared budgets here.
+    # load_dotenv does not override variables already set, so workers see the split rate
+    os.environ["GEMINI_RATE_PER_MINUTE"] = str(GEMINI_RATE_PER_MINUTE / workers)
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        # uvloop and httptools come with uvicorn[standard] and are picked automatically
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        log_level=args.log_level,
+        # Behind a load balancer or PaaS router, trust its X-Forwarded-* headers
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "*"),
+        access_log=os.getenv("ACCESS_LOG", "false").lower() in ("1", "true", "yes"),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,495 @@
 import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Dict, Any
-from app.core.config import CACHE_DIR
-from app.core.logging import logger
+from typing import Optional, Callable, Dict, Any, Iterable, Iterator, List, Mapping, Sequence, Tuple
+from app.core.config import CACHE_DIR, CACHE_DB_PATH, CACHE_HIT_FLUSH_COUNT, CACHE_LRU_SIZE, CACHE_TTL_SECONDS
+from app.core.db import LocalConnection
+from app.core.metrics import CACHE_LOOKUPS, STAGE_SECONDS, timed
+from app.core.serialization import dumps_str, loads
+from app.services.dedup import canonical_mpn
+from app.core.logging import logger, sampled
 
 
-def get_cached(mpn: str) -> Optional[Dict[str, Any]]:
-    """Get cached battery record for MPN."""
-    cache_file = CACHE_DIR / f"{mpn}.json"
-    if cache_file.exists():
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    mpn TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    created_at REAL,
+    version TEXT,
+    source TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_hit_at REAL
+);
+CREATE TABLE IF NOT EXISTS overviews (
+    spec_key TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Metadata columns added after the first release of the SQLite store
+_METADATA_COLUMNS = {
+    "created_at": "REAL",
+    "version": "TEXT",
+    "source": "TEXT",
+    "hits": "INTEGER NOT NULL DEFAULT 0",
+    "last_hit_at": "REAL",
+}
+
+# SQLite caps the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+
+@dataclass
+class CacheEntry:
+    """A cached record plus the metadata needed to judge its freshness."""
+
+    data: Dict[str, Any]
+    created_at: float
+    version: Optional[str] = None
+    source: Optional[str] = None
+    # Model built from `data` by the first reader that needs one, reused while the entry stays in memory
+    record: Any = field(default=None, repr=False, compare=False)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def is_expired(self, ttl: float = CACHE_TTL_SECONDS) -> bool:
+        return ttl > 0 and self.age > ttl
+
+    def is_fresh(self, version: Optional[str] = None, ttl: float = CACHE_TTL_SECONDS) -> bool:
+        """Fresh means within the TTL and, when a version is given, written by that version."""
+        if self.is_expired(ttl):
+            return False
+        return version is None or self.version == version
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_db = LocalConnection(CACHE_DB_PATH, SCHEMA)
+_memory = LRUCache(CACHE_LRU_SIZE)
+_lookups = {result: CACHE_LOOKUPS.labels(result=result) for result in ("memory", "store", "miss")}
+_lookup_seconds = STAGE_SECONDS.labels(stage="cache_lookup")
+_migration_lock = threading.Lock()
+_migrated = False
+
+# Hit counts are buffered in memory and added to the store in one write every
+# CACHE_HIT_FLUSH_COUNT hits (and on shutdown), so lookups stay read-only
+_hits: Dict[str, int] = {}
+_hits_pending = 0
+_hits_lock = threading.Lock()
+
+# Called after each committed write as fn(upserted {mpn: record}, removed [mpn]), e.g. to keep indexes current
+WriteListener = Callable[[Mapping[str, Dict[str, Any]], Sequence[str]], None]
+_listeners: List[WriteListener] = []
+
+
+def add_write_listener(listener: WriteListener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify_listeners(upserted: Mapping[str, Dict[str, Any]], removed: Sequence[str] = ()) -> None:
+    for listener in list(_listeners):
         try:
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                logger.info(f"Cache hit for {mpn}")
-                return data
+            listener(upserted, removed)
         except Exception as e:
-            logger.warning(f"Error reading cache for {mpn}: {e}")
-    return None
+            logger.warning(f"Cache write listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+
+def _conn():
+    global _migrated
+    if not _migrated:
+        with _migration_lock:
+            if not _migrated:
+                # Only marked done once every step succeeded, so a failed step is retried on the next access
+                _upgrade_schema(_db.get())
+                migrate_json_cache()
+                migrate_canonical_keys()
+                _migrated = True
+    return _db.get()
+
+
+def _upgrade_schema(conn) -> None:
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(records)")}
+    for column, column_type in _METADATA_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {column} {column_type}")
+    # Rows from before the metadata columns count as created when last written
+    conn.execute("UPDATE records SET created_at = updated_at WHERE created_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS records_hits ON records (hits)")
+
+
+def _entry_from_row(row) -> CacheEntry:
+    return CacheEntry(
+        data=loads(row["data"]),
+        created_at=row["created_at"] or row["updated_at"],
+        version=row["version"],
+        source=row["source"],
+    )
 
 
-def save_cached(mpn: str, record_dict: Dict[str, Any]) -> None:
-    """Save battery record to cache."""
-    cache_file = CACHE_DIR / f"{mpn}.json"
+def get_entry(mpn: str) -> Optional[CacheEntry]:
+    """Get the cached entry for MPN with its metadata, whether fresh or not."""
+    with _lookup_seconds.time():
+        entry = _memory.get(mpn)
+        result = "memory"
+        if entry is None:
+            try:
+                row = _conn().execute("SELECT * FROM records WHERE mpn = ?", (mpn,)).fetchone()
+            except Exception as e:
+                logger.warning(f"Error reading cache for {mpn}: {e}")
+                return None
+            if row is None:
+                _lookups["miss"].inc()
+                return None
+            entry = _entry_from_row(row)
+            _memory.put(mpn, entry)
+            result = "store"
+    _lookups[result].inc()
+    _record_hit(mpn)
+    if sampled():
+        logger.debug(f"Cache hit for {mpn} ({result})")
+    return entry
+
+
+def _record_hit(mpn: str) -> None:
+    global _hits_pending
+    with _hits_lock:
+        _hits[mpn] = _hits.get(mpn, 0) + 1
+        _hits_pending += 1
+        due = _hits_pending >= CACHE_HIT_FLUSH_COUNT
+    if due:
+        flush_hits()
+
+
+def flush_hits() -> int:
+    """Add the buffered hit counts to the store. Returns how many records were updated."""
+    global _hits, _hits_pending
+    with _hits_lock:
+        hits, _hits, _hits_pending = _hits, {}, 0
+    if not hits:
+        return 0
+    now = time.time()
     try:
-        with open(cache_file, "w") as f:
-            json.dump(record_dict, f, indent=2)
-        logger.info(f"Cached {mpn}")
+        conn = _conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE records SET hits = hits + ?, last_hit_at = ? WHERE mpn = ?",
+                [(count, now, mpn) for mpn, count in hits.items()],
+            )
     except Exception as e:
-        logger.warning(f"Error saving cache for {mpn}: {e}")
+        logger.warning(f"Error saving cache hit counts: {e}")
+        return 0
+    return len(hits)
+
+
+def preload(limit: int) -> int:
+    """
+    Load the `limit` most requested records (by recorded hits, then most recently
+    written) into the in-memory LRU, so a fresh process starts warm. Returns how many.
+    """
+    limit = min(limit, _memory.maxsize)
+    if limit <= 0:
+        return 0
+    started = time.perf_counter()
+    rows = _conn().execute(
+        "SELECT mpn, data, created_at, updated_at, version, source FROM records ORDER BY hits DESC, updated_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    # Least requested first, so the hottest records end up most recently used
+    for row in reversed(rows):
+        _memory.put(row["mpn"], _entry_from_row(row))
+    logger.info(f"Preloaded {len(rows)} cached record(s) in {time.perf_counter() - started:.2f}s")
+    return len(rows)
+
+
+def reload_entry(mpn: str) -> Optional[CacheEntry]:
+    """
+    Re-read an entry from the store into memory, e.g. after another worker process
+    may have rewritten it. Not counted as a hit.
+    """
+    entry = peek_entries([mpn]).get(mpn)
+    if entry is not None:
+        _memory.put(mpn, entry)
+    return entry
+
+
+def get_cached(mpn: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get cached battery record for MPN, or None if missing, expired or from another version."""
+    entry = get_entry(mpn)
+    if entry is None or not entry.is_fresh(version):
+        return None
+    return dict(entry.data)
+
+
+def get_many(mpns: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get cached records for several MPNs at once, regardless of freshness.
+    Missing MPNs are left out of the result.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for mpn in dict.fromkeys(mpns):
+        entry = _memory.get(mpn)
+        if entry is None:
+            missing.append(mpn)
+        else:
+            found[mpn] = dict(entry.data)
+
+    try:
+        conn = _conn()
+        for start in range(0, len(missing), _BATCH_SIZE):
+            chunk = missing[start:start + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT * FROM records WHERE mpn IN ({placeholders})", chunk)
+            for row in rows:
+                entry = _entry_from_row(row)
+                _memory.put(row["mpn"], entry)
+                found[row["mpn"]] = dict(entry.data)
+    except Exception as e:
+        logger.warning(f"Error reading cache batch: {e}")
+    return found
+
+
+def peek_entries(mpns: Sequence[str]) -> Dict[str, CacheEntry]:
+    """
+    Cached entries for several MPNs, for maintenance tasks: neither counted as hits nor
+    promoted into the in-memory LRU. Missing MPNs are left out of the result.
+    """
+    found: Dict[str, CacheEntry] = {}
+    conn = _conn()
+    for start in range(0, len(mpns), _BATCH_SIZE):
+        chunk = mpns[start:start + _BATCH_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT * FROM records WHERE mpn IN ({placeholders})", chunk):
+            found[row["mpn"]] = _entry_from_row(row)
+    return found
+
+
+def iter_many(mpns: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Yield (mpn, record or None) for each MPN in order, reading the store a batch at a time."""
+    batch: List[str] = []
+    for mpn in mpns:
+        batch.append(mpn)
+        if len(batch) >= _BATCH_SIZE:
+            found = get_many(batch)
+            yield from ((key, found.get(key)) for key in batch)
+            batch = []
+    found = get_many(batch)
+    yield from ((key, found.get(key)) for key in batch)
+
+
+def iter_records(batch_size: int = _BATCH_SIZE) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (mpn, record) for every cached record, reading a batch at a time."""
+    conn = _conn()
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, mpn, data FROM records WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row["mpn"], loads(row["data"])
+        last_rowid = rows[-1]["rowid"]
+
+
+def save_cached(mpn: str, record_dict: Dict[str, Any], version: Optional[str] = None, source: Optional[str] = None) -> None:
+    """Save battery record to cache, tagged with the pipeline version and source that produced it."""
+    put_many({mpn: record_dict}, version=version, source=source)
+    if sampled():
+        logger.debug(f"Cached {mpn}")
+
+
+def put_many(records: Mapping[str, Dict[str, Any]], version: Optional[str] = None, source: Optional[str] = None) -> None:
+    """Upsert several records in one transaction."""
+    if not records:
+        return
+    now = time.time()
+    rows = [(mpn, dumps_str(record_dict), now, now, version, source) for mpn, record_dict in records.items()]
+    try:
+        conn = _conn()
+        with timed("cache_write"), conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO records (mpn, data, updated_at, created_at, version, source) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(mpn) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+                "created_at = excluded.created_at, version = excluded.version, source = excluded.source",
+                rows,
+            )
+    except Exception as e:
+        logger.warning(f"Error saving cache for {len(rows)} record(s): {e}")
+        return
+    for mpn, record_dict in records.items():
+        _memory.put(mpn, CacheEntry(data=dict(record_dict), created_at=now, version=version, source=source))
+    _notify_listeners(records)
+
+
+def invalidate(mpns: Iterable[str]) -> int:
+    """Drop specific records from the cache. Returns how many were removed."""
+    mpns = list(dict.fromkeys(mpns))
+    removed = 0
+    conn = _conn()
+    for start in range(0, len(mpns), _BATCH_SIZE):
+        chunk = mpns[start:start + _BATCH_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        with conn:
+            removed += conn.execute(f"DELETE FROM records WHERE mpn IN ({placeholders})", chunk).rowcount
+    for mpn in mpns:
+        _memory.pop(mpn)
+    _notify_listeners({}, mpns)
+    return removed
+
+
+def purge_outdated(version: str) -> int:
+    """Delete only the records written by a pipeline version other than `version`."""
+    with _conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        mpns = [row["mpn"] for row in conn.execute("SELECT mpn FROM records WHERE version IS NOT ?", (version,))]
+        removed = conn.execute("DELETE FROM records WHERE version IS NOT ?", (version,)).rowcount
+    _memory.clear()
+    _notify_listeners({}, mpns)
+    logger.info(f"Purged {removed} cached record(s) not at version {version}")
+    return removed
+
+
+def get_overview(spec_key: str) -> Optional[str]:
+    """Get a shared overview template by spec hash (see overview_cache)."""
+    try:
+        row = _conn().execute("SELECT template FROM overviews WHERE spec_key = ?", (spec_key,)).fetchone()
+    except Exception as e:
+        logger.warning(f"Error reading overview cache: {e}")
+        return None
+    return row["template"] if row else None
+
+
+def save_overview(spec_key: str, template: str) -> None:
+    """Save a shared overview template by spec hash."""
+    try:
+        _conn().execute(
+            "INSERT OR REPLACE INTO overviews (spec_key, template, created_at) VALUES (?, ?, ?)",
+            (spec_key, template, time.time()),
+        )
+    except Exception as e:
+        logger.warning(f"Error saving overview cache: {e}")
+
+
+def migrate_json_cache(directory: Path = CACHE_DIR) -> int:
+    """
+    One-shot import of the legacy `<mpn>.json` files into the SQLite store.
+    Runs automatically on first cache access; files are left in place.
+    """
+    conn = _db.get()
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return 0
+
+    count = 0
+    batch: Dict[str, tuple] = {}
+    for path in Path(directory).glob("*.json"):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable cache file {path.name}: {e}")
+            continue
+        batch[path.stem] = (data, path.stat().st_mtime)
+        if len(batch) >= _BATCH_SIZE:
+            count += _insert_missing(conn, batch)
+            batch = {}
+    count += _insert_missing(conn, batch)
+
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),))
+    if count:
+        logger.info(f"Migrated {count} JSON cache file(s) from {directory}")
+    return count
+
+
+def migrate_canonical_keys() -> int:
+    """
+    One-shot re-key of records stored under a non-canonical MPN (from before records
+    were keyed by canonical_mpn, or imported from JSON files). A variant is dropped
+    when the canonical key already has a record.
+    """
+    conn = _db.get()
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'canonical_keys_migrated'").fetchone():
+        return 0
+
+    moved: Dict[str, Dict[str, Any]] = {}
+    removed: List[str] = []
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        variants = [row["mpn"] for row in conn.execute("SELECT mpn FROM records") if canonical_mpn(row["mpn"]) != row["mpn"]]
+        for mpn in variants:
+            key = canonical_mpn(mpn)
+            if conn.execute("UPDATE OR IGNORE records SET mpn = ? WHERE mpn = ?", (key, mpn)).rowcount:
+                moved[key] = loads(conn.execute("SELECT data FROM records WHERE mpn = ?", (key,)).fetchone()["data"])
+            else:
+                conn.execute("DELETE FROM records WHERE mpn = ?", (mpn,))
+            removed.append(mpn)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('canonical_keys_migrated', ?)", (str(time.time()),))
+    if removed:
+        _notify_listeners(moved, removed)
+        logger.info(f"Re-keyed {len(moved)} cached record(s) by canonical MPN, dropped {len(removed) - len(moved)} duplicate(s)")
+    return len(moved)
+
 
+def _insert_missing(conn, batch: Mapping[str, tuple]) -> int:
+    # Never overwrite records already written to the new store. Legacy files carry
+    # no version, so they count as outdated and get refreshed on next use
+    if not batch:
+        return 0
+    now = time.time()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO records (mpn, data, updated_at, created_at, version, source) "
+            "VALUES (?, ?, ?, ?, NULL, 'json-migration')",
+            [(mpn, dumps_str(data), now, mtime) for mpn, (data, mtime) in batch.items()],
+        )
+        return conn.total_changes - before
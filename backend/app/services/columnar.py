@@ -0,0 +1,151 @@
+import io
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.models.battery import BatteryRecord
+
+
+# Parquet and Arrow IPC (Feather v2) support through the optional pyarrow package.
+# Input keeps only the MPN/manufacturer columns; output keeps the export column order
+# with typed numeric and boolean columns and nulls for missing values
+
+FORMATS = ("parquet", "feather")
+EXTENSIONS = {".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather", ".ipc": "feather"}
+CONTENT_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+
+# Records converted to Arrow per record batch (and Parquet row group)
+BATCH_ROWS = 65536
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError("Parquet and Feather files need the pyarrow package (pip install pyarrow)") from None
+    return pyarrow
+
+
+def format_for(filename: str) -> Optional[str]:
+    """"parquet" or "feather" for a columnar file name, else None."""
+    name = filename.lower()
+    return next((kind for extension, kind in EXTENSIONS.items() if name.endswith(extension)), None)
+
+
+def _source(fileobj: BinaryIO):
+    pa = _pyarrow()
+    # In-memory uploads are read in place rather than copied into Arrow buffers
+    if isinstance(fileobj, io.BytesIO):
+        return pa.BufferReader(pa.py_buffer(fileobj.getbuffer()))
+    return pa.PythonFile(fileobj, mode="r")
+
+
+def _open_ipc(fileobj: BinaryIO, source, options=None):
+    pa = _pyarrow()
+    try:
+        return pa.ipc.open_file(source, options=options)
+    except pa.ArrowInvalid:
+        # Arrow IPC stream format (no footer) rather than the file format
+        fileobj.seek(0)
+        return pa.ipc.open_stream(_source(fileobj), options=options)
+
+
+def iter_column_batches(
+    fileobj: BinaryIO, kind: str, find_columns: Callable[[Sequence[str]], Tuple[int, Optional[int]]]
+) -> Iterator[Tuple[List[Any], List[Any]]]:
+    """
+    Yield (mpn values, manufacturer values) per record batch of a Parquet or Feather file.
+    Only the two columns are read (an Arrow IPC stream has no index to skip through, so
+    it is read through but only the two columns are decoded); `find_columns` picks
+    them from the column names.
+    """
+    pa = _pyarrow()
+    source = _source(fileobj)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(source)
+        names = parquet.schema_arrow.names
+        mpn_col, mfr_col = find_columns(names)
+        used = [names[mpn_col]] + ([names[mfr_col]] if mfr_col is not None else [])
+        batches = parquet.iter_batches(batch_size=BATCH_ROWS, columns=used)
+    else:
+        names = _open_ipc(fileobj, source).schema.names
+        mpn_col, mfr_col = find_columns(names)
+        used = [names[mpn_col]] + ([names[mfr_col]] if mfr_col is not None else [])
+        # Reopened now that the columns are known, so the others are not loaded
+        included = pa.ipc.IpcReadOptions(included_fields=[names.index(name) for name in used])
+        fileobj.seek(0)
+        reader = _open_ipc(fileobj, _source(fileobj), included)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+
+    for batch in batches:
+        mpns = batch.column(used[0]).to_pylist()
+        manufacturers = batch.column(used[1]).to_pylist() if len(used) > 1 else [None] * batch.num_rows
+        yield mpns, manufacturers
+
+
+# Export columns that are not text, with their Arrow type and typed value. The others
+# are record_to_row's text, with empty strings written as nulls
+_TYPED_COLUMNS: Dict[str, Tuple[str, Callable[[BatteryRecord], Any]]] = {
+    "Voltage (V)": ("float64", lambda record: record.voltage_v),
+    "Wh": ("float64", lambda record: record.wh),
+    "Rechargeable": ("bool_", lambda record: record.rechargeable),
+}
+
+
+def export_schema():
+    """Arrow schema of the export, in EXPORT_COLUMNS order."""
+    from app.services.export_jameco import EXPORT_COLUMNS
+
+    pa = _pyarrow()
+    return pa.schema([(name, getattr(pa, _TYPED_COLUMNS.get(name, ("string",))[0])()) for name in EXPORT_COLUMNS])
+
+
+def _record_batches(records: Iterable[BatteryRecord], schema) -> Iterator[Any]:
+    from app.services.export_jameco import record_to_row
+
+    pa = _pyarrow()
+    chunk: List[BatteryRecord] = []
+
+    def to_batch() -> Any:
+        rows = [record_to_row(record) for record in chunk]
+        arrays = []
+        for i, field in enumerate(schema):
+            typed = _TYPED_COLUMNS.get(field.name)
+            if typed is not None:
+                values = [typed[1](record) for record in chunk]
+            else:
+                values = [row[i] if row[i] != "" else None for row in rows]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= BATCH_ROWS:
+            yield to_batch()
+            chunk = []
+    if chunk:
+        yield to_batch()
+
+
+def write_export(records: Iterable[BatteryRecord], kind: str, output: BinaryIO) -> int:
+    """Write records as Parquet or Feather to a binary file object. Returns the row count."""
+    pa = _pyarrow()
+    schema = export_schema()
+    sink = pa.PythonFile(output, mode="w")
+    count = 0
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    with writer:
+        for batch in _record_batches(records, schema):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
@@ -0,0 +1,50 @@
+from typing import Dict, List, Sequence, Tuple, TypeVar
+from app.models.battery import EnrichItem
+
+
+T = TypeVar("T")
+
+
+def canonical_mpn(mpn: str) -> str:
+    """Canonical form of an MPN: surrounding whitespace stripped, inner runs collapsed, upper case."""
+    return " ".join(mpn.split()).upper()
+
+
+def canonical_manufacturer(manufacturer: str) -> str:
+    return " ".join(manufacturer.split()).casefold() if manufacturer else ""
+
+
+def canonical_key(item: EnrichItem) -> Tuple[str, str]:
+    return canonical_mpn(item.mpn), canonical_manufacturer(item.manufacturer)
+
+
+class DedupPlan:
+    """
+    Groups input rows by canonical (MPN, manufacturer) key.
+    `unique_items` holds the first row of each group; `fan_out` maps one result per
+    unique item back onto every original row, in input order.
+    """
+
+    def __init__(self, items: Sequence[EnrichItem]):
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, item in enumerate(items):
+            groups.setdefault(canonical_key(item), []).append(i)
+        self.total = len(items)
+        self.groups: List[List[int]] = list(groups.values())
+        self.unique_items: List[EnrichItem] = [items[rows[0]] for rows in self.groups]
+
+    @property
+    def unique(self) -> int:
+        return len(self.groups)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of rows answered by another row's enrichment."""
+        return (self.total - self.unique) / self.total if self.total else 0.0
+
+    def fan_out(self, unique_results: Sequence[T]) -> List[T]:
+        results: List[T] = [None] * self.total  # type: ignore[list-item]
+        for rows, result in zip(self.groups, unique_results):
+            for i in rows:
+                results[i] = result
+        return results
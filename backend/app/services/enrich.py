@@ -1,72 +1,46 @@
-from typing import Dict, Any, Tuple, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List, Set
+from app.core.config import CACHE_REFRESH_WORKERS, CACHE_STALE_WHILE_REVALIDATE, FUZZY_INHERIT_SPECS, SINGLE_FLIGHT
+from app.core.metrics import CACHE_FRESHNESS, ENRICH_INFLIGHT, ENRICH_SECONDS, stage
 from app.models.battery import BatteryRecord, EnrichItem
-from app.services.cache import get_cached, save_cached
-from app.services.normalize import normalize_candidates
-from app.services.gemini_client import generate_overview
+from app.services.cache import CacheEntry, get_entry, reload_entry, save_cached
+from app.services import fuzzy, leases
+from app.services.dedup import canonical_mpn
+from app.services.normalize import NORMALIZE_VERSION, normalize_candidates
+from app.services.sources import fetch_candidates_blocking
+from app.services.gemini_client import OVERVIEW_VERSION, generate_overview
 from app.core.logging import logger
 
 
+# Cached records written by any other pipeline version are treated as stale
+PIPELINE_VERSION = f"normalize-{NORMALIZE_VERSION}.overview-{OVERVIEW_VERSION}"
+
+# Bound once: these are recorded for every item
+_served_fresh = CACHE_FRESHNESS.labels(freshness="fresh")
+_served_stale = CACHE_FRESHNESS.labels(freshness="stale")
+_item_seconds = {outcome: ENRICH_SECONDS.labels(outcome=outcome) for outcome in ("cached", "enriched", "error")}
+
+# What a suffix variant takes over from the part it matched: the physical specs only,
+# never the other part's manufacturer, title, datasheet or source links
+_INHERITED_FIELDS = (
+    "chemistry", "voltage_v", "capacity", "wh", "form_factor", "dimensions",
+    "termination", "rechargeable", "operating_temp", "weight",
+)
+
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+_refreshing: Set[str] = set()
+_refreshing_lock = threading.Lock()
+
+
 def fetch_candidates(mpn: str, manufacturer: str = "") -> Dict[str, Any]:
     """
-    Stub implementation that returns deterministic candidate fields for sample MPNs.
-    This architecture allows easy swapping with real search/scraping later.
+    Fetch and merge candidate fields from every configured source (see sources.py).
+    The default configuration holds only the deterministic stub source.
     """
-    mpn_upper = mpn.upper()
-    
-    # Sample deterministic data for demo
-    stub_data = {
-        "CR2032": {
-            "title": "CR2032 3V Lithium Coin Cell Battery",
-            "chemistry": "Lithium",
-            "voltage_v": 3.0,
-            "capacity": "220mAh",
-            "form_factor": "Coin Cell",
-            "dimensions": "20mm x 3.2mm",
-            "rechargeable": False,
-            "operating_temp": "-30°C to +60°C",
-            "weight": "3.1g",
-            "source_urls": ["https://example.com/cr2032"],
-        },
-        "18650": {
-            "title": "18650 Lithium Ion Battery",
-            "chemistry": "Lithium-Ion",
-            "voltage_v": 3.7,
-            "capacity": "2600mAh",
-            "wh": 9.62,
-            "form_factor": "Cylindrical",
-            "dimensions": "18mm x 65mm",
-            "termination": "Button Top",
-            "rechargeable": True,
-            "operating_temp": "0°C to +45°C",
-            "weight": "45g",
-            "source_urls": ["https://example.com/18650"],
-        },
-        "AA": {
-            "title": "AA Alkaline Battery",
-            "chemistry": "Alkaline",
-            "voltage_v": 1.5,
-            "capacity": "2500mAh",
-            "form_factor": "AA",
-            "dimensions": "14.5mm x 50.5mm",
-            "rechargeable": False,
-            "operating_temp": "-18°C to +55°C",
-            "weight": "23g",
-            "source_urls": ["https://example.com/aa"],
-        },
-    }
-    
-    # Check if we have stub data for this MPN
-    if mpn_upper in stub_data:
-        data = stub_data[mpn_upper].copy()
-        if manufacturer:
-            data["manufacturer"] = manufacturer
-        return data
-    
-    # Return empty fields for unknown MPNs
-    result = {}
-    if manufacturer:
-        result["manufacturer"] = manufacturer
-    return result
+    with stage("fetch_candidates"):
+        return fetch_candidates_blocking(mpn, manufacturer)
 
 
 def enrich_item(item: EnrichItem) -> Tuple[BatteryRecord, List[str]]:
@@ -74,33 +48,97 @@ def enrich_item(item: EnrichItem) -> Tuple[BatteryRecord, List[str]]:
     Enrich a single battery item.
     Returns (BatteryRecord, warnings_list)
     """
-    warnings = []
-    mpn = item.mpn.strip()
+    started = time.perf_counter()
+    outcome = "error"
+    ENRICH_INFLIGHT.inc()
+    try:
+        record, warnings, outcome = _enrich(item)
+        return record, warnings
+    finally:
+        ENRICH_INFLIGHT.dec()
+        _item_seconds[outcome].observe(time.perf_counter() - started)
+
+
+def _enrich(item: EnrichItem) -> Tuple[BatteryRecord, List[str], str]:
+    # Records are cached under the canonical MPN so case/spacing variants share one entry
+    mpn = canonical_mpn(item.mpn)
     manufacturer = item.manufacturer.strip() if item.manufacturer else ""
     
-    # 1. Check cache
-    cached = get_cached(mpn)
-    if cached:
-        record = BatteryRecord(**cached)
-        return record, []
+    # 1. Check cache; stale entries are served as-is while a background refresh runs
+    entry = get_entry(mpn)
+    if entry is not None:
+        if entry.is_fresh(PIPELINE_VERSION):
+            _served_fresh.inc()
+            return _from_cache(entry), [], "cached"
+        if CACHE_STALE_WHILE_REVALIDATE:
+            _served_stale.inc()
+            _schedule_refresh(mpn, manufacturer)
+            return _from_cache(entry), [], "cached"
     
+    record, warnings, cached = _enrich_once(mpn, manufacturer, source="pipeline")
+    if cached:
+        return record, warnings, "cached"
+    failed = any(warning.startswith("Enrichment error:") for warning in warnings)
+    return record, warnings, "error" if failed else "enriched"
+
+
+def refresh_item(item: EnrichItem, source: str = "refresh") -> Tuple[BatteryRecord, List[str]]:
+    """Enrich an item from the sources regardless of what is cached, and cache the result."""
+    mpn = canonical_mpn(item.mpn)
+    manufacturer = item.manufacturer.strip() if item.manufacturer else ""
+    # A result another caller writes after this call started is as good as our own
+    record, warnings, _ = _enrich_once(mpn, manufacturer, source=source, since=time.time())
+    return record, warnings
+
+
+def _enrich_once(mpn: str, manufacturer: str, source: str, since: float = 0.0) -> Tuple[BatteryRecord, List[str], bool]:
+    """
+    Enrich under the MPN's lease, so concurrent misses in any worker process fetch and
+    generate once; the rest wait for that result. The flag is True when the record came
+    from the cache, i.e. another caller did the work.
+    """
+    if not SINGLE_FLIGHT:
+        return _enrich_uncached(mpn, manufacturer, source) + (False,)
+
+    def cached() -> Optional[Tuple[BatteryRecord, List[str], bool]]:
+        # Straight from the store: the in-memory copy may predate another process's write
+        entry = reload_entry(mpn)
+        if entry is not None and entry.created_at >= since and entry.is_fresh(PIPELINE_VERSION):
+            return _from_cache(entry), [], True
+        return None
+
+    return leases.single_flight(f"mpn:{mpn}", lambda: _enrich_uncached(mpn, manufacturer, source) + (False,), cached)
+
+
+def _from_cache(entry: CacheEntry) -> BatteryRecord:
+    # Validated once per in-memory entry and shared by every hit after that, so
+    # records served from the cache must be treated as read-only
+    if entry.record is None:
+        entry.record = BatteryRecord.model_validate(entry.data)
+    return entry.record
+
+
+def _enrich_uncached(mpn: str, manufacturer: str, source: str) -> Tuple[BatteryRecord, List[str]]:
+    warnings = []
     try:
-        # 2. Fetch candidates (stub)
+        # 2. Fetch candidates from all sources
         candidates = fetch_candidates(mpn, manufacturer)
+        if _is_miss(candidates):
+            candidates, miss_warnings = _resolve_unknown(mpn, manufacturer)
+            warnings.extend(miss_warnings)
         
         # 3. Normalize into canonical schema
-        record_dict = normalize_candidates(candidates, mpn, manufacturer)
-        
-        # 4. Generate overview
-        temp_record = BatteryRecord(**record_dict)
-        overview = generate_overview(temp_record)
-        record_dict["overview"] = overview
-        
-        # Create final record
-        record = BatteryRecord(**record_dict)
+        with stage("normalize"):
+            record_dict = normalize_candidates(candidates, mpn, manufacturer)
+            record_dict["warnings"] = list(record_dict["warnings"]) + warnings
+            
+            # 4. Validate once, then attach the generated overview
+            record = BatteryRecord(**record_dict)
+        with stage("overview"):
+            record.overview = generate_overview(record)
         
         # 5. Save to cache
-        save_cached(mpn, record.model_dump())
+        save_cached(mpn, record.model_dump(), version=PIPELINE_VERSION, source=source)
         
         return record, warnings
     except Exception as e:
@@ -110,3 +148,55 @@ def enrich_item(item: EnrichItem) -> Tuple[BatteryRecord, List[str]]:
         record = BatteryRecord(mpn=mpn, manufacturer=manufacturer, warnings=warnings)
         return record, warnings
 
+
+def _is_miss(candidates: Dict[str, Any]) -> bool:
+    # Sources echo the requested manufacturer back, which says nothing about the part
+    return not any(value for key, value in candidates.items() if key != "manufacturer")
+
+
+def _resolve_unknown(mpn: str, manufacturer: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Fall back to near matches for an MPN no source knows. A suffix variant of a known
+    part ("CR2032-BP") inherits that part's specs; otherwise the matches are suggested.
+    """
+    with stage("fuzzy_match"):
+        matches = fuzzy.suggest(mpn)
+    if not matches:
+        return {}, [f"No data found for {mpn}"]
+
+    best, similarity = matches[0]
+    if FUZZY_INHERIT_SPECS and fuzzy.is_suffix_variant(mpn, best):
+        entry = get_entry(best)
+        # Normalized first, so that source-specific keys map onto the inherited fields
+        known = entry.data if entry is not None else normalize_candidates(fetch_candidates(best, manufacturer), best)
+        candidates = {key: known[key] for key in _INHERITED_FIELDS if known.get(key) not in (None, "")}
+        if not _is_miss(candidates):
+            return candidates, [f"No data found for {mpn}; specs inherited from {best} (similarity {similarity:.2f}), verify before use"]
+
+    suggestions = ", ".join(f"{match} ({score:.2f})" for match, score in matches)
+    return {}, [f"No data found for {mpn}; did you mean: {suggestions}"]
+
+
+def _schedule_refresh(mpn: str, manufacturer: str) -> None:
+    """Re-enrich a stale cache entry in the background, at most once at a time per MPN."""
+    with _refreshing_lock:
+        if mpn in _refreshing:
+            return
+        _refreshing.add(mpn)
+
+    def refresh() -> None:
+        token = leases.acquire(f"mpn:{mpn}") if SINGLE_FLIGHT else None
+        try:
+            # Another worker process is already refreshing it, or already has
+            if SINGLE_FLIGHT:
+                entry = reload_entry(mpn) if token is not None else None
+                if token is None or (entry is not None and entry.is_fresh(PIPELINE_VERSION)):
+                    return
+            _enrich_uncached(mpn, manufacturer, source="refresh")
+        finally:
+            if token is not None:
+                leases.release(f"mpn:{mpn}", token)
+            with _refreshing_lock:
+                _refreshing.discard(mpn)
+
+    _refresh_executor.submit(refresh)
@@ -1,49 +1,144 @@
+import csv
 import io
-import pandas as pd
-from typing import List, Dict
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.core.metrics import ROWS, STAGE_SECONDS
+from app.services import columnar
 from app.core.logging import logger
 
 
+# Accepted header names (case-insensitive, whitespace-stripped)
+MPN_COLUMNS = ["mpn", "part number", "part_number", "partnumber", "model", "model number"]
+MANUFACTURER_COLUMNS = ["manufacturer", "mfr", "brand", "maker", "vendor"]
+
+# Cell texts pandas treats as missing; kept so streamed parsing matches the DataFrame path
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+
 def read_input(file_bytes: bytes, filename: str) -> List[Dict[str, str]]:
-    """Read Excel or CSV file and return list of items with mpn/manufacturer."""
+    """Read an Excel, CSV, Parquet or Feather file and return list of items with mpn/manufacturer."""
+    return list(iter_input(io.BytesIO(file_bytes), filename))
+
+
+def iter_input(fileobj: BinaryIO, filename: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream items with mpn/manufacturer from an Excel, CSV, Parquet or Feather file object.
+    Rows are parsed one at a time (columnar files one record batch at a time), so
+    memory stays flat however long the file is.
+    """
+    started = time.perf_counter()
     try:
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            df = pd.read_excel(io.BytesIO(file_bytes))
-        elif filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(file_bytes))
+        name = filename.lower()
+        format = columnar.format_for(name) or name.rsplit(".", 1)[-1]
+        if name.endswith(".xlsx"):
+            rows = _iter_xlsx_rows(fileobj)
+        elif name.endswith(".xls"):
+            rows = _iter_xls_rows(fileobj)
+        elif name.endswith(".csv"):
+            rows = _iter_csv_rows(fileobj)
+        elif format in columnar.FORMATS:
+            rows = _iter_columnar_rows(fileobj, format)
         else:
             raise ValueError(f"Unsupported file format: {filename}")
 
-        items = []
-        # Normalize column names (case-insensitive, strip whitespace)
-        df.columns = df.columns.str.strip().str.lower()
-        
-        # Look for MPN column (mpn, part number, part_number, etc.)
-        mpn_col = None
-        for col in df.columns:
-            if col in ["mpn", "part number", "part_number", "partnumber", "model", "model number"]:
-                mpn_col = col
-                break
-        
-        if mpn_col is None:
-            raise ValueError("Could not find MPN column in file")
-        
-        # Look for manufacturer column
-        mfr_col = None
-        for col in df.columns:
-            if col in ["manufacturer", "mfr", "brand", "maker", "vendor"]:
-                mfr_col = col
-                break
-        
-        for _, row in df.iterrows():
-            mpn = str(row[mpn_col]).strip() if pd.notna(row[mpn_col]) else ""
-            manufacturer = str(row[mfr_col]).strip() if mfr_col and pd.notna(row.get(mfr_col, "")) else ""
+        count = 0
+        for mpn, manufacturer in rows:
             if mpn:
-                items.append({"mpn": mpn, "manufacturer": manufacturer})
-        
-        logger.info(f"Read {len(items)} items from {filename}")
-        return items
+                count += 1
+                yield {"mpn": mpn, "manufacturer": manufacturer}
+
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="upload_parse")
+        ROWS.inc(count, stage="upload", format=format)
+        logger.info(f"Read {count} items from {filename}")
     except Exception as e:
         logger.error(f"Error reading file {filename}: {e}")
         raise
 
+
+def _find_columns(header: Sequence[object]) -> Tuple[int, Optional[int]]:
+    """Locate the MPN and manufacturer columns from the header row alone."""
+    names = [str(value).strip().lower() if value is not None else "" for value in header]
+
+    mpn_col = next((i for i, name in enumerate(names) if name in MPN_COLUMNS), None)
+    if mpn_col is None:
+        raise ValueError("Could not find MPN column in file")
+
+    mfr_col = next((i for i, name in enumerate(names) if name in MANUFACTURER_COLUMNS), None)
+    return mpn_col, mfr_col
+
+
+def _cell_to_str(value: object) -> str:
+    if value is None:
+        return ""
+    # Spreadsheets store numeric part numbers such as 18650 as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return "" if text in NA_VALUES else text
+
+
+def _pick(row: Sequence[object], mpn_col: int, mfr_col: Optional[int]) -> Tuple[str, str]:
+    mpn = _cell_to_str(row[mpn_col]) if mpn_col < len(row) else ""
+    manufacturer = _cell_to_str(row[mfr_col]) if mfr_col is not None and mfr_col < len(row) else ""
+    return mpn, manufacturer
+
+
+def _iter_csv_rows(fileobj: BinaryIO) -> Iterator[Tuple[str, str]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("Could not find MPN column in file")
+        mpn_col, mfr_col = _find_columns(header)
+        for row in reader:
+            yield _pick(row, mpn_col, mfr_col)
+    finally:
+        # Leave the caller's file object open
+        text.detach()
+
+
+def _iter_xlsx_rows(fileobj: BinaryIO) -> Iterator[Tuple[str, str]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if header is None:
+            raise ValueError("Could not find MPN column in file")
+        mpn_col, mfr_col = _find_columns(header)
+
+        # Only materialize the span of columns that holds MPN/manufacturer
+        used = [mpn_col] + ([mfr_col] if mfr_col is not None else [])
+        first, last = min(used), max(used)
+        mfr_offset = mfr_col - first if mfr_col is not None else None
+        for row in sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True):
+            yield _pick(row, mpn_col - first, mfr_offset)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(fileobj: BinaryIO) -> Iterator[Tuple[str, str]]:
+    import pandas as pd
+
+    # Legacy .xls has no streaming reader; parse the header first, then only the used columns
+    header = pd.read_excel(fileobj, nrows=0).columns
+    mpn_col, mfr_col = _find_columns(list(header))
+    fileobj.seek(0)
+    usecols = sorted([mpn_col] + ([mfr_col] if mfr_col is not None else []))
+    df = pd.read_excel(fileobj, usecols=usecols, dtype=str, keep_default_na=False)
+    mpns = df.iloc[:, usecols.index(mpn_col)]
+    manufacturers = df.iloc[:, usecols.index(mfr_col)] if mfr_col is not None else [""] * len(df)
+    for mpn, manufacturer in zip(mpns, manufacturers):
+        yield _cell_to_str(mpn), _cell_to_str(manufacturer)
+
+
+def _iter_columnar_rows(fileobj: BinaryIO, kind: str) -> Iterator[Tuple[str, str]]:
+    # Only the MPN and manufacturer columns are read from the file
+    for mpns, manufacturers in columnar.iter_column_batches(fileobj, kind, _find_columns):
+        for mpn, manufacturer in zip(mpns, manufacturers):
+            yield _cell_to_str(mpn), _cell_to_str(manufacturer)
@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import ENRICH_MAX_WORKERS, ENRICH_REQUEST_CONCURRENCY
+from app.models.battery import BatteryRecord, EnrichItem, EnrichResult
+from app.services.dedup import DedupPlan
+from app.services.enrich import enrich_item
+from app.core.logging import logger
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared enrichment thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ENRICH_MAX_WORKERS, thread_name_prefix="enrich")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the shared thread pool (used on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def enrich_one(item: EnrichItem) -> EnrichResult:
+    """Enrich a single item, turning any failure into an error result."""
+    try:
+        record, warnings = enrich_item(item)
+        return EnrichResult(record=record, status="success", error=None)
+    except Exception as e:
+        logger.error(f"Error enriching {item.mpn}: {e}")
+        error_record = BatteryRecord(mpn=item.mpn, manufacturer=item.manufacturer)
+        return EnrichResult(record=error_record, status="error", error=str(e))
+
+
+def as_requested(result: EnrichResult, item: EnrichItem) -> EnrichResult:
+    """
+    The result with the MPN as the caller wrote it. Records are enriched, cached and
+    shared under the canonical MPN, which is a key, not a value to hand back.
+    """
+    mpn = item.mpn.strip()
+    if result.record.mpn == mpn:
+        return result
+    return result.model_copy(update={"record": result.record.model_copy(update={"mpn": mpn})})
+
+
+def _run_in_context(loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor, item: EnrichItem) -> asyncio.Future:
+    # run_in_executor does not carry context variables over; the request's trace does need them
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, context.run, enrich_one, item)
+
+
+async def enrich_many(items: Sequence[EnrichItem], max_concurrency: Optional[int] = None) -> List[EnrichResult]:
+    """
+    Enrich items on the worker pool without blocking the event loop.
+    At most `max_concurrency` items of this call run at once; results keep input order.
+    """
+    results, _ = await enrich_deduplicated(items, max_concurrency)
+    return results
+
+
+async def enrich_deduplicated(
+    items: Sequence[EnrichItem], max_concurrency: Optional[int] = None
+) -> Tuple[List[EnrichResult], DedupPlan]:
+    """Enrich each canonical (MPN, manufacturer) key once and fan results out to every row."""
+    plan = DedupPlan(items)
+    unique_results = await _enrich_all(plan.unique_items, max_concurrency)
+    return [as_requested(result, item) for result, item in zip(plan.fan_out(unique_results), items)], plan
+
+
+async def _enrich_all(items: Sequence[EnrichItem], max_concurrency: Optional[int] = None) -> List[EnrichResult]:
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    semaphore = asyncio.Semaphore(max_concurrency or ENRICH_REQUEST_CONCURRENCY)
+
+    async def run(item: EnrichItem) -> EnrichResult:
+        async with semaphore:
+            return await _run_in_context(loop, executor, item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+async def enrich_stream(
+    items: Iterable[Tuple[Any, EnrichItem]], max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[Any, EnrichResult]]:
+    """
+    Enrich (key, item) pairs on the worker pool and yield (key, result) as each finishes.
+    Items are pulled from the iterable lazily, so only `max_concurrency` are in flight.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    iterator = iter(items)
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def worker() -> None:
+        for key, item in iterator:
+            result = await _run_in_context(loop, executor, item)
+            await queue.put((key, result))
+
+    async def run_workers() -> None:
+        try:
+            await asyncio.gather(*(worker() for _ in range(max_concurrency or ENRICH_REQUEST_CONCURRENCY)))
+        finally:
+            await queue.put(done)
+
+    runner = asyncio.create_task(run_workers())
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is done:
+                break
+            yield entry
+        await runner
+    finally:
+        runner.cancel()
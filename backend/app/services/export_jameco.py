@@ -1,7 +1,11 @@
+import csv
 import io
-import pandas as pd
-from typing import List, Tuple
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from app.core.metrics import ROWS, STAGE_SECONDS
 from app.models.battery import BatteryRecord
+from app.services import columnar
 from app.core.logging import logger
 
 
@@ -26,45 +30,136 @@ EXPORT_COLUMNS = [
 ]
 
 
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    **columnar.CONTENT_TYPES,
+}
+
+# Rows buffered per CSV chunk, and bytes per chunk when streaming a finished XLSX file
+_CSV_ROWS_PER_CHUNK = 1000
+_READ_CHUNK_BYTES = 64 * 1024
+# XLSX output stays in memory up to this size before spilling to a temp file
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def record_to_row(record: BatteryRecord) -> list:
+    """Flatten a record into export values, in EXPORT_COLUMNS order."""
+    return [
+        record.mpn,
+        record.manufacturer or "",
+        record.title or "",
+        record.overview or "",
+        record.chemistry or "",
+        record.voltage_v if record.voltage_v is not None else "",
+        record.capacity or "",
+        record.wh if record.wh is not None else "",
+        record.form_factor or "",
+        record.dimensions or "",
+        record.termination or "",
+        "Yes" if record.rechargeable else ("No" if record.rechargeable is False else ""),
+        record.operating_temp or "",
+        record.weight or "",
+        record.datasheet_url or "",
+        ", ".join(record.source_urls) if record.source_urls else "",
+    ]
+
+
+def trusted_records(dicts: Iterable[Dict[str, Any]]) -> Iterator[BatteryRecord]:
+    """Wrap record dicts the service wrote itself (cache, job store) without re-validating them."""
+    for data in dicts:
+        yield BatteryRecord.model_construct(**data)
+
+
 def export_to_jameco(records: List[BatteryRecord], format: str) -> Tuple[bytes, str]:
-    """Export battery records to Jameco format (XLSX or CSV)."""
-    # Convert records to DataFrame rows
-    rows = []
+    """Export battery records to Jameco format (XLSX, CSV, Parquet or Feather)."""
+    chunks, content_type = stream_jameco(records, format)
+    return b"".join(chunks), content_type
+
+
+def stream_jameco(records: Iterable[BatteryRecord], format: str) -> Tuple[Iterator[bytes], str]:
+    """
+    Export battery records to Jameco format as an iterator of byte chunks.
+    CSV is encoded a block of rows at a time; XLSX is written with openpyxl's
+    write-only mode into a spooled temp file and then read back in chunks. Parquet
+    and Feather (Arrow IPC) are written the same way, as typed columns (pyarrow).
+    """
+    format = format.lower()
+    if format == "csv":
+        return _iter_csv(records), CONTENT_TYPES["csv"]
+    if format == "xlsx":
+        return _iter_xlsx(records), CONTENT_TYPES["xlsx"]
+    if format in columnar.FORMATS:
+        # Fail before the response starts if pyarrow is missing
+        columnar.export_schema()
+        return _iter_columnar(records, format), CONTENT_TYPES[format]
+    raise ValueError(f"Unsupported format: {format}")
+
+
+def _record_export(started: float, count: int, format: str) -> None:
+    # Streamed exports are timed from the first row to the last chunk handed to the client
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="export")
+    ROWS.inc(count, stage="export", format=format)
+
+
+def _iter_csv(records: Iterable[BatteryRecord]) -> Iterator[bytes]:
+    started = time.perf_counter()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
     for record in records:
-        row = {
-            "MPN": record.mpn,
-            "Manufacturer": record.manufacturer or "",
-            "Title": record.title or "",
-            "Overview": record.overview or "",
-            "Chemistry": record.chemistry or "",
-            "Voltage (V)": record.voltage_v if record.voltage_v is not None else "",
-            "Capacity": record.capacity or "",
-            "Wh": record.wh if record.wh is not None else "",
-            "Form Factor": record.form_factor or "",
-            "Dimensions": record.dimensions or "",
-            "Termination": record.termination or "",
-            "Rechargeable": "Yes" if record.rechargeable else ("No" if record.rechargeable is False else ""),
-            "Operating Temp": record.operating_temp or "",
-            "Weight": record.weight or "",
-            "Datasheet URL": record.datasheet_url or "",
-            "Source URLs": ", ".join(record.source_urls) if record.source_urls else "",
-        }
-        rows.append(row)
-    
-    df = pd.DataFrame(rows, columns=EXPORT_COLUMNS)
-    
-    # Export to requested format
-    output = io.BytesIO()
-    if format.lower() == "xlsx":
-        df.to_excel(output, index=False, engine="openpyxl")
-        content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    elif format.lower() == "csv":
-        df.to_csv(output, index=False)
-        content_type = "text/csv"
-    else:
-        raise ValueError(f"Unsupported format: {format}")
-    
-    output.seek(0)
-    logger.info(f"Exported {len(records)} records to {format.upper()}")
-    return output.getvalue(), content_type
+        writer.writerow(record_to_row(record))
+        count += 1
+        if count % _CSV_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+    _record_export(started, count, "csv")
+    logger.info(f"Exported {count} records to CSV")
+
+
+def _iter_xlsx(records: Iterable[BatteryRecord]) -> Iterator[bytes]:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    started = time.perf_counter()
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    header = []
+    for column in EXPORT_COLUMNS:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+
+    count = 0
+    for record in records:
+        sheet.append(record_to_row(record))
+        count += 1
+
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as output:
+        workbook.save(output)
+        yield from _read_chunks(output)
+    _record_export(started, count, "xlsx")
+    logger.info(f"Exported {count} records to XLSX")
+
 
+def _iter_columnar(records: Iterable[BatteryRecord], format: str) -> Iterator[bytes]:
+    started = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as output:
+        count = columnar.write_export(records, format, output)
+        yield from _read_chunks(output)
+    _record_export(started, count, format)
+    logger.info(f"Exported {count} records to {format.capitalize()}")
+
+
+def _read_chunks(output) -> Iterator[bytes]:
+    output.seek(0)
+    while True:
+        chunk = output.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,147 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+from app.core.config import FUZZY_MAX_SUGGESTIONS, FUZZY_MIN_SIMILARITY
+from app.services import cache
+from app.services.dedup import canonical_mpn
+from app.services.sources import known_mpns
+from app.core.logging import logger
+
+
+# A cached record only counts as a known part if it carries some actual spec data
+_SPEC_KEYS = ("title", "chemistry", "voltage_v", "capacity", "form_factor", "dimensions")
+
+# Separators that start a packaging/ordering suffix, as in "CR2032-BP" or "18650/2P"
+_SUFFIX_SEPARATORS = "-/_.# "
+
+
+# Posting lists are read rarest first. Once the candidate pool reaches this size, the
+# remaining (more common) trigrams only re-score candidates already found, which keeps
+# lookups well under a millisecond on large catalogs
+_CANDIDATE_LIMIT = 500
+
+
+def _trigrams(mpn: str) -> Set[str]:
+    padded = f"^{mpn}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_suffix_variant(mpn: str, known: str) -> bool:
+    """
+    True when `mpn` is `known` plus an ordering suffix ("CR2032-BP", "CR2032BP"), so it
+    can be assumed to share the known part's specs. Short or letter-final MPNs only
+    accept separated suffixes, so "AAA" is not treated as a variant of "AA".
+    """
+    if len(known) < 4 or len(mpn) <= len(known) or not mpn.startswith(known):
+        return False
+    rest = mpn[len(known):]
+    if rest[0] in _SUFFIX_SEPARATORS:
+        return True
+    return known[-1].isdigit() and rest.isalpha() and len(rest) <= 4
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over canonical MPNs. Lookups rank candidates by Dice
+    similarity of their trigram sets, with known parts that the query extends
+    (suffix variants) first. Safe to update from several threads.
+    """
+
+    def __init__(self, mpns: Iterable[str] = ()):
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.add(mpns)
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def __contains__(self, mpn: str) -> bool:
+        return canonical_mpn(mpn) in self._grams
+
+    def add(self, mpns: Iterable[str]) -> None:
+        with self._lock:
+            for mpn in mpns:
+                mpn = canonical_mpn(mpn)
+                if not mpn or mpn in self._grams:
+                    continue
+                grams = _trigrams(mpn)
+                self._grams[mpn] = grams
+                for gram in grams:
+                    self._postings[gram].add(mpn)
+
+    def remove(self, mpns: Iterable[str]) -> None:
+        with self._lock:
+            for mpn in mpns:
+                mpn = canonical_mpn(mpn)
+                grams = self._grams.pop(mpn, None)
+                for gram in grams or ():
+                    posting = self._postings.get(gram)
+                    if posting is not None:
+                        posting.discard(mpn)
+                        if not posting:
+                            del self._postings[gram]
+
+    def lookup(self, mpn: str, limit: int = FUZZY_MAX_SUGGESTIONS, min_similarity: float = FUZZY_MIN_SIMILARITY) -> List[Tuple[str, float]]:
+        """Up to `limit` (known MPN, similarity) pairs, best first. The MPN itself is never returned."""
+        mpn = canonical_mpn(mpn)
+        grams = _trigrams(mpn)
+        shared: Dict[str, int] = defaultdict(int)
+        scored = []
+        with self._lock:
+            postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+            for posting in postings:
+                if not shared or len(shared) + len(posting) <= _CANDIDATE_LIMIT:
+                    for candidate in posting:
+                        shared[candidate] += 1
+                else:
+                    for candidate in shared:
+                        if candidate in posting:
+                            shared[candidate] += 1
+            for candidate, count in shared.items():
+                similarity = 2.0 * count / (len(grams) + len(self._grams[candidate]))
+                variant = mpn.startswith(candidate) and is_suffix_variant(mpn, candidate)
+                if (similarity >= min_similarity or variant) and candidate != mpn:
+                    scored.append((variant, round(similarity, 3), candidate))
+        scored.sort(key=lambda entry: (not entry[0], -entry[1], entry[2]))
+        return [(candidate, similarity) for _, similarity, candidate in scored[:limit]]
+
+
+_index: Optional[TrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def _has_specs(record: Mapping[str, Any]) -> bool:
+    # Records carrying warnings (failed or fuzzy-inherited) are not trusted as known parts
+    return not record.get("warnings") and any(record.get(key) for key in _SPEC_KEYS)
+
+
+def get_index() -> TrigramIndex:
+    """The process-wide index of known MPNs: every source's own catalog plus cached records with specs."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = TrigramIndex(known_mpns())
+                index.add(mpn for mpn, record in cache.iter_records() if _has_specs(record))
+                logger.info(f"Built fuzzy MPN index over {len(index)} part(s)")
+                _index = index
+    return _index
+
+
+def suggest(mpn: str, limit: int = FUZZY_MAX_SUGGESTIONS) -> List[Tuple[str, float]]:
+    """Ranked near matches for an MPN no source knows."""
+    return get_index().lookup(mpn, limit=limit)
+
+
+def _on_cache_write(upserted: Mapping[str, Dict[str, Any]], removed: Sequence[str]) -> None:
+    # Until the index is first used there is nothing to keep current; the build reads the cache
+    if _index is None:
+        return
+    _index.add(mpn for mpn, record in upserted.items() if _has_specs(record))
+    if removed:
+        sourced = set(known_mpns())
+        _index.remove(mpn for mpn in removed if canonical_mpn(mpn) not in sourced)
+
+
+cache.add_write_listener(_on_cache_write)
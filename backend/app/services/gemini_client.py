@@ -1,48 +1,325 @@
-from typing import Optional
-from app.core.config import GEMINI_API_KEY
+import json
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.core.config import (
+    GEMINI_API_KEY,
+    GEMINI_BATCH_SIZE,
+    GEMINI_BATCH_WINDOW_MS,
+    GEMINI_CONCURRENCY,
+    GEMINI_FAKE,
+    GEMINI_FAKE_LATENCY_MS,
+    GEMINI_MAX_RETRIES,
+    GEMINI_MODEL,
+    GEMINI_RATE_PER_MINUTE,
+)
+from app.core.metrics import GEMINI_FALLBACKS, GEMINI_REQUESTS, GEMINI_SECONDS, GEMINI_TOKENS
+from app.core.ratelimit import TokenBucket, retry_with_backoff
 from app.models.battery import BatteryRecord
-from app.core.logging import logger
+from app.services import overview_cache
+from app.core.logging import logger, sampled
+
+
+# Bump when the prompt or template changes so cached overviews get regenerated
+OVERVIEW_VERSION = "2"
+
+_model: Any = None
+_model_lock = threading.Lock()
+_rate_limiter = TokenBucket(GEMINI_RATE_PER_MINUTE / 60.0, capacity=GEMINI_CONCURRENCY)
+
+
+def _get_model() -> Any:
+    """Return the process-wide model client, configuring the SDK only once. None if unavailable."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if GEMINI_FAKE:
+                    _model = FakeGeminiModel(latency=GEMINI_FAKE_LATENCY_MS / 1000.0)
+                elif GEMINI_API_KEY:
+                    import google.generativeai as genai
+                    genai.configure(api_key=GEMINI_API_KEY)
+                    _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+def set_model(model: Any) -> None:
+    """Swap the model client (e.g. a FakeGeminiModel in tests and benchmarks). None resets it."""
+    global _model
+    with _model_lock:
+        _model = model
 
 
 def generate_overview(record: BatteryRecord) -> str:
     """Generate overview using Gemini API, or return template if API key not available."""
-    if not GEMINI_API_KEY:
+    try:
+        model = _get_model()
+    except Exception as e:
+        logger.warning(f"Gemini client unavailable: {e}, using template")
+        GEMINI_FALLBACKS.inc(reason="unavailable")
+        return _generate_template_overview(record)
+    if model is None:
+        GEMINI_FALLBACKS.inc(reason="disabled")
         return _generate_template_overview(record)
-    
+
+    return _submit(record)()
+
+
+def generate_overviews(records: Sequence[BatteryRecord]) -> Dict[str, str]:
+    """Generate overviews for many records, GEMINI_BATCH_SIZE per prompt. Returns {mpn: overview}."""
+    reason = "disabled"
     try:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-pro")
-        
-        # Build prompt from record fields
-        fields = []
-        if record.chemistry:
-            fields.append(f"Chemistry: {record.chemistry}")
-        if record.voltage_v:
-            fields.append(f"Voltage: {record.voltage_v}V")
-        if record.capacity:
-            fields.append(f"Capacity: {record.capacity}")
-        if record.form_factor:
-            fields.append(f"Form Factor: {record.form_factor}")
-        if record.dimensions:
-            fields.append(f"Dimensions: {record.dimensions}")
-        if record.rechargeable is not None:
-            fields.append(f"Rechargeable: {record.rechargeable}")
-        
-        prompt = f"""Generate a brief 2-3 sentence overview for this battery:
+        model = _get_model()
+    except Exception as e:
+        logger.warning(f"Gemini client unavailable: {e}, using templates")
+        model = None
+        reason = "unavailable"
+    if model is None:
+        GEMINI_FALLBACKS.inc(len(records), reason=reason)
+        return {record.mpn: _generate_template_overview(record) for record in records}
+
+    pending = [(record.mpn, _submit(record)) for record in records]
+    return {mpn: result() for mpn, result in pending}
+
+
+def _submit(record: BatteryRecord) -> Callable[[], str]:
+    """
+    Queue an overview request and return a callable that waits for it.
+    Parts with identical specs share one model answer, keyed by overview_cache.spec_key,
+    with the MPN and manufacturer substituted per part.
+    """
+    key = overview_cache.spec_key(record, OVERVIEW_VERSION)
+    if key is None:
+        return _batcher.submit(record).result
+
+    template = overview_cache.lookup(key)
+    if template is not None:
+        overview = overview_cache.render(template, record)
+        if overview is not None:
+            return lambda: overview
+        # The shared template names a manufacturer this part does not have
+        return _batcher.submit(record).result
+
+    future = _batcher.submit(record, key=key)
+    if future.record is record:
+        future.add_done_callback(lambda f: _remember(key, f))
+
+    def result() -> str:
+        overview = future.result()
+        if future.record is record:
+            return overview
+        template = overview_cache.to_template(overview, future.record)
+        shared = overview_cache.render(template, record) if template is not None else None
+        if shared is None:
+            return _batcher.submit(record).result()
+        overview_cache.note_coalesced()
+        return shared
+
+    return result
+
+
+def _remember(key: str, future: Future) -> None:
+    # Only model answers are shared; template fallbacks are cheap to rebuild
+    if future.generated and not future.exception():
+        template = overview_cache.to_template(future.result(), future.record)
+        if template is not None:
+            overview_cache.store(key, template)
+
+
+def _describe_fields(record: BatteryRecord) -> List[str]:
+    # Build prompt from record fields
+    fields = []
+    if record.chemistry:
+        fields.append(f"Chemistry: {record.chemistry}")
+    if record.voltage_v:
+        fields.append(f"Voltage: {record.voltage_v}V")
+    if record.capacity:
+        fields.append(f"Capacity: {record.capacity}")
+    if record.form_factor:
+        fields.append(f"Form Factor: {record.form_factor}")
+    if record.dimensions:
+        fields.append(f"Dimensions: {record.dimensions}")
+    if record.rechargeable is not None:
+        fields.append(f"Rechargeable: {record.rechargeable}")
+    return fields
+
+
+def _build_prompt(record: BatteryRecord) -> str:
+    return f"""Generate a brief 2-3 sentence overview for this battery:
 MPN: {record.mpn}
 Manufacturer: {record.manufacturer or 'N/A'}
-{' | '.join(fields)}
+{' | '.join(_describe_fields(record))}
 
 Overview:"""
-        
-        response = model.generate_content(prompt)
-        overview = response.text.strip()
-        logger.info(f"Generated Gemini overview for {record.mpn}")
-        return overview
+
+
+BATCH_PROMPT_HEADER = "Generate a brief 2-3 sentence overview for each battery below."
+
+
+def _build_batch_prompt(records: Sequence[BatteryRecord]) -> str:
+    lines = [
+        BATCH_PROMPT_HEADER,
+        'Answer with only a JSON object mapping each item number (as a string) to its overview, e.g. {"1": "..."}.',
+        "",
+    ]
+    for i, record in enumerate(records, start=1):
+        details = " | ".join([f"MPN: {record.mpn}", f"Manufacturer: {record.manufacturer or 'N/A'}"] + _describe_fields(record))
+        lines.append(f"[{i}] {details}")
+    return "\n".join(lines)
+
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _parse_batch_response(text: str, count: int) -> Dict[int, str]:
+    """Parse {"1": "...", ...} out of a model answer (tolerating code fences). Keys are 0-based."""
+    match = _JSON_OBJECT.search(text)
+    if not match:
+        return {}
+    try:
+        answers = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    parsed = {}
+    for key, value in answers.items():
+        if str(key).isdigit() and isinstance(value, str) and value.strip() and 1 <= int(key) <= count:
+            parsed[int(key) - 1] = value.strip()
+    return parsed
+
+
+def _call_model(prompt: str, kind: str) -> str:
+    model = _get_model()
+
+    def call() -> Any:
+        _rate_limiter.acquire()
+        return model.generate_content(prompt)
+
+    started = time.perf_counter()
+    try:
+        response = retry_with_backoff(call, retries=GEMINI_MAX_RETRIES)
+    except Exception:
+        GEMINI_REQUESTS.inc(kind=kind, outcome="error")
+        raise
+    finally:
+        GEMINI_SECONDS.observe(time.perf_counter() - started, kind=kind)
+    GEMINI_REQUESTS.inc(kind=kind, outcome="ok")
+    _count_tokens(prompt, response)
+    return response.text
+
+
+def _count_tokens(prompt: str, response: Any) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    # Without usage data (e.g. the fake model), estimate at ~4 characters per token
+    if prompt_tokens is None:
+        prompt_tokens = len(prompt) // 4
+    if completion_tokens is None:
+        completion_tokens = len(response.text or "") // 4
+    GEMINI_TOKENS.inc(prompt_tokens, direction="prompt")
+    GEMINI_TOKENS.inc(completion_tokens, direction="completion")
+
+
+def _request_overviews(records: Sequence[BatteryRecord]) -> List[Optional[str]]:
+    """One model round trip for a whole batch. None marks items the model did not answer."""
+    if len(records) == 1:
+        record = records[0]
+        try:
+            overview = _call_model(_build_prompt(record), "single").strip()
+            if sampled():
+                logger.debug(f"Generated Gemini overview for {record.mpn}")
+            return [overview]
+        except Exception as e:
+            logger.warning(f"Gemini API error for {record.mpn}: {e}, using template")
+            GEMINI_FALLBACKS.inc(reason="error")
+            return [None]
+
+    try:
+        answers = _parse_batch_response(_call_model(_build_batch_prompt(records), "batch"), len(records))
     except Exception as e:
-        logger.warning(f"Gemini API error for {record.mpn}: {e}, using template")
-        return _generate_template_overview(record)
+        logger.warning(f"Gemini API error for batch of {len(records)}: {e}, using templates")
+        GEMINI_FALLBACKS.inc(len(records), reason="error")
+        answers = None
+    if answers is not None and len(answers) < len(records):
+        logger.warning(f"Gemini batch answered {len(answers)}/{len(records)} items, using templates for the rest")
+        GEMINI_FALLBACKS.inc(len(records) - len(answers), reason="unanswered")
+    if answers and sampled():
+        logger.debug(f"Generated Gemini overviews for {len(answers)} batteries in one request")
+    answers = answers or {}
+    return [answers.get(i) for i in range(len(records))]
+
+
+class OverviewBatcher:
+    """
+    Collects overview requests from concurrent callers into batched prompts.
+    A batch is sent when it reaches `batch_size` or `window` seconds after its first
+    request. Requests with the same key already in flight share one future; the
+    future's `record` is the request that was actually sent and `generated` tells
+    whether the answer came from the model or the template fallback.
+    """
+
+    def __init__(self, batch_size: int, window: float, concurrency: int):
+        self.batch_size = max(batch_size, 1)
+        self.window = window
+        self._queue: "queue.Queue[Tuple[Any, BatteryRecord, Future]]" = queue.Queue()
+        self._inflight: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self._senders = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="gemini")
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(record: BatteryRecord) -> tuple:
+        return (record.mpn, record.manufacturer or "", tuple(_describe_fields(record)))
+
+    def submit(self, record: BatteryRecord, key: Optional[Any] = None) -> Future:
+        key = key if key is not None else self._key(record)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            future.record = record
+            future.generated = False
+            self._inflight[key] = future
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name="gemini-batcher", daemon=True)
+                self._thread.start()
+        self._queue.put((key, record, future))
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[Any, BatteryRecord, Future]]) -> None:
+        records = [record for _, record, _ in batch]
+        try:
+            overviews = _request_overviews(records)
+        except Exception as e:
+            logger.warning(f"Overview batch failed: {e}, using templates")
+            GEMINI_FALLBACKS.inc(len(records), reason="error")
+            overviews = [None] * len(records)
+        for (key, record, future), overview in zip(batch, overviews):
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.generated = overview is not None
+            future.set_result(overview if overview is not None else _generate_template_overview(record))
+
+
+_batcher = OverviewBatcher(GEMINI_BATCH_SIZE, GEMINI_BATCH_WINDOW_MS / 1000.0, GEMINI_CONCURRENCY)
 
 
 def _generate_template_overview(record: BatteryRecord) -> str:
@@ -59,8 +336,53 @@ def _generate_template_overview(record: BatteryRecord) -> str:
     if record.rechargeable is not None:
         rechargeable_str = "rechargeable" if record.rechargeable else "non-rechargeable"
         parts.append(rechargeable_str)
-    
+
     if parts:
         return f"{record.mpn} is a {' '.join(parts)} battery."
     return f"{record.mpn} battery specification."
 
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeRateLimitError(RuntimeError):
+    """What FakeGeminiModel raises for a rejected call, like the SDK's ResourceExhausted."""
+
+    code = 429
+
+
+class FakeGeminiModel:
+    """
+    Offline stand-in for genai.GenerativeModel. Answers single and batched prompts
+    deterministically after `latency` seconds, and can reject the first `fail_first`
+    calls with a 429 to exercise retries.
+    """
+
+    _ITEM = re.compile(r"^\[(\d+)\] MPN: (.*?) \| (.*)$", re.MULTILINE)
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> FakeGeminiResponse:
+        with self._lock:
+            self.calls += 1
+            should_fail = self.calls <= self.fail_first
+        if self.latency:
+            time.sleep(self.latency)
+        if should_fail:
+            raise FakeRateLimitError("429 Resource has been exhausted (fake Gemini quota)")
+
+        if prompt.startswith(BATCH_PROMPT_HEADER):
+            answers = {
+                number: f"{mpn} is a battery with {details}."
+                for number, mpn, details in self._ITEM.findall(prompt)
+            }
+            return FakeGeminiResponse(json.dumps(answers))
+
+        mpn = re.search(r"^MPN: (.*)$", prompt, re.MULTILINE)
+        return FakeGeminiResponse(f"{mpn.group(1) if mpn else 'This'} is a battery.")
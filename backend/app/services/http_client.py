@@ -0,0 +1,252 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterator, Optional, Tuple
+import httpx
+import httpcore
+from app.core.config import (
+    HTTP_DNS_TTL_SECONDS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_PER_HOST_LIMIT,
+    HTTP_TIMEOUT_SECONDS,
+)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CachingResolver:
+    """Caches getaddrinfo answers for `ttl` seconds so pooled reconnects skip DNS."""
+
+    def __init__(self, ttl: float = HTTP_DNS_TTL_SECONDS):
+        self.ttl = ttl
+        self._answers: Dict[Tuple[str, int], Tuple[float, str]] = {}
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> str:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        key = (host, port)
+        cached = self._answers.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.hits += 1
+            return cached[1]
+        # Concurrent connects to the same host share one lookup
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+        self.misses += 1
+        pending = self._pending[key] = asyncio.ensure_future(self._lookup(host, port))
+        try:
+            address = await asyncio.shield(pending)
+        finally:
+            self._pending.pop(key, None)
+        self._answers[key] = (time.monotonic() + self.ttl, address)
+        return address
+
+    async def _lookup(self, host: str, port: int) -> str:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return infos[0][4][0]
+
+    def forget(self, host: str, port: int) -> None:
+        self._answers.pop((host, port), None)
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that connects to cached addresses. TLS still verifies the original host name."""
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend, resolver: CachingResolver):
+        self.inner = inner
+        self.resolver = resolver
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            address = await self.resolver.resolve(host, port)
+        except OSError as e:
+            # As the inner backend reports a failed lookup, so callers see httpx.ConnectError
+            raise httpcore.ConnectError(str(e)) from e
+        try:
+            return await self.inner.connect_tcp(
+                address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+            )
+        except Exception:
+            self.resolver.forget(host, port)
+            raise
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.inner.sleep(seconds)
+
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    # Raise httpcore errors as their httpx counterparts (same names), as httpx's own transport does
+    try:
+        yield
+    except Exception as e:
+        for cls in type(e).__mro__:
+            mapped = getattr(httpx, cls.__name__, None)
+            if cls.__module__.startswith("httpcore") and isinstance(mapped, type) and issubclass(mapped, httpx.TransportError):
+                raise mapped(str(e)) from e
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: AsyncIterable[bytes]):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class CachingDNSTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport over an httpcore connection pool whose connections go through
+    CachingDNSBackend. httpx's own transport does not take a network backend, so the
+    pool is built here through httpcore's public API.
+    """
+
+    def __init__(self, limits: httpx.Limits, resolver: CachingResolver, http2: bool = False, retries: int = 0):
+        self.pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            retries=retries,
+            network_backend=CachingDNSBackend(httpcore.AnyIOBackend(), resolver),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self.pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+class HttpClientPool:
+    """
+    App-lifetime HTTP client for outbound enrichment calls: one keep-alive connection
+    pool (HTTP/2 when `h2` is installed), a concurrency cap per host, cached DNS and
+    request/latency counters. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        per_host_limit: int = HTTP_PER_HOST_LIMIT,
+        timeout: float = HTTP_TIMEOUT_SECONDS,
+        http2: Optional[bool] = None,
+    ):
+        self.http2 = _http2_available() if http2 is None else http2
+        self.per_host_limit = per_host_limit
+        self.resolver = CachingResolver()
+        self._transport = CachingDNSTransport(
+            httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            self.resolver,
+            http2=self.http2,
+            retries=1,
+        )
+        self.client = httpx.AsyncClient(transport=self._transport, timeout=timeout)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight = 0
+        self._hosts: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        host = httpx.URL(url).host
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        stats = self._hosts[host]
+        async with limit:
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except Exception:
+                stats["errors"] += 1
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._in_flight -= 1
+                stats["requests"] += 1
+                stats["total_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        return response
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        connections = list(self._transport.pool.connections)
+        return {
+            "http2": self.http2,
+            "in_flight": self._in_flight,
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "dns_cache": {"hits": self.resolver.hits, "misses": self.resolver.misses},
+            "hosts": {
+                host: {
+                    "requests": int(s["requests"]),
+                    "errors": int(s["errors"]),
+                    "avg_ms": round(s["total_ms"] / s["requests"], 2) if s["requests"] else 0.0,
+                    "max_ms": round(s["max_ms"], 2),
+                }
+                for host, s in self._hosts.items()
+            },
+        }
@@ -0,0 +1,302 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.core.config import JOBS_DB_PATH, LEASE_TTL_SECONDS
+from app.core.db import LocalConnection
+from app.core.serialization import loads
+from app.models.battery import EnrichItem, EnrichResult
+from app.services import leases
+from app.services.dedup import DedupPlan
+from app.services.executor import as_requested, enrich_stream
+from app.core.logging import logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    mpn TEXT NOT NULL,
+    manufacturer TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    seq INTEGER,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_seq ON job_items (job_id, seq);
+"""
+
+_db = LocalConnection(JOBS_DB_PATH, SCHEMA)
+
+# Running job tasks by job id (kept referenced so they are not garbage collected),
+# per-job events used to wake up streaming readers when a result lands, and the
+# task that picks up jobs whose lease lapsed
+_tasks: Dict[str, asyncio.Task] = {}
+_events: Dict[str, asyncio.Event] = {}
+_sweeper: Optional[asyncio.Task] = None
+
+
+def create_job(items: Iterable[EnrichItem], source: Optional[str] = None) -> str:
+    """Persist a new job with all of its items and return the job id. Items may be a lazy iterable."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    total = 0
+
+    def rows():
+        nonlocal total
+        for i, item in enumerate(items):
+            total = i + 1
+            yield job_id, i, item.mpn, item.manufacturer or ""
+
+    conn = _db.get()
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute(
+            "INSERT INTO jobs (id, status, total, source, created_at, updated_at) VALUES (?, 'queued', 0, ?, ?, ?)",
+            (job_id, source, now, now),
+        )
+        conn.executemany("INSERT INTO job_items (job_id, idx, mpn, manufacturer) VALUES (?, ?, ?, ?)", rows())
+        conn.execute("UPDATE jobs SET total = ? WHERE id = ?", (total, job_id))
+    logger.info(f"Created job {job_id} with {total} items")
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return progress counts for a job, or None if it does not exist."""
+    row = _db.get().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "total": row["total"],
+        "completed": row["completed"],
+        "failed": row["failed"],
+        "pending": row["total"] - row["completed"],
+        "source": row["source"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def get_results(job_id: str, after: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+    """Return finished results in completion order, starting after sequence number `after`."""
+    rows = _db.get().execute(
+        "SELECT seq, idx, result FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+        (job_id, after, limit),
+    ).fetchall()
+    return [{"seq": row["seq"], "index": row["idx"], "result": loads(row["result"])} for row in rows]
+
+
+def iter_ordered_results(job_id: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """Yield finished results in input order, reading a page at a time."""
+    last_idx = -1
+    while True:
+        rows = _db.get().execute(
+            "SELECT idx, result FROM job_items WHERE job_id = ? AND idx > ? AND seq IS NOT NULL ORDER BY idx LIMIT ?",
+            (job_id, last_idx, page_size),
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield loads(row["result"])
+        last_idx = rows[-1]["idx"]
+
+
+def _pending_items(job_id: str) -> List[tuple]:
+    rows = _db.get().execute(
+        "SELECT idx, mpn, manufacturer FROM job_items WHERE job_id = ? AND seq IS NULL ORDER BY idx", (job_id,)
+    ).fetchall()
+    return [(row["idx"], EnrichItem(mpn=row["mpn"], manufacturer=row["manufacturer"])) for row in rows]
+
+
+def _set_status(job_id: str, status: str) -> None:
+    _db.get().execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id))
+
+
+def _record_result(job_id: str, rows: List[Tuple[int, EnrichItem]], result: EnrichResult) -> None:
+    """Store one result for one or more (index, item) rows, giving each row its own completion sequence number."""
+    conn = _db.get()
+    failed = len(rows) if result.status == "error" else 0
+    # Rows of a group differ at most in how the MPN is written; serialize once per spelling
+    payloads: Dict[str, str] = {}
+    for _, item in rows:
+        if item.mpn not in payloads:
+            payloads[item.mpn] = as_requested(result, item).model_dump_json()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        completed = conn.execute("SELECT completed FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        conn.executemany(
+            "UPDATE job_items SET status = ?, seq = ?, result = ? WHERE job_id = ? AND idx = ?",
+            [
+                (result.status, completed + n, payloads[item.mpn], job_id, idx)
+                for n, (idx, item) in enumerate(rows, start=1)
+            ],
+        )
+        conn.execute(
+            "UPDATE jobs SET completed = ?, failed = failed + ?, updated_at = ? WHERE id = ?",
+            (completed + len(rows), failed, time.time(), job_id),
+        )
+
+
+def _record_if_leased(key: str, token: str, job_id: str, rows: List[Tuple[int, EnrichItem]], result: EnrichResult) -> bool:
+    """_record_result, unless the job's lease has passed to another worker. Returns whether it was recorded."""
+    if not leases.is_owner(key, token):
+        return False
+    _record_result(job_id, rows, result)
+    return True
+
+
+def _notify(job_id: str) -> None:
+    # Swap in a fresh event before waking readers so none of them misses a later update
+    event = _events.pop(job_id, None)
+    _events[job_id] = asyncio.Event()
+    if event is not None:
+        event.set()
+
+
+async def run_job(job_id: str) -> None:
+    """
+    Enrich every pending item of a job, persisting each result as it finishes.
+    The job's lease keeps other worker processes from running it at the same time.
+    """
+    key = f"job:{job_id}"
+    token = await asyncio.to_thread(leases.acquire, key)
+    if token is None:
+        # Held by another worker, or by a dead one until the lease lapses and the sweeper retries
+        logger.info(f"Job {job_id} is leased by another worker")
+        return
+    heartbeat = asyncio.get_running_loop().create_task(_hold_lease(key, token, asyncio.current_task()))
+    _events[job_id] = asyncio.Event()
+    try:
+        pending = await asyncio.to_thread(_pending_items, job_id)
+        await asyncio.to_thread(_set_status, job_id, "running")
+        # Repeated parts are enriched once; the result is recorded for every row in the group
+        plan = DedupPlan([item for _, item in pending])
+        groups = ([pending[i] for i in rows] for rows in plan.groups)
+        stream = enrich_stream(zip(groups, plan.unique_items))
+        try:
+            async for rows, result in stream:
+                # The lease may have lapsed and been taken over since the last renewal
+                if not await asyncio.to_thread(_record_if_leased, key, token, job_id, rows, result):
+                    logger.warning(f"Job {job_id} lost its lease, leaving it to the new holder")
+                    return
+                _notify(job_id)
+        finally:
+            await stream.aclose()
+        await asyncio.to_thread(_set_status, job_id, "completed")
+        logger.info(f"Job {job_id} completed")
+    except asyncio.CancelledError:
+        # Leave the job as running so it is resumed on the next startup
+        raise
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        await asyncio.to_thread(_set_status, job_id, "failed")
+    finally:
+        heartbeat.cancel()
+        await asyncio.to_thread(leases.release, key, token)
+        event = _events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+
+async def _hold_lease(key: str, token: str, job: asyncio.Task) -> None:
+    # Jobs outlive a single lease TTL; renew well before it runs out, and stop the
+    # job once another worker has taken the lease over
+    while True:
+        await asyncio.sleep(LEASE_TTL_SECONDS / 3)
+        if not await asyncio.to_thread(leases.renew, key, token):
+            logger.warning(f"Lost lease {key}, stopping the job")
+            job.cancel()
+            return
+
+
+def start_job(job_id: str) -> None:
+    """Schedule a job on the running event loop, unless this process is already running it."""
+    if job_id in _tasks:
+        return
+    task = asyncio.get_running_loop().create_task(run_job(job_id))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+
+
+def _unfinished_jobs() -> List[str]:
+    rows = _db.get().execute("SELECT id FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+    return [row["id"] for row in rows]
+
+
+def _unleased(job_ids: List[str]) -> List[str]:
+    return [job_id for job_id in job_ids if not leases.is_held(f"job:{job_id}")]
+
+
+async def _sweep_jobs() -> None:
+    # A job whose worker died keeps its lease until the TTL runs out, so a restart
+    # within the TTL (or another worker) cannot take it over right away. Retry such
+    # jobs once their lease has lapsed
+    while True:
+        await asyncio.sleep(LEASE_TTL_SECONDS / 2)
+        try:
+            job_ids = [job_id for job_id in await asyncio.to_thread(_unfinished_jobs) if job_id not in _tasks]
+            orphaned = await asyncio.to_thread(_unleased, job_ids)
+        except Exception as e:
+            logger.warning(f"Job sweep failed: {e}")
+            continue
+        for job_id in orphaned:
+            logger.info(f"Resuming job {job_id}, its lease lapsed")
+            start_job(job_id)
+
+
+def resume_jobs() -> int:
+    """
+    Restart jobs left queued or running by a previous process, and keep retrying those
+    still leased by a dead worker until their lease lapses. Returns how many were found.
+    """
+    global _sweeper
+    job_ids = _unfinished_jobs()
+    for job_id in job_ids:
+        logger.info(f"Resuming job {job_id}")
+        start_job(job_id)
+    if _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_jobs())
+    return len(job_ids)
+
+
+async def cancel_running_jobs() -> None:
+    """Stop the sweeper and cancel in-process job tasks on shutdown; their state stays resumable."""
+    global _sweeper
+    tasks = list(_tasks.values())
+    if _sweeper is not None:
+        tasks.append(_sweeper)
+        _sweeper = None
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def update_event(job_id: str) -> asyncio.Event:
+    """
+    Event set on the job's next recorded result. Grab it before reading results,
+    then wait on it, so an update landing in between is not missed.
+    """
+    event = _events.get(job_id)
+    # Jobs not running in this process never fire; readers fall back to polling
+    return event if event is not None else asyncio.Event()
+
+
+async def wait_for_update(event: asyncio.Event, timeout: float = 1.0) -> None:
+    """Wait for an update event; the timeout covers jobs run by another process."""
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, TypeVar
+from app.core.config import CACHE_DB_PATH, LEASE_POLL_SECONDS, LEASE_TTL_SECONDS
+from app.core.db import LocalConnection
+
+
+T = TypeVar("T")
+
+# Short-lived claims on a piece of work ("mpn:CR2032", "job:<id>") shared by every
+# process using the cache database. A lease expires after its TTL, so work held by a
+# crashed worker is picked up again
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+_db = LocalConnection(CACHE_DB_PATH, SCHEMA)
+
+# Waiters in this process are woken on release instead of waiting for the next poll
+_released: Dict[str, threading.Event] = {}
+_released_lock = threading.Lock()
+
+
+def acquire(key: str, ttl: float = LEASE_TTL_SECONDS) -> Optional[str]:
+    """Claim `key` unless another owner holds an unexpired lease. Returns the owner token, or None."""
+    token = f"{os.getpid()}-{uuid.uuid4().hex}"
+    now = time.time()
+    cursor = _db.get().execute(
+        "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+        "WHERE leases.expires_at < ?",
+        (key, token, now + ttl, now),
+    )
+    return token if cursor.rowcount == 1 else None
+
+
+def renew(key: str, token: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+    """Extend a held lease. False if it expired and was taken over."""
+    cursor = _db.get().execute(
+        "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?", (time.time() + ttl, key, token)
+    )
+    return cursor.rowcount == 1
+
+
+def release(key: str, token: str) -> None:
+    _db.get().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, token))
+    with _released_lock:
+        event = _released.pop(key, None)
+    if event is not None:
+        event.set()
+
+
+def is_owner(key: str, token: str) -> bool:
+    """True while `token` holds an unexpired lease on `key`."""
+    row = _db.get().execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+    return row is not None and row["owner"] == token and row["expires_at"] >= time.time()
+
+
+def is_held(key: str) -> bool:
+    row = _db.get().execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+    return row is not None and row["expires_at"] >= time.time()
+
+
+def wait(key: str, check: Callable[[], Optional[T]], timeout: float = LEASE_TTL_SECONDS) -> Optional[T]:
+    """
+    Wait while another owner holds `key`, returning `check()` as soon as it is not
+    None (e.g. the holder's result landed in the cache). Returns None once the lease
+    is released or expired without a result, or after `timeout`; the caller can then
+    try to acquire it itself.
+    """
+    deadline = time.monotonic() + timeout
+    delay = LEASE_POLL_SECONDS
+    while True:
+        with _released_lock:
+            event = _released.setdefault(key, threading.Event())
+        result = check()
+        if result is not None:
+            return result
+        if not is_held(key):
+            return check()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        event.wait(min(delay, remaining))
+        # Back off for holders in other processes, which cannot wake us
+        delay = min(delay * 2, 0.5)
+
+
+def single_flight(key: str, run: Callable[[], T], check: Callable[[], Optional[T]]) -> T:
+    """
+    Run `run()` under the lease for `key` so that concurrent callers, in this process
+    or any other, do the work once. Callers that find the lease held wait for the
+    holder and return `check()`; `check()` is also tried right after acquiring, since
+    the previous holder may have finished in between.
+    """
+    while True:
+        token = acquire(key)
+        if token is not None:
+            try:
+                result = check()
+                return result if result is not None else run()
+            finally:
+                release(key, token)
+        result = wait(key, check)
+        if result is not None:
+            return result
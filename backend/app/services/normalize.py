@@ -1,6 +1,10 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from app.services.specs import SPACE_RE2, derive_wh, map_column, parse_spec_columns, parse_specs, with_unit, with_unit_column
 
 
+# Bump when FIELD_MAPPINGS or the parsing rules change so cached records get re-normalized
+NORMALIZE_VERSION = "5"
+
 # Common field mappings for normalization
 FIELD_MAPPINGS = {
     "nominal voltage": "voltage_v",
@@ -26,6 +30,12 @@ FIELD_MAPPINGS = {
     "datasheet url": "datasheet_url",
 }
 
+# Unit given in the header of a mapped column; bare numbers in it are read in that unit
+FIELD_UNITS = {
+    "capacity (mah)": "mAh",
+    "capacity (ah)": "Ah",
+}
+
 
 def normalize_candidates(candidates: Dict[str, Any], mpn: str, manufacturer: str = "") -> Dict[str, Any]:
     """Normalize candidate fields into canonical battery schema."""
@@ -50,15 +60,22 @@ def normalize_candidates(candidates: Dict[str, Any], mpn: str, manufacturer: str
     
     # Apply field mappings if candidates use different keys
     for key, value in candidates.items():
-        normalized_key = FIELD_MAPPINGS.get(key.lower())
+        header = key.lower()
+        normalized_key = FIELD_MAPPINGS.get(header)
         if normalized_key and not record.get(normalized_key):
             if normalized_key == "voltage_v":
                 record["voltage_v"] = _parse_float(value)
             elif normalized_key == "rechargeable":
                 record["rechargeable"] = _parse_bool(value)
+            elif header in FIELD_UNITS:
+                record[normalized_key] = with_unit(value, FIELD_UNITS[header])
             else:
                 record[normalized_key] = value
     
+    # Numeric specs parsed from the free-text fields
+    record.update(parse_specs(record["capacity"], record["dimensions"], record["weight"], record["operating_temp"]))
+    record["wh"] = derive_wh(record["wh"], record["voltage_v"], record["capacity_mah"])
+    
     return record
 
 
@@ -88,3 +105,127 @@ def _parse_bool(value: Any) -> Optional[bool]:
         return value.lower() in ("true", "yes", "1", "rechargeable", "y")
     return bool(value)
 
+
+# Batch normalization: the same rules as normalize_candidates, applied a column at a time
+def normalize_batch(table: Any, mpn_column: str = "mpn", manufacturer_column: str = "manufacturer") -> List[Dict[str, Any]]:
+    """
+    Normalize many candidate rows at once. `table` is a pandas DataFrame, a pyarrow Table
+    or a list of candidate dicts; each column is a candidate key and null cells count as
+    absent keys. Row i of the result equals
+    normalize_candidates(row i's non-null cells in column order, row[mpn_column], row[manufacturer_column] or "").
+    """
+    columns = _to_columns(table)
+    n = len(next(iter(columns.values()), []))
+
+    def get(key: str, default: Any = None) -> List[Any]:
+        column = columns.get(key)
+        if column is None:
+            return [default] * n
+        if default is None:
+            return column
+        return [default if value is None else value for value in column]
+
+    def either(*options: List[Any]) -> List[Any]:
+        # Elementwise `a or b or ...`
+        result = options[0]
+        for other in options[1:]:
+            result = [a or b for a, b in zip(result, other)]
+        return result
+
+    def parse_float(column: List[Any]) -> List[Any]:
+        return map_column(column, _parse_float, _float_kernel)
+
+    def parse_bool(column: List[Any]) -> List[Any]:
+        return map_column(column, _parse_bool, _bool_kernel)
+
+    record = {
+        "mpn": get(mpn_column),
+        "manufacturer": either(get(manufacturer_column, ""), get("manufacturer", "")),
+        "title": get("title", ""),
+        "chemistry": get("chemistry", ""),
+        "voltage_v": parse_float(either(get("voltage_v"), get("voltage"), get("nominal_voltage"))),
+        "capacity": get("capacity", ""),
+        "wh": parse_float(either(get("wh"), get("watt_hours"))),
+        "form_factor": either(get("form_factor"), get("size", "")),
+        "dimensions": get("dimensions", ""),
+        "termination": get("termination", ""),
+        "rechargeable": parse_bool(get("rechargeable")),
+        "operating_temp": either(get("operating_temp"), get("temp_range", "")),
+        "weight": get("weight", ""),
+        "datasheet_url": either(get("datasheet_url"), get("datasheet", "")),
+        "source_urls": _lists(columns.get("source_urls"), n),
+        "warnings": _lists(columns.get("warnings"), n),
+    }
+
+    # Header mapping is resolved once per batch, then applied column by column in order
+    for key, column in columns.items():
+        header = key.lower()
+        normalized_key = FIELD_MAPPINGS.get(header)
+        if not normalized_key:
+            continue
+        if normalized_key == "voltage_v":
+            column = parse_float(column)
+        elif normalized_key == "rechargeable":
+            column = parse_bool(column)
+        elif header in FIELD_UNITS:
+            column = with_unit_column(column, FIELD_UNITS[header])
+        # A null cell means the key is absent, so it never overrides
+        present = columns[key]
+        record[normalized_key] = [
+            current if current or raw is None else value
+            for current, value, raw in zip(record[normalized_key], column, present)
+        ]
+
+    record.update(parse_spec_columns(record["capacity"], record["dimensions"], record["weight"], record["operating_temp"]))
+    record["wh"] = [
+        derive_wh(wh, voltage, capacity)
+        for wh, voltage, capacity in zip(record["wh"], record["voltage_v"], record["capacity_mah"])
+    ]
+
+    keys = list(record)
+    return [dict(zip(keys, values)) for values in zip(*record.values())]
+
+
+def _lists(column: Optional[List[Any]], n: int) -> List[Any]:
+    # A fresh empty list per row for absent values, as normalize_candidates gives
+    if column is None:
+        return [[] for _ in range(n)]
+    return [[] if value is None else value for value in column]
+
+
+def _to_columns(table: Any) -> Dict[str, List[Any]]:
+    """Column name -> list of Python values, with None for null cells."""
+    if hasattr(table, "to_pydict"):
+        return table.to_pydict()
+    if hasattr(table, "to_dict") and hasattr(table, "columns"):
+        frame = table.astype(object)
+        frame = frame.where(frame.notna(), None)
+        return {str(column): frame[column].tolist() for column in frame.columns}
+
+    rows = list(table)
+    keys: Dict[str, None] = {}
+    for row in rows:
+        keys.update(dict.fromkeys(row))
+    return {key: [row.get(key) for row in rows] for key in keys}
+
+
+# Arrow kernels for the batch path, giving the same results as _parse_float and
+# _parse_bool for ASCII strings (see specs.map_column); null means "ask the scalar parser"
+_FLOAT_RE2 = "^" + SPACE_RE2 + r"*(?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)" + SPACE_RE2 + "*$"
+_TRUE_STRINGS = ("true", "yes", "1", "rechargeable", "y")
+
+
+def _float_kernel(strings: Any) -> List[Any]:
+    import pyarrow.compute as pc
+
+    for unit in ("V", "v", "Wh", "wh"):
+        strings = pc.replace_substring(strings, unit, "")
+    # Plain decimals only; "inf", "1_000" and the like are left to float()
+    return pc.cast(pc.struct_field(pc.extract_regex(strings, _FLOAT_RE2), "number"), "float64").to_pylist()
+
+
+def _bool_kernel(strings: Any) -> List[Any]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pc.if_else(pc.is_valid(strings), pc.is_in(pc.ascii_lower(strings), value_set=pa.array(_TRUE_STRINGS)), None).to_pylist()
@@ -0,0 +1,113 @@
+import hashlib
+import re
+import threading
+from typing import Any, Dict, Optional
+from app.core.config import OVERVIEW_MEMO_SIZE
+from app.models.battery import BatteryRecord
+from app.services import cache
+from app.services.cache import LRUCache
+
+
+# Placeholders stored in shared overview templates in place of the part's identity
+MPN_PLACEHOLDER = "<<MPN>>"
+MANUFACTURER_PLACEHOLDER = "<<MANUFACTURER>>"
+
+_memory = LRUCache(OVERVIEW_MEMO_SIZE)
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0}
+_stats_lock = threading.Lock()
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return " ".join(value.lower().split()) if value else ""
+
+
+def spec_key(record: BatteryRecord, version: str = "") -> Optional[str]:
+    """
+    Hash of the fields the overview prompt uses, MPN and manufacturer excluded.
+    None when the record has no spec fields, since the model can then only go on the MPN.
+    """
+    fields = (
+        _normalize_text(record.chemistry),
+        f"{record.voltage_v:g}" if record.voltage_v else "",
+        _normalize_text(record.capacity),
+        _normalize_text(record.form_factor),
+        _normalize_text(record.dimensions),
+        "" if record.rechargeable is None else str(record.rechargeable),
+    )
+    if not any(fields):
+        return None
+    return hashlib.sha256("\x1f".join((version,) + fields).encode("utf-8")).hexdigest()
+
+
+def _spec_text(record: BatteryRecord) -> str:
+    """The spec fields as the overview prompt shows them, lower-cased."""
+    texts = [record.chemistry, record.capacity, record.form_factor, record.dimensions]
+    if record.voltage_v:
+        texts += [f"{record.voltage_v:g}V", f"{record.voltage_v}V"]
+    return " ".join(text for text in texts if text).lower()
+
+
+def _replace(text: str, value: str, placeholder: str) -> str:
+    # Whole words only, any case: the model may change the case of an MPN it repeats
+    return re.sub(r"(?<![\w-])" + re.escape(value) + r"(?![\w-])", placeholder, text, flags=re.IGNORECASE)
+
+
+def to_template(overview: str, record: BatteryRecord) -> Optional[str]:
+    """
+    Replace the part's MPN and manufacturer in an overview with placeholders. None when
+    that cannot be done safely, i.e. the MPN or manufacturer text also appears in the
+    spec text ("3V" next to a 3 V voltage) and replacing it would mangle the specs.
+    """
+    specs = _spec_text(record)
+    identity = [record.mpn] + ([record.manufacturer] if record.manufacturer else [])
+    if any(value.lower() in specs for value in identity):
+        return None
+    template = _replace(overview, record.mpn, MPN_PLACEHOLDER)
+    if record.manufacturer:
+        template = _replace(template, record.manufacturer, MANUFACTURER_PLACEHOLDER)
+    return template
+
+
+def render(template: str, record: BatteryRecord) -> Optional[str]:
+    """
+    Fill a shared overview template in for a specific part. None when the template
+    names a manufacturer and the part has none, so it needs an overview of its own.
+    """
+    if MANUFACTURER_PLACEHOLDER in template and not record.manufacturer:
+        return None
+    return template.replace(MPN_PLACEHOLDER, record.mpn).replace(MANUFACTURER_PLACEHOLDER, record.manufacturer or "")
+
+
+def lookup(key: str) -> Optional[str]:
+    """Return the overview template for a spec key, checking memory then the cache database."""
+    template = _memory.get(key)
+    if template is None:
+        template = cache.get_overview(key)
+        if template is not None:
+            _memory.put(key, template)
+    with _stats_lock:
+        _stats["hits" if template is not None else "misses"] += 1
+    return template
+
+
+def store(key: str, template: str) -> None:
+    _memory.put(key, template)
+    cache.save_overview(key, template)
+    with _stats_lock:
+        _stats["stores"] += 1
+
+
+def note_coalesced() -> None:
+    """Count a miss that was answered by an equivalent part's in-flight request."""
+    with _stats_lock:
+        _stats["coalesced"] += 1
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters for the shared overview cache. Coalesced misses did not call the model either."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+    snapshot["memory_entries"] = len(_memory)
+    return snapshot
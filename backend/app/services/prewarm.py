@@ -0,0 +1,65 @@
+import importlib
+import threading
+import time
+from typing import Dict, List
+from app.core.logging import logger
+
+
+# Libraries only some routes need; they are imported on first use so that importing
+# the app stays fast, and loaded here in the background once the app has started
+LAZY_MODULES = ("openpyxl", "pandas", "pyarrow", "pyarrow.parquet")
+
+_ready = threading.Event()
+_pending: List[str] = ["startup"]
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def pending() -> List[str]:
+    """What the app is still waiting on before it reports ready."""
+    return list(_pending)
+
+
+def mark_ready() -> None:
+    _pending.clear()
+    _ready.set()
+
+
+def mark_not_ready(reason: str = "shutdown") -> None:
+    _ready.clear()
+    _pending[:] = [reason]
+
+
+def run() -> Dict[str, float]:
+    """
+    Import the lazily loaded libraries and configure the Gemini client, then mark the
+    app ready. Blocking; run it on a thread. Returns the seconds spent per module.
+    """
+    from app.services.gemini_client import _get_model
+
+    _pending[:] = list(LAZY_MODULES) + ["gemini"]
+    timings: Dict[str, float] = {}
+    for name in LAZY_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # Optional dependency; the routes that need it report the error themselves
+            logger.info(f"Prewarm: {name} is not installed")
+        except Exception as e:
+            logger.warning(f"Prewarm: importing {name} failed: {e}")
+        timings[name] = time.perf_counter() - started
+        _pending.remove(name)
+
+    started = time.perf_counter()
+    try:
+        _get_model()
+    except Exception as e:
+        logger.warning(f"Prewarm: Gemini client unavailable: {e}")
+    timings["gemini"] = time.perf_counter() - started
+
+    mark_ready()
+    logger.info(f"Prewarm done in {sum(timings.values()):.2f}s ({', '.join(f'{k} {v:.2f}s' for k, v in timings.items())})")
+    return timings
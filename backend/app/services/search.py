@@ -0,0 +1,270 @@
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from app.core.config import CACHE_DB_PATH
+from app.core.db import LocalConnection
+from app.services import cache
+from app.services.specs import parse_specs
+from app.core.logging import logger
+
+
+# Lives next to the records table in the cache database. Bump INDEX_VERSION when the
+# indexed columns or facet rules change; the index is then rebuilt from the cache
+INDEX_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_index (
+    id INTEGER PRIMARY KEY,
+    mpn TEXT NOT NULL UNIQUE,
+    manufacturer TEXT,
+    chemistry TEXT,
+    form_factor TEXT,
+    rechargeable INTEGER,
+    voltage_v REAL,
+    capacity_mah REAL,
+    wh REAL,
+    diameter_mm REAL,
+    length_mm REAL,
+    weight_g REAL,
+    temp_min_c REAL,
+    temp_max_c REAL
+);
+CREATE INDEX IF NOT EXISTS search_facets ON search_index (chemistry, form_factor, rechargeable, voltage_v, capacity_mah);
+CREATE INDEX IF NOT EXISTS search_voltage ON search_index (voltage_v);
+CREATE INDEX IF NOT EXISTS search_capacity ON search_index (capacity_mah);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_text USING fts5(mpn, title, overview, manufacturer);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Numeric columns that accept min/max filters and sorting
+RANGE_FIELDS = ("voltage_v", "capacity_mah", "wh", "diameter_mm", "length_mm", "weight_g", "temp_min_c", "temp_max_c")
+FACET_FIELDS = ("chemistry", "form_factor", "rechargeable")
+
+_COLUMNS = ("mpn", "manufacturer", "chemistry", "form_factor", "rechargeable") + RANGE_FIELDS
+
+# Spellings of the same chemistry collapse into one facet value
+_CHEMISTRY_ALIASES = {
+    "lithium-ion": "li-ion", "li-ion": "li-ion", "liion": "li-ion", "lithium-ion-polymer": "li-po",
+    "lithium-polymer": "li-po", "li-polymer": "li-po", "lipo": "li-po", "li-po": "li-po",
+    "lifepo4": "lifepo4", "lithium-iron-phosphate": "lifepo4", "lfp": "lifepo4",
+    "lithium": "lithium", "li": "lithium", "lithium-metal": "lithium", "li-mno2": "lithium",
+    "alkaline": "alkaline", "nimh": "nimh", "ni-mh": "nimh", "nicd": "nicd", "ni-cd": "nicd",
+    "lead-acid": "lead-acid", "sla": "lead-acid", "silver-oxide": "silver-oxide", "zinc-air": "zinc-air",
+}
+
+_db = LocalConnection(CACHE_DB_PATH, SCHEMA)
+_build_lock = threading.Lock()
+_built = False
+
+
+def chemistry_facet(value: Optional[str]) -> Optional[str]:
+    """Canonical chemistry facet value, e.g. "Lithium Ion" and "Li-ion" both give "li-ion"."""
+    if not value:
+        return None
+    key = re.sub(r"[\s_]+", "-", value.strip().lower())
+    return _CHEMISTRY_ALIASES.get(key, key)
+
+
+def form_factor_facet(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return " ".join(value.lower().split())
+
+
+def _conn():
+    global _built
+    if not _built:
+        with _build_lock:
+            if not _built:
+                conn = _db.get()
+                row = conn.execute("SELECT value FROM meta WHERE key = 'search_index_version'").fetchone()
+                if row is None or row["value"] != INDEX_VERSION:
+                    _rebuild(conn)
+                _built = True
+    return _db.get()
+
+
+def _index_row(mpn: str, record: Dict[str, Any]) -> tuple:
+    # Records cached before the numeric spec fields existed are parsed here
+    specs = record
+    if "capacity_mah" not in record:
+        specs = parse_specs(record.get("capacity"), record.get("dimensions"), record.get("weight"), record.get("operating_temp"))
+    rechargeable = record.get("rechargeable")
+    return (
+        mpn,
+        (record.get("manufacturer") or "").strip().casefold() or None,
+        chemistry_facet(record.get("chemistry")),
+        form_factor_facet(record.get("form_factor")),
+        None if rechargeable is None else int(bool(rechargeable)),
+        record.get("voltage_v"),
+        specs.get("capacity_mah"),
+        record.get("wh"),
+    ) + tuple(specs.get(field) for field in RANGE_FIELDS[3:])
+
+
+def _write(conn, records: Mapping[str, Dict[str, Any]], removed: Sequence[str]) -> None:
+    placeholders = ", ".join("?" * len(_COLUMNS))
+    updates = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:])
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        doomed = list(removed) + list(records)
+        for start in range(0, len(doomed), 500):
+            chunk = doomed[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM search_text WHERE rowid IN (SELECT id FROM search_index WHERE mpn IN ({marks}))", chunk)
+        conn.executemany("DELETE FROM search_index WHERE mpn = ?", [(mpn,) for mpn in removed])
+        conn.executemany(
+            f"INSERT INTO search_index ({', '.join(_COLUMNS)}) VALUES ({placeholders}) ON CONFLICT(mpn) DO UPDATE SET {updates}",
+            [_index_row(mpn, record) for mpn, record in records.items()],
+        )
+        conn.executemany(
+            "INSERT INTO search_text (rowid, mpn, title, overview, manufacturer) SELECT id, ?, ?, ?, ? FROM search_index WHERE mpn = ?",
+            [
+                (mpn, record.get("title") or "", record.get("overview") or "", record.get("manufacturer") or "", mpn)
+                for mpn, record in records.items()
+            ],
+        )
+
+
+def _rebuild(conn) -> None:
+    started = time.perf_counter()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM search_text")
+        conn.execute("DELETE FROM search_index")
+    count = 0
+    batch: Dict[str, Dict[str, Any]] = {}
+    for mpn, record in cache.iter_records():
+        batch[mpn] = record
+        if len(batch) >= 500:
+            _write(conn, batch, ())
+            count += len(batch)
+            batch = {}
+    _write(conn, batch, ())
+    count += len(batch)
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_index_version', ?)", (INDEX_VERSION,))
+    logger.info(f"Built search index over {count} record(s) in {time.perf_counter() - started:.2f}s")
+
+
+def rebuild() -> None:
+    """Rebuild the whole index from the cache."""
+    global _built
+    with _build_lock:
+        _rebuild(_db.get())
+        _built = True
+
+
+def index_records(records: Mapping[str, Dict[str, Any]], removed: Sequence[str] = ()) -> None:
+    """Apply cache writes to the index: upsert `records`, drop `removed`."""
+    if records or removed:
+        _write(_conn(), records, removed)
+
+
+def _match_query(text: str) -> Optional[str]:
+    # Every word must match, as a prefix; quoting keeps FTS operators out of user input
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def search(
+    q: Optional[str] = None,
+    chemistry: Optional[Iterable[str]] = None,
+    form_factor: Optional[Iterable[str]] = None,
+    manufacturer: Optional[str] = None,
+    rechargeable: Optional[bool] = None,
+    ranges: Optional[Mapping[str, Tuple[Optional[float], Optional[float]]]] = None,
+    sort: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Find cached records by full text (title, overview, MPN, manufacturer), facets and
+    numeric ranges ({field: (min, max)}, either bound optional). `sort` is a RANGE_FIELDS
+    name, "-" prefixed for descending; the default is relevance for text queries, else MPN.
+    Returns the total match count, one page of records and facet counts over all matches.
+    """
+    started = time.perf_counter()
+    joins = ""
+    where: List[str] = []
+    params: List[Any] = []
+
+    match = _match_query(q) if q else None
+    if match:
+        joins = " JOIN search_text ON search_text.rowid = s.id"
+        where.append("search_text MATCH ?")
+        params.append(match)
+    for column, values, facet in (("chemistry", chemistry, chemistry_facet), ("form_factor", form_factor, form_factor_facet)):
+        wanted = [facet(value) for value in values or () if value]
+        if wanted:
+            where.append(f"s.{column} IN ({','.join('?' * len(wanted))})")
+            params.extend(wanted)
+    if manufacturer:
+        where.append("s.manufacturer = ?")
+        params.append(manufacturer.strip().casefold())
+    if rechargeable is not None:
+        where.append("s.rechargeable = ?")
+        params.append(int(rechargeable))
+    for field, (low, high) in (ranges or {}).items():
+        if field not in RANGE_FIELDS:
+            raise ValueError(f"Unknown range field: {field}")
+        if low is not None:
+            where.append(f"s.{field} >= ?")
+            params.append(low)
+        if high is not None:
+            where.append(f"s.{field} <= ?")
+            params.append(high)
+
+    if sort:
+        field = sort.lstrip("-")
+        if field not in RANGE_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        # Parts without the value sort last either way
+        order = f"s.{field} IS NULL, s.{field} {'DESC' if sort.startswith('-') else 'ASC'}, s.mpn"
+    elif match:
+        order = "bm25(search_text), s.mpn"
+    else:
+        order = "s.mpn"
+
+    def source() -> str:
+        return f"FROM search_index s{joins}" + (f" WHERE {' AND '.join(where)}" if where else "")
+
+    conn = _conn()
+    mpns = [
+        row["mpn"]
+        for row in conn.execute(f"SELECT s.mpn {source()} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset])
+    ]
+    # One grouped pass gives the total and every facet's counts
+    total = 0
+    facets: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+    columns = ", ".join(f"s.{field}" for field in FACET_FIELDS)
+    for row in conn.execute(f"SELECT {columns}, COUNT(*) AS n {source()} GROUP BY {columns}", params):
+        total += row["n"]
+        for field in FACET_FIELDS:
+            value = row[field]
+            if value is None:
+                continue
+            if field == "rechargeable":
+                value = "yes" if value else "no"
+            facets[field][value] = facets[field].get(value, 0) + row["n"]
+    facets = {
+        field: dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)) for field, counts in facets.items()
+    }
+
+    found = cache.get_many(mpns)
+    return {
+        "total": total,
+        "results": [found[mpn] for mpn in mpns if mpn in found],
+        "facets": facets,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def _on_cache_write(upserted: Mapping[str, Dict[str, Any]], removed: Sequence[str]) -> None:
+    index_records(upserted, removed)
+
+
+cache.add_write_listener(_on_cache_write)
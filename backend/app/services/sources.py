@@ -0,0 +1,353 @@
+import asyncio
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import (
+    SOURCE_BREAKER_FAILURES,
+    SOURCE_BREAKER_RESET_SECONDS,
+    SOURCE_CACHE_SIZE,
+    SOURCE_CACHE_TTL_SECONDS,
+    SOURCE_TIMEOUT_SECONDS,
+)
+from app.services.cache import LRUCache
+from app.services.http_client import HttpClientPool
+from app.core.logging import logger
+
+
+# Sample deterministic data for demo
+STUB_DATA: Dict[str, Dict[str, Any]] = {
+    "CR2032": {
+        "title": "CR2032 3V Lithium Coin Cell Battery",
+        "chemistry": "Lithium",
+        "voltage_v": 3.0,
+        "capacity": "220mAh",
+        "form_factor": "Coin Cell",
+        "dimensions": "20mm x 3.2mm",
+        "rechargeable": False,
+        "operating_temp": "-30°C to +60°C",
+        "weight": "3.1g",
+        "source_urls": ["https://example.com/cr2032"],
+    },
+    "18650": {
+        "title": "18650 Lithium Ion Battery",
+        "chemistry": "Lithium-Ion",
+        "voltage_v": 3.7,
+        "capacity": "2600mAh",
+        "wh": 9.62,
+        "form_factor": "Cylindrical",
+        "dimensions": "18mm x 65mm",
+        "termination": "Button Top",
+        "rechargeable": True,
+        "operating_temp": "0°C to +45°C",
+        "weight": "45g",
+        "source_urls": ["https://example.com/18650"],
+    },
+    "AA": {
+        "title": "AA Alkaline Battery",
+        "chemistry": "Alkaline",
+        "voltage_v": 1.5,
+        "capacity": "2500mAh",
+        "form_factor": "AA",
+        "dimensions": "14.5mm x 50.5mm",
+        "rechargeable": False,
+        "operating_temp": "-18°C to +55°C",
+        "weight": "23g",
+        "source_urls": ["https://example.com/aa"],
+    },
+}
+
+# Candidate fields that accumulate across sources instead of first-wins
+LIST_FIELDS = ("source_urls", "warnings")
+
+
+class CandidateSource(ABC):
+    """
+    Base class for candidate sources (distributor APIs, datasheet scrapers, ...).
+    Subclasses implement `fetch` and may override the per-source settings below.
+    """
+
+    name = "source"
+    timeout: float = SOURCE_TIMEOUT_SECONDS
+    cache_ttl: float = SOURCE_CACHE_TTL_SECONDS
+
+    @abstractmethod
+    async def fetch(self, mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+        """Return raw candidate fields for the part, or {} if the source has nothing."""
+
+    def known_mpns(self) -> Iterable[str]:
+        """MPNs the source is known to hold, if it can list them cheaply (used for fuzzy matching)."""
+        return ()
+
+
+class StubSource(CandidateSource):
+    """Deterministic local data for the demo MPNs."""
+
+    name = "stub"
+
+    def __init__(self, data: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.data = STUB_DATA if data is None else data
+
+    async def fetch(self, mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+        found = self.data.get(mpn.upper())
+        return dict(found) if found else {}
+
+    def known_mpns(self) -> Iterable[str]:
+        return self.data.keys()
+
+
+class SimulatedSource(StubSource):
+    """Stub source with artificial latency and failures, for tests and benchmarks."""
+
+    def __init__(
+        self,
+        name: str = "simulated",
+        data: Optional[Dict[str, Dict[str, Any]]] = None,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__(data)
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def fetch(self, mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name} simulated failure")
+        return await super().fetch(mpn, manufacturer)
+
+
+class HttpSource(CandidateSource):
+    """Base for sources that call HTTP APIs through the shared, app-lifetime client pool."""
+
+    @property
+    def http(self) -> HttpClientPool:
+        if _http is None:
+            raise RuntimeError("HTTP client pool not started")
+        return _http
+
+
+class JsonApiSource(HttpSource):
+    """
+    Source backed by a JSON API that answers GET `url_template` (with "{mpn}" and
+    "{manufacturer}" filled in) with an object of candidate fields; 404 means no data.
+    """
+
+    def __init__(self, name: str, url_template: str, timeout: Optional[float] = None):
+        self.name = name
+        self.url_template = url_template
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def fetch(self, mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+        url = self.url_template.format(mpn=quote(mpn, safe=""), manufacturer=quote(manufacturer, safe=""))
+        response = await self.http.get(url)
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        data = response.json()
+        return data if isinstance(data, dict) else {}
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = SOURCE_BREAKER_FAILURES, reset_timeout: float = SOURCE_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class SourceRunner:
+    """Runs one source with its result cache and circuit breaker. Used from the sources event loop only."""
+
+    def __init__(self, source: CandidateSource):
+        self.source = source
+        self.breaker = CircuitBreaker()
+        self.results = LRUCache(SOURCE_CACHE_SIZE)
+        self.stats = {"calls": 0, "cache_hits": 0, "failures": 0, "timeouts": 0, "rejected": 0}
+
+    def cached(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            self.results.pop(key)
+            return None
+        self.stats["cache_hits"] += 1
+        return data
+
+    async def call(self, mpn: str, manufacturer: str) -> Optional[Dict[str, Any]]:
+        """Fetch from the source, caching successes. None when it failed or the breaker is open."""
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            return None
+        self.stats["calls"] += 1
+        try:
+            # Hard cap so a hung source cannot pile up background tasks
+            data = await asyncio.wait_for(self.source.fetch(mpn, manufacturer), self.source.timeout * 5)
+        except Exception as e:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            logger.warning(f"Source {self.source.name} failed for {mpn}: {e!r}")
+            return None
+        self.breaker.record_success()
+        self.results.put((mpn, manufacturer), (time.monotonic() + self.source.cache_ttl, data))
+        return data
+
+
+_runners: List[SourceRunner] = [SourceRunner(StubSource())]
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_background: set = set()
+_http: Optional[HttpClientPool] = None
+
+
+def set_sources(sources: Sequence[CandidateSource]) -> None:
+    """Replace the configured sources. Order is priority: earlier sources win field conflicts."""
+    global _runners
+    _runners = [SourceRunner(source) for source in sources]
+
+
+def register_source(source: CandidateSource) -> None:
+    """Add a source after the existing ones (lowest priority)."""
+    _runners.append(SourceRunner(source))
+
+
+def known_mpns() -> List[str]:
+    """MPNs listed by every configured source."""
+    return [mpn for runner in _runners for mpn in runner.source.known_mpns()]
+
+
+def source_stats() -> Dict[str, Dict[str, Any]]:
+    return {runner.source.name: dict(runner.stats, breaker=runner.breaker.state) for runner in _runners}
+
+
+def http_stats() -> Optional[Dict[str, Any]]:
+    return _http.stats() if _http is not None else None
+
+
+async def start_http_client() -> HttpClientPool:
+    """Create the shared HTTP client pool and inject it into HTTP sources (called at app startup)."""
+    global _http
+
+    async def create() -> HttpClientPool:
+        return HttpClientPool()
+
+    # Connections belong to the sources event loop, so the pool is created there
+    _http = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(create(), _get_loop()))
+    logger.info(f"HTTP client pool started (http2={_http.http2})")
+    return _http
+
+
+async def stop_http_client() -> None:
+    """Close the shared HTTP client pool (called at app shutdown)."""
+    global _http
+    if _http is not None:
+        pool, _http = _http, None
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(pool.aclose(), _get_loop()))
+
+
+def merge_candidates(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-source candidates in priority order: first non-empty value wins, list fields accumulate."""
+    merged: Dict[str, Any] = {}
+    for data in results:
+        for key, value in data.items():
+            if key in LIST_FIELDS:
+                bucket = merged.setdefault(key, [])
+                bucket.extend(v for v in value if v not in bucket)
+            elif value is not None and value != "" and merged.get(key) in (None, ""):
+                merged[key] = value
+    return merged
+
+
+async def gather_candidates(mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+    """
+    Query every source concurrently and merge what arrives within each source's timeout.
+    A source that misses its timeout keeps running in the background so its answer
+    lands in the source cache for the next lookup, but the merge does not wait for it.
+    """
+    runners = list(_runners)
+    key = (mpn, manufacturer)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(runners)
+    waiting = {}
+    for i, runner in enumerate(runners):
+        cached = runner.cached(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            waiting[i] = asyncio.ensure_future(runner.call(mpn, manufacturer))
+
+    async def settle(i: int, task: asyncio.Future) -> None:
+        done, _ = await asyncio.wait({task}, timeout=runners[i].source.timeout)
+        if done:
+            results[i] = task.result()
+        else:
+            runners[i].stats["timeouts"] += 1
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+
+    await asyncio.gather(*(settle(i, task) for i, task in waiting.items()))
+
+    merged = merge_candidates([data for data in results if data])
+    if manufacturer:
+        merged["manufacturer"] = manufacturer
+    return merged
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="candidate-sources", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def fetch_candidates_blocking(mpn: str, manufacturer: str = "") -> Dict[str, Any]:
+    """Run `gather_candidates` from a worker thread on the shared sources event loop."""
+    return asyncio.run_coroutine_threadsafe(gather_candidates(mpn, manufacturer), _get_loop()).result()
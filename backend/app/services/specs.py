@@ -0,0 +1,371 @@
+import re
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Numeric spec fields derived from the free-text ones
+SPEC_FIELDS = ("capacity_mah", "diameter_mm", "length_mm", "weight_g", "temp_min_c", "temp_max_c")
+
+# Distinct spec strings are few even in large catalogs, so parsed values are memoized
+_CACHE_SIZE = 65536
+
+_NUMBER = r"(\d+(?:[.,]\d+)?|\.\d+)"
+
+# "2600mAh", "2.6 Ah", "2,600 mAh"; a number without a unit is taken as mAh only when
+# it is the whole string, so voltages and model numbers ("3.7V 2600mAh") are skipped
+_CAPACITY = re.compile(_NUMBER + r"\s*(m?ah)\b", re.IGNORECASE)
+_BARE_NUMBER = re.compile(r"\s*" + _NUMBER + r"\s*")
+
+# "18mm x 65mm", "20 x 3.2 mm", "Ø14.5 × 50.5mm", "0.71in x 1.97in"; a third term marks a prismatic cell
+# Units fold case as ASCII only ("(?a:"), so that "İn" is not read as inches
+_LENGTH = _NUMBER + r"\s*(?a:(mm|cm|in|\"))?"
+_DIMENSIONS = re.compile(
+    r"[Øø⌀]?\s*" + _LENGTH + r"\s*[x×*]\s*[Øø⌀]?\s*" + _LENGTH + r"(?:\s*[x×*]\s*" + _LENGTH + r")?",
+    re.IGNORECASE,
+)
+
+# "45g", "3.1 grams", "0.05 kg", "1.6oz"; as with capacity, a bare number counts (as
+# grams) only when it is the whole string, so "0-45C" or "1/2 AA" give no weight
+_WEIGHT = re.compile(_NUMBER + r"\s*(?a:(kg|mg|g|grams?|oz|ounces?|lbs?))\b", re.IGNORECASE)
+
+# "-30°C to +60°C", "-20 ~ 60 °C", "0-45C", "-4°F to 140°F"
+_TEMPERATURE = re.compile(
+    r"([-+−–]?\s*\d+(?:\.\d+)?)\s*°?\s*([CF])?\s*(?:to|~|\.\.|…|-|–|—)\s*([-+−–]?\s*\d+(?:\.\d+)?)\s*°?\s*([CF])?",
+    re.IGNORECASE,
+)
+
+# The same patterns in RE2 syntax, for the Arrow kernels of the column-wise parsers.
+# Kernels see ASCII text plus the symbols of their own pattern (see map_column), where
+# RE2 and Python agree. RE2's \s lacks \v and \x1c-\x1f, which Python's \s matches, so
+# it is spelled out
+SPACE_RE2 = "[\t\n\x0b\x0c\r \x1c-\x1f]"
+_S = SPACE_RE2 + "*"
+
+
+def _number_re2(name: str) -> str:
+    return f"(?P<{name}>" + r"\d+(?:[.,]\d+)?|\.\d+)"
+
+
+def _length_re2(n: int) -> str:
+    return _number_re2(f"number{n}") + _S + f'(?P<unit{n}>mm|cm|in|")?'
+
+
+def _signed_re2(name: str) -> str:
+    return f"(?P<{name}>[-+−–]?" + _S + r"\d+(?:\.\d+)?)"
+
+
+_CAPACITY_RE2 = "(?i)" + _number_re2("number") + _S + r"(?P<unit>m?ah)\b"
+_BARE_NUMBER_RE2 = "^" + _S + _number_re2("number") + _S + "$"
+_DIMENSIONS_RE2 = (
+    "(?i)[Øø⌀]?" + _S + _length_re2(1) + _S + "[x×*]" + _S + "[Øø⌀]?" + _S + _length_re2(2)
+    + "(?:" + _S + "[x×*]" + _S + _length_re2(3) + ")?"
+)
+_WEIGHT_RE2 = "(?i)" + _number_re2("number") + _S + r"(?P<unit>kg|mg|g|grams?|oz|ounces?|lbs?)\b"
+_TEMPERATURE_RE2 = (
+    "(?i)" + _signed_re2("low") + _S + "°?" + _S + "(?P<low_unit>[CF])?" + _S + r"(?:to|~|\.\.|…|-|–|—)" + _S
+    + _signed_re2("high") + _S + "°?" + _S + "(?P<high_unit>[CF])?"
+)
+# Non-ASCII characters each kernel's pattern handles as Python does
+_DIMENSIONS_SYMBOLS = "Øø⌀×"
+_TEMPERATURE_SYMBOLS = "°−–…—"
+
+_LENGTH_TO_MM = {"mm": 1.0, "cm": 10.0, "in": 25.4, '"': 25.4}
+_WEIGHT_TO_G = {"g": 1.0, "gram": 1.0, "grams": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.3495, "ounce": 28.3495, "ounces": 28.3495, "lb": 453.592, "lbs": 453.592}
+
+
+def _number(text: str) -> float:
+    # Comma as thousands separator ("2,600") or decimal separator ("2,6")
+    if "," in text:
+        head, _, tail = text.partition(",")
+        text = head + tail if len(tail) == 3 else head + "." + tail
+    return float(text)
+
+
+def _signed(text: str) -> float:
+    text = "".join(text.split()).replace("−", "-").replace("–", "-")
+    return float(text)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_capacity_mah(text: str) -> Optional[float]:
+    """Capacity in mAh from strings like "2600mAh", "3.7V 2.6Ah" or a bare "2600"."""
+    match = _CAPACITY.search(text)
+    if match is None:
+        bare = _BARE_NUMBER.fullmatch(text)
+        return _number(bare.group(1)) if bare is not None else None
+    value = _number(match.group(1))
+    if match.group(2)[0] in "aA":
+        value *= 1000.0
+    return value
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_dimensions_mm(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    (diameter, length) in mm. Round cells are listed as "<diameter> x <length>"; for
+    "L x W x H" only the length is known.
+    """
+    match = _DIMENSIONS.search(text)
+    if match is None:
+        return None, None
+    first, first_unit, second, second_unit, third, third_unit = match.groups()
+    # "20 x 3.2 mm": a unit given once applies to every term
+    unit = (third_unit or second_unit or first_unit or "mm").lower()
+    length = round(_number(first) * _LENGTH_TO_MM[(first_unit or unit).lower()], 2)
+    if third is not None:
+        return None, length
+    return length, round(_number(second) * _LENGTH_TO_MM[(second_unit or unit).lower()], 2)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_weight_g(text: str) -> Optional[float]:
+    """Weight in grams from strings like "45g" or "0.05 kg"; a bare "45" is taken as grams."""
+    match = _WEIGHT.search(text)
+    if match is None:
+        bare = _BARE_NUMBER.fullmatch(text)
+        return round(_number(bare.group(1)), 2) if bare is not None else None
+    return round(_number(match.group(1)) * _WEIGHT_TO_G[match.group(2).lower()], 2)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_temperature_c(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """(min, max) in °C from range strings such as "-30°C to +60°C"; °F is converted."""
+    match = _TEMPERATURE.search(text)
+    if match is None:
+        return None, None
+    low, low_unit, high, high_unit = match.groups()
+    unit = (high_unit or low_unit or "C").upper()
+    low_value, high_value = _signed(low), _signed(high)
+    if unit == "F":
+        low_value = (low_value - 32) * 5 / 9
+        high_value = (high_value - 32) * 5 / 9
+    return round(low_value, 1), round(high_value, 1)
+
+
+def with_unit(value: Any, unit: str) -> Any:
+    """
+    `value` with `unit` appended when it is a bare number, e.g. 2.6 from a "Capacity (Ah)"
+    column becomes "2.6 Ah". Anything else is returned unchanged.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{value!r} {unit}"
+    if isinstance(value, str) and _BARE_NUMBER.fullmatch(value):
+        return f"{value} {unit}"
+    return value
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return None
+
+
+def _parse(parse: Any, value: Any) -> Any:
+    text = _as_text(value)
+    return parse(text) if text else None
+
+
+def _parse_pair(parse: Any, value: Any) -> Tuple[Optional[float], Optional[float]]:
+    text = _as_text(value)
+    return parse(text) if text else (None, None)
+
+
+def parse_specs(capacity: Any, dimensions: Any, weight: Any, operating_temp: Any) -> Dict[str, Optional[float]]:
+    """Numeric SPEC_FIELDS parsed from the free-text capacity, dimensions, weight and temperature values."""
+    diameter, length = _parse_pair(parse_dimensions_mm, dimensions)
+    temp_min, temp_max = _parse_pair(parse_temperature_c, operating_temp)
+    return {
+        "capacity_mah": _parse(parse_capacity_mah, capacity),
+        "diameter_mm": diameter,
+        "length_mm": length,
+        "weight_g": _parse(parse_weight_g, weight),
+        "temp_min_c": temp_min,
+        "temp_max_c": temp_max,
+    }
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def map_column(
+    column: Sequence[Any],
+    scalar: Callable[[Any], Any],
+    kernel: Optional[Callable[[Any], List[Any]]] = None,
+    symbols: str = "",
+) -> List[Any]:
+    """
+    [scalar(value) for value in column], with the string cells parsed by an Arrow compute
+    `kernel` when pyarrow is installed. The kernel takes an Arrow string array of each
+    distinct string in the column that is ASCII apart from `symbols` (nulls stand for
+    the others) and returns a list of the same results as `scalar`, with None where it
+    has no answer. Other cells (numbers, other non-ASCII text, kernel Nones) go through
+    `scalar`, so the result does not depend on pyarrow being there. Without a kernel,
+    `scalar` runs once per distinct string.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        return [scalar(value) for value in column]
+    pc = pa.compute
+    try:
+        strings = pa.array(column)
+        only_text = strings.type in (pa.string(), pa.null())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        only_text = False
+    if not only_text:
+        strings = pa.array([value if type(value) is str else None for value in column], pa.string())
+    encoded = pc.dictionary_encode(strings.cast(pa.string()))
+    distinct = encoded.dictionary
+    texts = distinct.to_pylist()
+    parsed: List[Any] = [None] * len(texts)
+    if kernel is not None:
+        if symbols:
+            safe = pc.invert(pc.match_substring_regex(distinct, "[^\x00-\x7f" + symbols + "]"))
+        else:
+            safe = pc.string_is_ascii(distinct)
+        parsed = kernel(pc.if_else(safe, distinct, None))
+    parsed = [scalar(text) if result is None else result for text, result in zip(texts, parsed)]
+    if only_text:
+        # Null cells point one past the distinct strings, at scalar(None)
+        parsed.append(scalar(None))
+        return list(map(parsed.__getitem__, pc.fill_null(encoded.indices, len(texts)).to_pylist()))
+    return [scalar(value) if i is None else parsed[i] for i, value in zip(encoded.indices.to_pylist(), column)]
+
+
+def _unit_kernel(unit: str, strings: Any) -> List[Any]:
+    import pyarrow.compute as pc
+
+    bare = pc.match_substring_regex(strings, _BARE_NUMBER_RE2)
+    return pc.if_else(bare, pc.binary_join_element_wise(strings, unit, " "), strings).to_pylist()
+
+
+def with_unit_column(column: Sequence[Any], unit: str) -> List[Any]:
+    """Column-wise with_unit."""
+    return map_column(column, lambda value: with_unit(value, unit), partial(_unit_kernel, unit))
+
+
+# The kernels below reproduce the scalar parsers exactly on the text they are given
+
+
+def _group(pc: Any, match: Any, name: str) -> Any:
+    # A group that did not take part in the match is "" in Arrow and None in Python
+    value = pc.struct_field(match, name)
+    return pc.if_else(pc.equal(value, ""), None, value)
+
+
+def _to_number(pc: Any, number: Any) -> Any:
+    # _number over an Arrow string array
+    number = pc.replace_substring_regex(number, r"^(\d+),(\d{3})$", r"\1\2")
+    return pc.cast(pc.replace_substring(number, ",", "."), "float64")
+
+
+def _factor(pa: Any, units: Any, factors: Dict[str, float]) -> Any:
+    return pa.compute.take(pa.array(list(factors.values())), pa.compute.index_in(units, value_set=pa.array(list(factors))))
+
+
+def _rounded(pa: Any, values: Any, digits: int) -> List[Optional[float]]:
+    """[round(value, digits) for value in values], rounded in Arrow where that gives the same."""
+    pc = pa.compute
+    scale = 10.0 ** digits
+    scaled = pc.multiply(values, scale)
+    result = pc.divide(pc.round(scaled, round_mode="half_to_even"), scale)
+    # Arrow rounds the scaled product, Python the exact value. They can only disagree
+    # next to a tie, or once the product has lost precision; those go through round()
+    fraction = pc.subtract(scaled, pc.floor(scaled))
+    near_tie = pc.less(pc.abs(pc.subtract(fraction, 0.5)), 1e-6)
+    unsure = pc.fill_null(pc.or_(near_tie, pc.greater_equal(pc.abs(values), 1e6)), False)
+    positions = pc.indices_nonzero(unsure)
+    if len(positions):
+        exact = [round(value, digits) for value in pc.take(values, positions).to_pylist()]
+        result = pc.replace_with_mask(result, unsure, pa.array(exact, pa.float64()))
+    return result.to_pylist()
+
+
+def _capacity_kernel(strings: Any) -> List[Any]:
+    """parse_capacity_mah over an Arrow string array."""
+    import pyarrow.compute as pc
+
+    match = pc.extract_regex(strings, _CAPACITY_RE2)
+    bare = pc.extract_regex(strings, _BARE_NUMBER_RE2)
+    value = _to_number(pc, pc.coalesce(_group(pc, match, "number"), _group(pc, bare, "number")))
+    in_ah = pc.fill_null(pc.starts_with(_group(pc, match, "unit"), "a", ignore_case=True), False)
+    return pc.if_else(in_ah, pc.multiply(value, 1000.0), value).to_pylist()
+
+
+def _weight_kernel(strings: Any) -> List[Any]:
+    """parse_weight_g over an Arrow string array."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    match = pc.extract_regex(strings, _WEIGHT_RE2)
+    bare = pc.extract_regex(strings, _BARE_NUMBER_RE2)
+    value = _to_number(pc, pc.coalesce(_group(pc, match, "number"), _group(pc, bare, "number")))
+    factor = _factor(pa, pc.utf8_lower(_group(pc, match, "unit")), _WEIGHT_TO_G)
+    return _rounded(pa, pc.if_else(pc.is_valid(factor), pc.multiply(value, factor), value), 2)
+
+
+def _dimensions_kernel(strings: Any) -> List[Any]:
+    """parse_dimensions_mm over an Arrow string array."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    match = pc.extract_regex(strings, _DIMENSIONS_RE2)
+    units = [pc.utf8_lower(_group(pc, match, f"unit{n}")) for n in (1, 2, 3)]
+    unit = pc.coalesce(units[2], units[1], units[0], pa.scalar("mm"))
+    first = _rounded(pa, pc.multiply(_to_number(pc, _group(pc, match, "number1")), _factor(pa, pc.coalesce(units[0], unit), _LENGTH_TO_MM)), 2)
+    second = _rounded(pa, pc.multiply(_to_number(pc, _group(pc, match, "number2")), _factor(pa, pc.coalesce(units[1], unit), _LENGTH_TO_MM)), 2)
+    prismatic = pc.is_valid(_group(pc, match, "number3")).to_pylist()
+    return [
+        None if text is None else (None, None) if a is None else (None, a) if third else (a, b)
+        for text, a, b, third in zip(strings.to_pylist(), first, second, prismatic)
+    ]
+
+
+def _temperature_kernel(strings: Any) -> List[Any]:
+    """parse_temperature_c over an Arrow string array."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    match = pc.extract_regex(strings, _TEMPERATURE_RE2)
+    unit = pc.utf8_upper(pc.coalesce(_group(pc, match, "high_unit"), _group(pc, match, "low_unit"), pa.scalar("C")))
+    fahrenheit = pc.equal(unit, "F")
+
+    def celsius(name: str) -> List[Optional[float]]:
+        text = pc.replace_substring_regex(_group(pc, match, name), SPACE_RE2, "")
+        value = pc.cast(pc.replace_substring(pc.replace_substring(text, "−", "-"), "–", "-"), "float64")
+        return _rounded(pa, pc.if_else(fahrenheit, pc.divide(pc.multiply(pc.subtract(value, 32), 5), 9), value), 1)
+
+    return [
+        None if text is None else (None, None) if low is None else (low, high)
+        for text, low, high in zip(strings.to_pylist(), celsius("low"), celsius("high"))
+    ]
+
+
+def parse_spec_columns(
+    capacity: Sequence[Any], dimensions: Sequence[Any], weight: Sequence[Any], operating_temp: Sequence[Any]
+) -> Dict[str, List[Optional[float]]]:
+    """Column-wise parse_specs: the same values, one list per SPEC_FIELDS entry."""
+    dimension_pairs = map_column(dimensions, partial(_parse_pair, parse_dimensions_mm), _dimensions_kernel, _DIMENSIONS_SYMBOLS)
+    temp_pairs = map_column(operating_temp, partial(_parse_pair, parse_temperature_c), _temperature_kernel, _TEMPERATURE_SYMBOLS)
+    return {
+        "capacity_mah": map_column(capacity, partial(_parse, parse_capacity_mah), _capacity_kernel),
+        "diameter_mm": [pair[0] for pair in dimension_pairs],
+        "length_mm": [pair[1] for pair in dimension_pairs],
+        "weight_g": map_column(weight, partial(_parse, parse_weight_g), _weight_kernel),
+        "temp_min_c": [pair[0] for pair in temp_pairs],
+        "temp_max_c": [pair[1] for pair in temp_pairs],
+    }
+
+
+def derive_wh(wh: Optional[float], voltage_v: Optional[float], capacity_mah: Optional[float]) -> Optional[float]:
+    """Energy in Wh, computed as V × mAh / 1000 when the source did not give it."""
+    if wh is not None or not voltage_v or not capacity_mah:
+        return wh
+    return round(voltage_v * capacity_mah / 1000.0, 2)
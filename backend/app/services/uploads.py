@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+from app.core.config import JOBS_DB_PATH
+from app.core.db import LocalConnection
+from app.core.metrics import UPLOADS
+from app.core.serialization import dumps_str, loads
+from app.models.battery import EnrichItem, EnrichResult
+from app.services.cache import CacheEntry
+from app.services.dedup import DedupPlan, canonical_key
+from app.services.enrich import PIPELINE_VERSION
+from app.services.excel_io import iter_input
+from app.services.executor import as_requested, enrich_many
+from app.core.logging import logger
+
+
+# Customers re-upload the same BOM with a few changed lines. Parses are stored by the
+# SHA-256 of the file bytes, the latest version of each (customer, file name) is
+# remembered, and its enrichment results are kept per canonical (MPN, manufacturer)
+# key so that enriching a new version only runs the parts that are new or changed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    sha256 TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS upload_versions (
+    customer TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (customer, filename)
+);
+CREATE INDEX IF NOT EXISTS upload_versions_sha256 ON upload_versions (customer, sha256);
+CREATE TABLE IF NOT EXISTS upload_results (
+    customer TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mpn TEXT NOT NULL,
+    manufacturer TEXT NOT NULL,
+    result TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (customer, filename, mpn, manufacturer)
+);
+"""
+
+_db = LocalConnection(JOBS_DB_PATH, SCHEMA)
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+Row = Tuple[str, str]
+
+
+def fingerprint(fileobj: BinaryIO) -> str:
+    """SHA-256 of a file object's bytes. The file is left rewound."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(_HASH_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _load_rows(sha256: str) -> Optional[List[Row]]:
+    row = _db.get().execute("SELECT rows FROM uploads WHERE sha256 = ?", (sha256,)).fetchone()
+    return [tuple(pair) for pair in loads(row["rows"])] if row is not None else None
+
+
+def _save_version(customer: str, filename: str, sha256: str, rows: Sequence[Row], parsed: bool) -> Optional[str]:
+    """Make `sha256` the latest version of the file and return the previous version's hash."""
+    now = time.time()
+    conn = _db.get()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if parsed:
+            conn.execute(
+                "INSERT OR IGNORE INTO uploads (sha256, filename, rows, row_count, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, filename, dumps_str(rows), len(rows), now),
+            )
+        row = conn.execute(
+            "SELECT sha256 FROM upload_versions WHERE customer = ? AND filename = ?", (customer, filename)
+        ).fetchone()
+        previous = row["sha256"] if row is not None else None
+        conn.execute(
+            "INSERT INTO upload_versions (customer, filename, sha256, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(customer, filename) DO UPDATE SET sha256 = excluded.sha256, updated_at = excluded.updated_at",
+            (customer, filename, sha256, now),
+        )
+    return previous
+
+
+def _prune(sha256: str) -> None:
+    # Keep a parse only while some file's latest version still points at it
+    _db.get().execute(
+        "DELETE FROM uploads WHERE sha256 = ? AND NOT EXISTS (SELECT 1 FROM upload_versions WHERE sha256 = ?)",
+        (sha256, sha256),
+    )
+
+
+def diff_rows(previous: Sequence[Row], current: Sequence[Row]) -> Dict[str, Any]:
+    """
+    Compare two versions of a BOM by canonical (MPN, manufacturer) key. A part whose
+    MPN is new is "added"; a key that is new but whose MPN was already there (the
+    manufacturer changed) is "changed"; MPNs no longer present are "removed".
+    """
+    before = {canonical_key(EnrichItem(mpn=mpn, manufacturer=mfr)): mpn for mpn, mfr in previous}
+    after: Dict[Tuple[str, str], str] = {}
+    for mpn, mfr in current:
+        after.setdefault(canonical_key(EnrichItem(mpn=mpn, manufacturer=mfr)), mpn)
+    before_mpns = {key[0] for key in before}
+    after_mpns = {key[0] for key in after}
+
+    added, changed = [], []
+    for key, mpn in after.items():
+        if key not in before:
+            (changed if key[0] in before_mpns else added).append(mpn)
+    removed = list(dict.fromkeys(mpn for key, mpn in before.items() if key[0] not in after_mpns))
+    return {
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "unchanged": sum(1 for key in after if key in before),
+    }
+
+
+def scan(fileobj: BinaryIO, filename: str, customer: str = "") -> Dict[str, Any]:
+    """
+    Parse an uploaded file, or return the stored parse if these exact bytes were seen
+    before, and diff it against the previous version of the same customer's file.
+    """
+    sha256 = fingerprint(fileobj)
+    rows = _load_rows(sha256)
+    identical = rows is not None
+    if rows is None:
+        rows = [(item["mpn"], item["manufacturer"]) for item in iter_input(fileobj, filename)]
+
+    previous = _save_version(customer, filename, sha256, rows, parsed=not identical)
+    previous_rows: Sequence[Row] = []
+    if previous == sha256:
+        previous_rows = rows
+    elif previous is not None:
+        previous_rows = _load_rows(previous) or []
+        _prune(previous)
+
+    UPLOADS.inc(result="identical" if identical else "changed" if previous is not None else "new")
+    diff = diff_rows(previous_rows, rows)
+    logger.info(
+        f"Upload {filename} ({sha256[:12]}): {len(rows)} rows, {'stored parse' if identical else 'parsed'}, "
+        f"{len(diff['added'])} added, {len(diff['changed'])} changed, {len(diff['removed'])} removed"
+    )
+    return {"fingerprint": sha256, "identical": identical, "previous": previous, "rows": rows, "diff": diff}
+
+
+def _filename_for(customer: str, sha256: str) -> Optional[str]:
+    row = _db.get().execute(
+        "SELECT filename FROM upload_versions WHERE customer = ? AND sha256 = ? ORDER BY updated_at DESC LIMIT 1",
+        (customer, sha256),
+    ).fetchone()
+    return row["filename"] if row is not None else None
+
+
+def _load_results(customer: str, filename: str) -> Dict[Tuple[str, str], EnrichResult]:
+    """Stored results of the file that are still fresh (same pipeline version, within the cache TTL)."""
+    rows = _db.get().execute(
+        "SELECT mpn, manufacturer, result, version, created_at FROM upload_results WHERE customer = ? AND filename = ?",
+        (customer, filename),
+    ).fetchall()
+    results = {}
+    for row in rows:
+        if CacheEntry(data={}, created_at=row["created_at"], version=row["version"]).is_fresh(PIPELINE_VERSION):
+            results[(row["mpn"], row["manufacturer"])] = EnrichResult.model_validate(loads(row["result"]))
+    return results
+
+
+def _save_results(
+    customer: str, filename: str, keys: Sequence[Tuple[str, str]], enriched: Sequence[Tuple[Tuple[str, str], EnrichResult]]
+) -> None:
+    """Store newly enriched results and drop those of parts no longer in the file. Reused results keep their age."""
+    now = time.time()
+    current = set(keys)
+    conn = _db.get()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        stored = conn.execute(
+            "SELECT mpn, manufacturer FROM upload_results WHERE customer = ? AND filename = ?", (customer, filename)
+        ).fetchall()
+        conn.executemany(
+            "DELETE FROM upload_results WHERE customer = ? AND filename = ? AND mpn = ? AND manufacturer = ?",
+            (
+                (customer, filename, row["mpn"], row["manufacturer"])
+                for row in stored
+                if (row["mpn"], row["manufacturer"]) not in current
+            ),
+        )
+        # Failed parts are not kept, so the next version retries them
+        conn.executemany(
+            "INSERT OR REPLACE INTO upload_results (customer, filename, mpn, manufacturer, result, version, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (customer, filename, mpn, mfr, result.model_dump_json(), PIPELINE_VERSION, now)
+                for (mpn, mfr), result in enriched
+                if result.status == "success"
+            ),
+        )
+
+
+async def enrich_upload(sha256: str, customer: str = "") -> Optional[Tuple[List[EnrichResult], DedupPlan, int]]:
+    """
+    Enrich every row of the customer's upload, running only the parts without a fresh
+    stored result from an earlier version of the same file. Returns (results in row
+    order, dedup plan, parts reused), or None if the upload is not the latest version
+    of one of the customer's files.
+    """
+    filename = await asyncio.to_thread(_filename_for, customer, sha256)
+    rows = await asyncio.to_thread(_load_rows, sha256) if filename is not None else None
+    if rows is None:
+        return None
+
+    items = [EnrichItem(mpn=mpn, manufacturer=mfr) for mpn, mfr in rows]
+    plan = DedupPlan(items)
+    keys = [canonical_key(item) for item in plan.unique_items]
+    stored = await asyncio.to_thread(_load_results, customer, filename)
+    unique_results: List[Optional[EnrichResult]] = [stored.get(key) for key in keys]
+    missing = [i for i, result in enumerate(unique_results) if result is None]
+
+    enriched = await enrich_many([plan.unique_items[i] for i in missing])
+    for i, result in zip(missing, enriched):
+        unique_results[i] = result
+    await asyncio.to_thread(
+        _save_results, customer, filename, keys, [(keys[i], result) for i, result in zip(missing, enriched)]
+    )
+
+    reused = plan.unique - len(missing)
+    logger.info(f"Enriched upload {filename} ({sha256[:12]}): {len(missing)} part(s) enriched, {reused} reused")
+    return [as_requested(result, item) for result, item in zip(plan.fan_out(unique_results), items)], plan, reused
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import Response
-from app.models.battery import EnrichRequest, EnrichResponse, EnrichResult, ExportRequest
-from app.services.excel_io import read_input
-from app.services.enrich import enrich_item
-from app.services.export_jameco import export_to_jameco
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from app.models.battery import CachedExportRequest, EnrichItem, EnrichRequest, EnrichResponse, EnrichStats, ExportRequest, SearchResponse
+from app.models.job import JobResultsPage, JobStatus, JobSubmitResponse
+from app.core import metrics
+from app.core.serialization import dumps_str
+from app.services.cache import iter_many
+from app.services.dedup import canonical_mpn
+from app.services.excel_io import iter_input
+from app.services.executor import enrich_deduplicated
+from app.services.export_jameco import stream_jameco, trusted_records
+from app.services import jobs, overview_cache, prewarm, search, sources, uploads
 from app.core.logging import logger
 
 router = APIRouter()
@@ -15,61 +23,222 @@ async def health():
     return {"status": "ok"}
 
 
+@router.get("/ready")
+async def ready():
+    """Readiness probe: 503 until startup and the background prewarm have finished."""
+    if prewarm.is_ready():
+        return {"status": "ready"}
+    return JSONResponse(status_code=503, content={"status": "starting", "pending": prewarm.pending()})
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit-rate counters for the shared overview cache."""
+    return {"overview_cache": overview_cache.stats()}
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics for this process: stage latencies, cache results, Gemini usage."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/sources/stats")
+async def sources_stats():
+    """Per-source call/failure counters, breaker state, and HTTP pool and latency metrics."""
+    return {"sources": sources.source_stats(), "http": sources.http_stats()}
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_records(
+    q: Optional[str] = None,
+    chemistry: Optional[List[str]] = Query(None),
+    form_factor: Optional[List[str]] = Query(None),
+    manufacturer: Optional[str] = None,
+    rechargeable: Optional[bool] = None,
+    voltage_min: Optional[float] = None,
+    voltage_max: Optional[float] = None,
+    capacity_min: Optional[float] = None,
+    capacity_max: Optional[float] = None,
+    wh_min: Optional[float] = None,
+    wh_max: Optional[float] = None,
+    diameter_min: Optional[float] = None,
+    diameter_max: Optional[float] = None,
+    length_min: Optional[float] = None,
+    length_max: Optional[float] = None,
+    weight_min: Optional[float] = None,
+    weight_max: Optional[float] = None,
+    temp_low: Optional[float] = None,
+    temp_high: Optional[float] = None,
+    sort: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Search enriched records. `q` is full text over MPN, title, overview and manufacturer;
+    chemistry/form_factor may repeat; numeric bounds are inclusive (capacity in mAh,
+    sizes in mm, weight in g). temp_low/temp_high (°C) keep parts rated to operate at
+    or beyond that temperature. `sort` is a numeric field such as capacity_mah, "-" for descending.
+    """
+    ranges = {
+        "voltage_v": (voltage_min, voltage_max),
+        "capacity_mah": (capacity_min, capacity_max),
+        "wh": (wh_min, wh_max),
+        "diameter_mm": (diameter_min, diameter_max),
+        "length_mm": (length_min, length_max),
+        "weight_g": (weight_min, weight_max),
+        "temp_min_c": (None, temp_low),
+        "temp_max_c": (temp_high, None),
+    }
+    try:
+        return await asyncio.to_thread(
+            search.search, q, chemistry, form_factor, manufacturer, rechargeable, ranges, sort, limit, offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    """Upload Excel or CSV file and extract MPNs and manufacturers."""
+async def upload(file: UploadFile = File(...), x_customer_id: Optional[str] = Header(None)):
+    """
+    Upload an Excel, CSV, Parquet or Feather file and extract MPNs and manufacturers.
+    A file with the same bytes as an earlier upload is not parsed again. `diff` compares
+    it with the previous upload of the same file name by the same customer (X-Customer-Id);
+    POST /uploads/{fingerprint}/enrich then enriches only the new and changed parts.
+    """
     try:
-        file_bytes = await file.read()
-        items = read_input(file_bytes, file.filename)
-        
-        mpns = [item["mpn"] for item in items]
-        manufacturers = [item["manufacturer"] for item in items if item.get("manufacturer")]
-        
-        return {
-            "mpns": mpns,
-            "manufacturers": list(set(manufacturers)) if manufacturers else []
-        }
+        scanned = await asyncio.to_thread(uploads.scan, file.file, file.filename, x_customer_id or "")
     except Exception as e:
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+    rows = scanned["rows"]
+    return {
+        "mpns": [mpn for mpn, _ in rows],
+        "manufacturers": list({manufacturer for _, manufacturer in rows if manufacturer}),
+        "fingerprint": scanned["fingerprint"],
+        "identical": scanned["identical"],
+        "previous_fingerprint": scanned["previous"],
+        "diff": scanned["diff"],
+    }
+
+
+@router.post("/uploads/{fingerprint}/enrich", response_model=EnrichResponse)
+async def enrich_upload(fingerprint: str, x_customer_id: Optional[str] = Header(None)):
+    """
+    Enrich every row of an upload. Parts already enriched for an earlier version of the
+    same file come from the stored results; only new or changed parts are enriched.
+    """
+    enriched = await uploads.enrich_upload(fingerprint, x_customer_id or "")
+    if enriched is None:
+        raise HTTPException(status_code=404, detail=f"Upload not found: {fingerprint}")
+    results, plan, reused = enriched
+    stats = EnrichStats(
+        total_items=plan.total, unique_items=plan.unique - reused, dedup_ratio=plan.dedup_ratio, reused_items=reused
+    )
+    response = EnrichResponse.model_construct(results=results, stats=stats)
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
 
 @router.post("/enrich", response_model=EnrichResponse)
 async def enrich(request: EnrichRequest):
     """Enrich battery items and return enriched records."""
-    results = []
-    
-    for item in request.items:
-        try:
-            record, warnings = enrich_item(item)
-            results.append(EnrichResult(
-                record=record,
-                status="success",
-                error=None
-            ))
-        except Exception as e:
-            logger.error(f"Error enriching {item.mpn}: {e}")
-            from app.models.battery import BatteryRecord
-            error_record = BatteryRecord(mpn=item.mpn, manufacturer=item.manufacturer)
-            results.append(EnrichResult(
-                record=error_record,
-                status="error",
-                error=str(e)
-            ))
-    
-    return EnrichResponse(results=results)
+    results, plan = await enrich_deduplicated(request.items)
+    stats = EnrichStats(total_items=plan.total, unique_items=plan.unique, dedup_ratio=plan.dedup_ratio)
+    # Results are already validated models; serialize directly instead of re-validating against response_model
+    response = EnrichResponse.model_construct(results=results, stats=stats)
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_job(request: EnrichRequest):
+    """Queue items for background enrichment and return a job id to poll."""
+    job_id = await asyncio.to_thread(jobs.create_job, request.items, "api")
+    jobs.start_job(job_id)
+    return JobSubmitResponse(job_id=job_id, status="queued", total=len(request.items))
+
+
+@router.post("/jobs/upload", response_model=JobSubmitResponse, status_code=202)
+async def submit_upload_job(file: UploadFile = File(...)):
+    """Queue every row of an uploaded Excel, CSV, Parquet or Feather file for background enrichment."""
+    try:
+        items = (EnrichItem(**row) for row in iter_input(file.file, file.filename))
+        job_id = await asyncio.to_thread(jobs.create_job, items, file.filename)
+    except Exception as e:
+        logger.error(f"Upload error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    jobs.start_job(job_id)
+    return JobSubmitResponse(job_id=job_id, status="queued", total=jobs.get_job(job_id)["total"])
+
+
+def _require_job(job_id: str) -> dict:
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str):
+    """Return progress counts for a job."""
+    return _require_job(job_id)
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsPage)
+async def job_results(job_id: str, after: int = 0, limit: int = Query(500, ge=1, le=5000)):
+    """Return results finished after sequence number `after`, in completion order."""
+    job = _require_job(job_id)
+    results = await asyncio.to_thread(jobs.get_results, job_id, after, limit)
+    next_after = results[-1]["seq"] if results else after
+    done = job["status"] in ("completed", "failed") and next_after >= job["completed"]
+    return JobResultsPage(job_id=job_id, status=job["status"], results=results, next_after=next_after, done=done)
+
+
+@router.get("/jobs/{job_id}/stream")
+async def job_stream(
+    job_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Stream results as they finish, as NDJSON lines or server-sent events."""
+    _require_job(job_id)
+    if format == "sse" and last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    async def events():
+        cursor = after
+        while True:
+            update = jobs.update_event(job_id)
+            results = await asyncio.to_thread(jobs.get_results, job_id, cursor, 500)
+            for row in results:
+                cursor = row["seq"]
+                payload = dumps_str(row)
+                yield f"id: {cursor}\nevent: result\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+            if results:
+                continue
+            job = await asyncio.to_thread(jobs.get_job, job_id)
+            if job["status"] in ("completed", "failed") and cursor >= job["completed"]:
+                if format == "sse":
+                    yield f"event: end\ndata: {dumps_str(job)}\n\n"
+                return
+            await jobs.wait_for_update(update)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
 
 
 @router.post("/export")
 async def export(request: ExportRequest):
-    """Export battery records to Jameco format (XLSX or CSV)."""
+    """Export battery records to Jameco format (XLSX, CSV, Parquet or Feather), streamed as it is written."""
     try:
-        file_bytes, content_type = export_to_jameco(request.records, request.format)
+        chunks, content_type = stream_jameco(request.records, request.format)
         extension = request.format.lower()
         filename = f"battery_export.{extension}"
         
-        return Response(
-            content=file_bytes,
+        return StreamingResponse(
+            chunks,
             media_type=content_type,
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -77,3 +246,32 @@ async def export(request: ExportRequest):
         logger.error(f"Export error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+
+@router.post("/export/cached")
+async def export_cached(request: CachedExportRequest):
+    """
+    Export records straight from the server: cached records for a list of MPNs,
+    or the results of an enrichment job in input order. MPNs not in the cache are skipped.
+    """
+    if bool(request.mpns) == bool(request.job_id):
+        raise HTTPException(status_code=400, detail="Provide either mpns or job_id")
+    if request.job_id:
+        _require_job(request.job_id)
+        dicts = (result["record"] for result in jobs.iter_ordered_results(request.job_id))
+    else:
+        # Looked up by canonical MPN, exported under the MPN as requested
+        found = iter_many(canonical_mpn(mpn) for mpn in request.mpns)
+        dicts = (dict(record, mpn=mpn.strip()) for mpn, (_, record) in zip(request.mpns, found) if record is not None)
+
+    try:
+        chunks, content_type = stream_jameco(trusted_records(dicts), request.format)
+    except Exception as e:
+        logger.error(f"Export error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"battery_export.{request.format.lower()}"
+    return StreamingResponse(
+        chunks,
+        media_type=content_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
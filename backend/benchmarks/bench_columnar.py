@@ -0,0 +1,116 @@
+"""
+Columnar (Parquet/Feather) against XLSX and CSV for upload parsing and export. Run from backend/:
+
+    python -m benchmarks.bench_columnar [--rows 100000]
+
+Upload: a BOM with MPN, manufacturer and a few unrelated columns is written in each
+format, then parsed with iter_input from memory, the way /upload reads it. Export:
+the same number of records is streamed with stream_jameco. Reports time, rows/s and
+file size; needs pyarrow.
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.models.battery import BatteryRecord
+from app.services.excel_io import iter_input
+from app.services.export_jameco import stream_jameco
+from app.services.normalize import normalize_candidates
+from app.services.sources import STUB_DATA
+
+FORMATS = ("xlsx", "csv", "parquet", "feather")
+_BOM_COLUMNS = ["Line", "MPN", "Manufacturer", "Description", "Quantity"]
+
+
+def _bom_rows(n: int) -> List[List[object]]:
+    samples = list(STUB_DATA)
+    return [
+        [i + 1, f"{samples[i % len(samples)]}-{i}", "Energizer" if i % 3 else "", "Coin cell battery, 3V", (i % 50) + 1]
+        for i in range(n)
+    ]
+
+
+def _write_bom(rows: List[List[object]], fmt: str) -> bytes:
+    output = io.BytesIO()
+    if fmt == "csv":
+        text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(_BOM_COLUMNS)
+        writer.writerows(rows)
+        text.flush()
+        text.detach()
+    elif fmt == "xlsx":
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(_BOM_COLUMNS)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(output)
+    else:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        table = pa.table({name: [row[i] for row in rows] for i, name in enumerate(_BOM_COLUMNS)})
+        if fmt == "parquet":
+            pq.write_table(table, output)
+        else:
+            feather.write_feather(table, output)
+    return output.getvalue()
+
+
+def _records(n: int) -> List[BatteryRecord]:
+    samples = list(STUB_DATA.items())
+    records = []
+    for i in range(n):
+        mpn, data = samples[i % len(samples)]
+        record = BatteryRecord(**normalize_candidates(dict(data, mpn=f"{mpn}-{i}"), f"{mpn}-{i}"))
+        record.overview = f"{record.mpn} is a battery."
+        records.append(record)
+    return records
+
+
+def _time(fn: Callable[[], int]) -> Tuple[float, int]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = _bom_rows(args.rows)
+    records = _records(args.rows)
+
+    results: Dict[str, Dict[str, Tuple[float, int]]] = {}
+    for fmt in FORMATS:
+        bom = _write_bom(rows, fmt)
+        parse_seconds, parsed = _time(lambda: sum(1 for _ in iter_input(io.BytesIO(bom), f"bom.{fmt}")))
+        assert parsed == args.rows, (fmt, parsed)
+
+        def export() -> int:
+            chunks, _ = stream_jameco(records, fmt)
+            return sum(len(chunk) for chunk in chunks)
+
+        export_seconds, size = _time(export)
+        results[fmt] = {"upload": (parse_seconds, len(bom)), "export": (export_seconds, size)}
+
+    print(f"{args.rows:,} rows")
+    print(f"{'stage':<8}{'format':<10}{'seconds':>10}{'rows/s':>12}{'size KiB':>11}{'vs xlsx':>9}")
+    for stage in ("upload", "export"):
+        baseline = results["xlsx"][stage][0]
+        for fmt in FORMATS:
+            seconds, size = results[fmt][stage]
+            print(f"{stage:<8}{fmt:<10}{seconds:>10.3f}{args.rows / seconds:>12,.0f}{size / 1024:>11,.0f}{baseline / seconds:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Bulk normalization: normalize_batch against normalize_candidates per row. Run from backend/:
+
+    python -m benchmarks.bench_normalize [--rows 100000] [--distinct 2000]
+
+Builds a supplier table with mapped headers ("Nominal Voltage", "Capacity (Ah)",
+"Rechargeable", ...) whose spec strings come from a vocabulary of --distinct values,
+then normalizes it per record and with normalize_batch, from a list of dicts and from
+an Arrow table. The outputs are compared before the timings are reported.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.services.normalize import normalize_batch, normalize_candidates
+
+
+def _vocabulary(distinct: int, rng: random.Random) -> Dict[str, List[Any]]:
+    return {
+        "Nominal Voltage": [f"{rng.choice([1.2, 1.5, 3, 3.6, 3.7, 7.4, 12])}{rng.choice(['V', ' V', 'v', ''])}" for _ in range(distinct)],
+        "Capacity (Ah)": [rng.choice([f"{rng.randint(1, 600) / 100}", f"{rng.randint(20, 6000)} mAh"]) for _ in range(distinct)],
+        "wh": [f"{rng.randint(1, 2000) / 10}Wh" for _ in range(distinct)],
+        "Rechargeable": [rng.choice(["Yes", "No", "Y", "N", "true", "rechargeable", ""]) for _ in range(distinct)],
+        "Dimensions": [f"{rng.randint(50, 340) / 10}mm x {rng.randint(20, 700) / 10}mm" for _ in range(distinct)],
+        "Operating Temperature": [f"-{rng.randint(0, 40)}°C to +{rng.randint(40, 85)}°C" for _ in range(distinct)],
+    }
+
+
+def _rows(n: int, distinct: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(distinct, rng)
+    return [
+        dict({column: rng.choice(values) for column, values in vocabulary.items()}, mpn=f"PART-{i}", chemistry="Li-ion")
+        for i in range(n)
+    ]
+
+
+def _time(fn: Callable[[], List[Dict[str, Any]]]) -> Tuple[float, List[Dict[str, Any]]]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = _rows(args.rows, args.distinct, args.seed)
+    runs = {
+        "per record": lambda: [normalize_candidates(row, row["mpn"]) for row in rows],
+        "batch (dicts)": lambda: normalize_batch(rows),
+    }
+    try:
+        import pyarrow as pa
+
+        table = pa.Table.from_pylist(rows)
+        runs["batch (arrow)"] = lambda: normalize_batch(table)
+    except ImportError:
+        print("pyarrow is not installed: the batch path parses with the scalar parsers")
+
+    # Load pyarrow's compute kernels outside the timings
+    normalize_batch(rows[:10])
+    results = {name: _time(run) for name, run in runs.items()}
+    baseline_seconds, expected = results["per record"]
+    mismatched = [name for name, (_, output) in results.items() if output != expected]
+    for name in mismatched:
+        print(f"FAIL: {name} output differs from the per-record path")
+    if mismatched:
+        return 1
+
+    print(f"{args.rows:,} rows, {args.distinct:,} distinct values per spec column")
+    print(f"{'path':<16}{'seconds':>10}{'rows/s':>12}{'speedup':>9}")
+    for name, (seconds, _) in results.items():
+        print(f"{name:<16}{seconds:>10.3f}{args.rows / seconds:>12,.0f}{baseline_seconds / seconds:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
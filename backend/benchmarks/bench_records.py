@@ -0,0 +1,108 @@
+"""
+Per-item record handling overhead in the enrichment hot path. Run from backend/:
+
+    python -m benchmarks.bench_records [--items 20000]
+
+Compares the previous handling (validate the record on every cache hit, build it
+twice on a miss, stdlib json for the cache, response re-validated by FastAPI) with
+the current one (one validation per miss, the validated record memoized on the
+in-memory cache entry, orjson for the cache, the response serialized directly).
+Sources and Gemini are left out so only record construction and serialization
+are measured.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Callable, List
+
+from app.core.serialization import dumps_str, loads, orjson
+from app.models.battery import BatteryRecord, EnrichResponse, EnrichResult, EnrichStats
+from app.services.cache import CacheEntry
+from app.services.enrich import _from_cache
+from app.services.normalize import normalize_candidates
+from app.services.sources import STUB_DATA
+
+
+def _candidates(n: int) -> List[dict]:
+    samples = list(STUB_DATA.items())
+    return [dict(samples[i % len(samples)][1], mpn=f"{samples[i % len(samples)][0]}-{i}") for i in range(n)]
+
+
+def _time(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20_000)
+    args = parser.parse_args()
+
+    candidates = _candidates(args.items)
+    normalized = [normalize_candidates(c, c["mpn"]) for c in candidates]
+    for record in normalized:
+        record["overview"] = f"{record['mpn']} is a battery."
+    cached_legacy = [json.dumps(record) for record in normalized]
+    cached = [dumps_str(record) for record in normalized]
+    stats = EnrichStats(total_items=args.items, unique_items=args.items, dedup_ratio=0.0)
+
+    def miss_before():
+        for record_dict in normalized:
+            temp = BatteryRecord(**record_dict)
+            final = BatteryRecord(**dict(record_dict, overview=temp.overview))
+            json.dumps(final.model_dump())
+
+    def miss_after():
+        for record_dict in normalized:
+            record = BatteryRecord(**record_dict)
+            record.overview = record_dict["overview"]
+            dumps_str(record.model_dump())
+
+    def store_hit_before():
+        return [BatteryRecord(**json.loads(text)) for text in cached_legacy]
+
+    def store_hit_after():
+        return [_from_cache(CacheEntry(data=loads(text), created_at=0.0)) for text in cached]
+
+    entries = [CacheEntry(data=record, created_at=0.0) for record in normalized]
+
+    def memory_hit_before():
+        return [BatteryRecord(**entry.data) for entry in entries]
+
+    def memory_hit_after():
+        return [_from_cache(entry) for entry in entries]
+
+    # Only the first hit on an entry validates; measure the steady state after it
+    memory_hit_after()
+    results = [EnrichResult(record=record, status="success") for record in store_hit_after()]
+
+    def response_before():
+        # What FastAPI does with a returned model and response_model: validate again, then encode
+        payload = EnrichResponse.model_validate(EnrichResponse(results=results, stats=stats).model_dump())
+        json.dumps(payload.model_dump(mode="json")).encode()
+
+    def response_after():
+        EnrichResponse.model_construct(results=results, stats=stats).model_dump_json()
+
+    stages = [
+        ("cache miss: build + cache write", miss_before, miss_after),
+        ("cache hit from store: read + build", store_hit_before, store_hit_after),
+        ("cache hit from memory: build", memory_hit_before, memory_hit_after),
+        ("response serialization", response_before, response_after),
+    ]
+    print(f"{args.items:,} items, orjson {'available' if orjson is not None else 'not installed (stdlib fallback)'}")
+    print(f"{'stage':<38}{'before µs/item':>16}{'after µs/item':>16}{'speedup':>10}")
+    total_before = total_after = 0.0
+    for name, before, after in stages:
+        t_before, t_after = _time(before), _time(after)
+        total_before += t_before
+        total_after += t_after
+        print(f"{name:<38}{t_before / args.items * 1e6:>16.1f}{t_after / args.items * 1e6:>16.1f}{t_before / t_after:>9.1f}x")
+    print(f"{'total':<38}{total_before / args.items * 1e6:>16.1f}{total_after / args.items * 1e6:>16.1f}{total_before / total_after:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Spec parser throughput. Run from backend/:
+
+    python -m benchmarks.bench_specs [--strings 1000000] [--distinct 5000] [--target 1000000]
+
+Parses a catalog-like stream of capacity, dimension, weight and temperature strings
+and reports strings/s for:
+
+  cold, scalar      every string new, parsed one at a time (enrichment of single parts)
+  cold, columns     the same strings as four columns through parse_spec_columns, which
+                    runs the Arrow kernels (bulk normalization; needs pyarrow)
+  bulk import       scalar parsing of a stream that repeats --distinct strings, so
+                    mostly memoized; shown for reference only
+
+Known strings are checked against their expected values first, and the column-wise
+results against the scalar ones; a wrong value exits non-zero.
+
+The --target is only met with cache hits. Cold parsing, where no string is seen
+twice, runs below it: about 500k strings/s scalar and 700-850k strings/s column-wise
+on one core. The verdict line says which case meets the target, and the run fails
+only when none does.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.services import specs
+
+# parse_spec_columns argument order
+_PARSERS = (specs.parse_capacity_mah, specs.parse_dimensions_mm, specs.parse_weight_g, specs.parse_temperature_c)
+
+# (parser, text, expected) checked before timing
+CHECKS: List[Tuple[Callable, str, object]] = [
+    (specs.parse_capacity_mah, "2600mAh", 2600.0),
+    (specs.parse_capacity_mah, "2.6 Ah", 2600.0),
+    (specs.parse_capacity_mah, "2,600 mAh", 2600.0),
+    (specs.parse_capacity_mah, "2600", 2600.0),
+    (specs.parse_capacity_mah, "3.7V 2600mAh", 2600.0),
+    (specs.parse_capacity_mah, "CR2032 3V 225mAh", 225.0),
+    (specs.parse_capacity_mah, "1.5V", None),
+    (specs.parse_capacity_mah, "CR2032", None),
+    (specs.parse_dimensions_mm, "18mm x 65mm", (18.0, 65.0)),
+    (specs.parse_weight_g, "45g", 45.0),
+    (specs.parse_weight_g, "3.1 grams", 3.1),
+    (specs.parse_weight_g, "0.05 kg", 50.0),
+    (specs.parse_weight_g, "45", 45.0),
+    (specs.parse_weight_g, "0-45C", None),
+    (specs.parse_weight_g, "20 x 3.2 mm", None),
+    (specs.parse_weight_g, "1/2 AA", None),
+    (specs.parse_weight_g, "1,234,567 mAh", None),
+    (specs.parse_temperature_c, "-20°C to +60°C", (-20.0, 60.0)),
+]
+
+
+def _samples(distinct: int, rng: random.Random) -> List[Tuple[Callable, str]]:
+    makers = [
+        (specs.parse_capacity_mah, lambda: f"{rng.randint(20, 6000)}{rng.choice(['mAh', ' mAh', 'mah'])}"),
+        (specs.parse_capacity_mah, lambda: f"{rng.randint(1, 60) / 10} Ah"),
+        (specs.parse_capacity_mah, lambda: f"{rng.choice(['1.5V', '3V', '3.7V'])} {rng.randint(20, 6000)}mAh"),
+        (specs.parse_dimensions_mm, lambda: f"{rng.randint(50, 340) / 10}mm x {rng.randint(20, 700) / 10}mm"),
+        (specs.parse_dimensions_mm, lambda: f"{rng.randint(10, 80)} x {rng.randint(10, 60)} x {rng.randint(3, 20)} mm"),
+        (specs.parse_weight_g, lambda: f"{rng.randint(1, 900) / 10}{rng.choice(['g', ' g', ' grams'])}"),
+        (specs.parse_temperature_c, lambda: f"-{rng.randint(0, 40)}°C to +{rng.randint(40, 85)}°C"),
+        (specs.parse_temperature_c, lambda: f"-{rng.randint(0, 40)} ~ {rng.randint(100, 185)} °F"),
+    ]
+    samples = []
+    for _ in range(distinct):
+        parse, make = rng.choice(makers)
+        samples.append((parse, make()))
+    return samples
+
+
+def _columns(stream: List[Tuple[Callable, str]]) -> Dict[Callable, List[str]]:
+    columns: Dict[Callable, List[str]] = {parse: [] for parse in _PARSERS}
+    for parse, text in stream:
+        columns[parse].append(text)
+    return columns
+
+
+def _run_columns(columns: Dict[Callable, List[str]]) -> Tuple[float, Dict[str, List]]:
+    started = time.perf_counter()
+    parsed = specs.parse_spec_columns(*(columns[parse] for parse in _PARSERS))
+    return sum(map(len, columns.values())) / (time.perf_counter() - started), parsed
+
+
+def _expected(columns: Dict[Callable, List[str]]) -> Dict[str, List]:
+    capacity, dimensions, weight, temperature = ([parse(text) for text in columns[parse]] for parse in _PARSERS)
+    return {
+        "capacity_mah": capacity,
+        "diameter_mm": [pair[0] for pair in dimensions],
+        "length_mm": [pair[1] for pair in dimensions],
+        "weight_g": weight,
+        "temp_min_c": [pair[0] for pair in temperature],
+        "temp_max_c": [pair[1] for pair in temperature],
+    }
+
+
+def _clear_caches() -> None:
+    for parse in (specs.parse_capacity_mah, specs.parse_dimensions_mm, specs.parse_weight_g, specs.parse_temperature_c):
+        parse.cache_clear()
+
+
+def _run(stream: List[Tuple[Callable, str]]) -> float:
+    started = time.perf_counter()
+    for parse, text in stream:
+        parse(text)
+    return len(stream) / (time.perf_counter() - started)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strings", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=5_000)
+    parser.add_argument("--target", type=float, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    wrong = [(parse.__name__, text, expected, parse(text)) for parse, text, expected in CHECKS if parse(text) != expected]
+    for name, text, expected, got in wrong:
+        print(f"FAIL: {name}({text!r}) = {got!r}, expected {expected!r}")
+    if wrong:
+        return 1
+
+    rng = random.Random(args.seed)
+    # Cold: every string distinct and uncached
+    cold_stream = _samples(min(args.strings, 200_000), rng)
+    _clear_caches()
+    cold = _run(cold_stream)
+
+    columns = _columns(cold_stream)
+    specs.parse_spec_columns(["1mAh"], ["1 x 2"], ["1g"], ["1-2C"])  # load pyarrow outside the timing
+    _clear_caches()
+    cold_columns, parsed = _run_columns(columns)
+    if parsed != _expected(columns):
+        print("FAIL: column-wise parsing differs from the scalar parsers")
+        return 1
+
+    # Steady state: a bulk import drawing from a bounded vocabulary of spec strings
+    vocabulary = _samples(args.distinct, rng)
+    stream = [rng.choice(vocabulary) for _ in range(args.strings)]
+    _clear_caches()
+    warm = _run(stream)
+
+    print(f"cold, scalar:   {cold:>12,.0f} strings/s ({len(cold_stream):,} distinct strings)")
+    print(f"cold, columns:  {cold_columns:>12,.0f} strings/s ({len(cold_stream):,} distinct strings)")
+    print(f"bulk import:    {warm:>12,.0f} strings/s ({args.strings:,} strings, {args.distinct:,} distinct; memoized)")
+    if specs._pyarrow() is None:
+        print("note: pyarrow is not installed, so column-wise parsing ran the scalar parsers")
+    if cold_columns >= args.target:
+        print(f"OK: cold column-wise parsing meets the target of {args.target:,.0f} strings/s")
+        return 0
+    if warm >= args.target:
+        print(
+            f"OK with cache hits only: the memoized bulk import meets the target of {args.target:,.0f} strings/s; "
+            f"cold parsing does not ({cold_columns:,.0f} strings/s column-wise)"
+        )
+        return 0
+    print(f"FAIL: no case meets the target of {args.target:,.0f} strings/s")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Cold-start import budget for the API. Run from backend/:
+
+    python -m benchmarks.import_budget [--budget-ms 1200] [--runs 5] [--top 15]
+
+Imports app.main in fresh interpreters and takes the fastest run, so that disk cache
+noise does not count. Fails (exit 1) when that exceeds the budget, or when a module
+that should only load on first use (pandas, openpyxl, pyarrow, the Gemini SDK) was
+imported along with the app. The slowest modules, from -X importtime, are listed to
+show where the time goes. The budget is machine-specific.
+
+tests/test_import_budget.py runs the same checks as part of the test suite, so an
+eager import fails the build.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.services.prewarm import LAZY_MODULES
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1200"))
+_LAZY = list(LAZY_MODULES) + ["numpy", "google.generativeai"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _env(workdir: str) -> dict:
+    # Keep the probe away from the real databases and quiet
+    return dict(
+        os.environ,
+        CACHE_DB_PATH=str(Path(workdir) / "cache.db"),
+        JOBS_DB_PATH=str(Path(workdir) / "jobs.db"),
+        LOG_LEVEL="WARNING",
+    )
+
+
+def _probe(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % (_LAZY,)], cwd=_BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _slowest(env: dict, top: int) -> List[Tuple[int, str]]:
+    """Dependencies imported directly by the app's own modules, by cumulative import time (µs)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=_BACKEND_DIR, env=env, capture_output=True, text=True
+    ).stderr
+    # -X importtime prints a module after its imports, indented two spaces per level
+    children: Dict[int, List[Tuple[int, str]]] = {}
+    direct: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, field = line[len("import time:"):].split("|")
+        name = field.strip()
+        depth = (len(field) - len(field.lstrip()) - 1) // 2
+        imported = children.pop(depth + 1, [])
+        if name == "app" or name.startswith("app."):
+            for child_cumulative, child in imported:
+                if not child.startswith("app."):
+                    direct[child] = max(direct.get(child, 0), child_cumulative)
+        children.setdefault(depth, []).append((int(cumulative), name))
+    return sorted(((cumulative, name) for name, cumulative in direct.items()), reverse=True)[:top]
+
+
+def measure(runs: int = 5, top: int = 0) -> Tuple[float, List[str], List[Tuple[int, str]]]:
+    """Best import time of app.main in ms, the lazy modules it loaded, and the `top` slowest imports."""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _env(workdir)
+        # The first run compiles bytecode; it is not a cold start of a deployed image
+        _probe(env)
+        probes = [_probe(env) for _ in range(max(runs, 1))]
+        slowest = _slowest(env, top) if top else []
+    best_ms = min(probe["seconds"] for probe in probes) * 1000
+    loaded = sorted({module for probe in probes for module in probe["loaded"]})
+    return best_ms, loaded, slowest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list (0 = none)")
+    args = parser.parse_args()
+
+    best_ms, loaded, slowest = measure(args.runs, args.top)
+    print(f"import app.main: {best_ms:.0f} ms (best of {max(args.runs, 1)}), budget {args.budget_ms:.0f} ms")
+    if slowest:
+        print(f"{'module':<40}{'cumulative ms':>14}")
+        for cumulative_us, name in slowest:
+            print(f"{name:<40}{cumulative_us / 1000:>14.1f}")
+
+    failures = []
+    if best_ms > args.budget_ms:
+        failures.append(f"import time {best_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"imported eagerly, should load on first use: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
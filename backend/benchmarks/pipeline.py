@@ -0,0 +1,333 @@
+"""
+End-to-end benchmark of the upload -> enrich -> export pipeline. Run from backend/:
+
+    python -m benchmarks.pipeline --rows 10000 --dup-ratio 0.3 --unknown-rate 0.05
+    python -m benchmarks.pipeline --rows 100000 --format xlsx --stages read,export
+    python -m benchmarks.pipeline --save-baseline      # record the current numbers
+    python -m benchmarks.pipeline --baseline benchmarks/baselines/pipeline.json
+
+Everything runs in-process against throwaway cache/job databases. Candidate data
+comes from a synthetic catalog source with simulated latency and overviews from the
+fake Gemini model, so no network access is needed.
+
+Stages:
+  read          read_input() on a generated CSV/XLSX BOM
+  enrich-cold   enrich_item() for every unique row, empty cache (per-item latency)
+  enrich-warm   the same items again, served from the cache
+  export        export_to_jameco() over the enriched records
+  http          POST /upload, /enrich (in batches) and /export through the ASGI app,
+                against whatever the earlier stages left in the cache
+
+For each stage it reports rows/s, p50/p99 latency where there are per-call
+timings, and the process's peak RSS so far. With --baseline it compares against
+a saved run and exits non-zero when throughput drops or p99 rises by more than
+--tolerance.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import resource
+import string
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ALL_STAGES = ("read", "enrich-cold", "enrich-warm", "export", "http")
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "pipeline.json"
+
+_CHEMISTRIES = [
+    ("Lithium", 3.0, False, "Coin Cell", "CR"),
+    ("Lithium-Ion", 3.7, True, "Cylindrical", "ICR"),
+    ("Li-Po", 3.7, True, "Pouch", "LP"),
+    ("Alkaline", 1.5, False, "AA", "LR"),
+    ("NiMH", 1.2, True, "AAA", "HR"),
+    ("Silver Oxide", 1.55, False, "Button Cell", "SR"),
+]
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="BOM rows (1k-1M)")
+    parser.add_argument("--dup-ratio", type=float, default=0.3, help="fraction of rows repeating an earlier MPN")
+    parser.add_argument("--unknown-rate", type=float, default=0.05, help="fraction of unique MPNs no source knows")
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES), help=f"comma-separated subset of {','.join(ALL_STAGES)}")
+    parser.add_argument("--gemini-latency-ms", type=float, default=20.0, help="fake Gemini latency per call")
+    parser.add_argument("--source-latency-ms", type=float, default=5.0, help="catalog source latency per lookup")
+    parser.add_argument("--spec-variety", type=int, default=200, help="distinct spec combinations in the catalog")
+    parser.add_argument("--http-batch", type=int, default=500, help="items per POST /enrich")
+    parser.add_argument("--workers", type=int, default=None, help="enrichment worker threads (ENRICH_MAX_WORKERS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write this run's results as JSON")
+    parser.add_argument("--baseline", type=Path, help=f"compare against a saved run (e.g. {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, type=Path, help="save this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def _configure_environment(args: argparse.Namespace, workdir: Path) -> None:
+    # Settings are read when app modules are imported, so this runs first
+    os.environ["CACHE_DB_PATH"] = str(workdir / "cache.db")
+    os.environ["JOBS_DB_PATH"] = str(workdir / "jobs.db")
+    os.environ["GEMINI_FAKE"] = "true"
+    os.environ["GEMINI_FAKE_LATENCY_MS"] = str(args.gemini_latency_ms)
+    os.environ.setdefault("GEMINI_RATE_PER_MINUTE", "1000000")
+    if args.workers:
+        os.environ["ENRICH_MAX_WORKERS"] = str(args.workers)
+    # Configured before app.core.logging, whose basicConfig then leaves it alone
+    logging.basicConfig(level=logging.WARNING)
+
+
+# Synthetic data
+
+def _make_catalog(count: int, variety: int, rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    specs = []
+    for _ in range(max(variety, 1)):
+        chemistry, voltage, rechargeable, form_factor, prefix = rng.choice(_CHEMISTRIES)
+        capacity = rng.choice([40, 110, 220, 500, 1000, 1200, 2000, 2500, 2600, 3000, 3500])
+        specs.append((prefix, {
+            "chemistry": chemistry,
+            "voltage_v": voltage,
+            "capacity": f"{capacity}mAh",
+            "form_factor": form_factor,
+            "dimensions": f"{rng.randint(50, 330) / 10}mm x {rng.randint(20, 700) / 10}mm",
+            "rechargeable": rechargeable,
+            "operating_temp": f"-{rng.randint(0, 40)}°C to +{rng.randint(45, 85)}°C",
+            "weight": f"{rng.randint(10, 900) / 10}g",
+        }))
+    catalog = {}
+    while len(catalog) < count:
+        prefix, spec = rng.choice(specs)
+        mpn = f"{prefix}{rng.randint(1000, 99999)}{rng.choice(['', '-BP', 'H', '-1F'])}"
+        catalog[mpn] = dict(spec, title=f"{mpn} {spec['chemistry']} Battery", source_urls=[f"https://example.com/{mpn}"])
+    return catalog
+
+
+def _make_bom(args: argparse.Namespace, rng: random.Random) -> Tuple[List[Dict[str, str]], Dict[str, Dict[str, Any]]]:
+    unique_count = max(1, round(args.rows * (1 - args.dup_ratio)))
+    unknown_count = round(unique_count * args.unknown_rate)
+    catalog = _make_catalog(unique_count - unknown_count, args.spec_variety, rng)
+    unknown = {
+        "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(rng.randint(6, 10))) + "-X"
+        for _ in range(unknown_count)
+    }
+    manufacturers = ["Panasonic", "Energizer", "Duracell", "Samsung", "Murata", ""]
+    unique = [{"mpn": mpn, "manufacturer": rng.choice(manufacturers)} for mpn in list(catalog) + sorted(unknown)]
+    rows = unique + [rng.choice(unique) for _ in range(args.rows - len(unique))]
+    rng.shuffle(rows)
+    return rows, catalog
+
+
+def _write_bom(rows: List[Dict[str, str]], fmt: str) -> bytes:
+    if fmt == "csv":
+        import csv
+
+        text = io.StringIO()
+        writer = csv.writer(text, lineterminator="\n")
+        writer.writerow(["MPN", "Manufacturer"])
+        writer.writerows((row["mpn"], row["manufacturer"]) for row in rows)
+        return text.getvalue().encode()
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("BOM")
+    sheet.append(["MPN", "Manufacturer"])
+    for row in rows:
+        sheet.append([row["mpn"], row["manufacturer"]])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+# Measurement
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(samples: Sequence[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+
+def _stage(rows: int, seconds: float, latencies: Sequence[float] = ()) -> Dict[str, Any]:
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / seconds, 1) if seconds else None,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p99_ms": _percentile(latencies, 0.99),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _timed(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+# Stages
+
+def _run_enrich(items: Sequence[Any], workers: int) -> Tuple[List[Any], Dict[str, Any]]:
+    from app.services.enrich import enrich_item
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        outcomes = list(pool.map(lambda item: _timed(enrich_item, item), items))
+        elapsed = time.perf_counter() - started
+    records = [record for (record, _), _ in outcomes]
+    return records, _stage(len(items), elapsed, [latency for _, latency in outcomes])
+
+
+def _run_http(bom: bytes, filename: str, items: Sequence[Any], batch: int, fmt: str) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    latencies = []
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        response, latency = _timed(client.post, "/upload", files={"file": (filename, bom)})
+        response.raise_for_status()
+        latencies.append(latency)
+        mpns = response.json()["mpns"]
+
+        records = []
+        for start in range(0, len(items), batch):
+            payload = {"items": [item.model_dump() for item in items[start:start + batch]]}
+            response, latency = _timed(client.post, "/enrich", json=payload)
+            response.raise_for_status()
+            latencies.append(latency)
+            records.extend(result["record"] for result in response.json()["results"])
+
+        response, latency = _timed(client.post, "/export", json={"records": records, "format": fmt})
+        response.raise_for_status()
+        latencies.append(latency)
+        elapsed = time.perf_counter() - started
+    stage = _stage(len(mpns), elapsed, latencies)
+    stage["requests"] = len(latencies)
+    return stage
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown_stages = set(stages) - set(ALL_STAGES)
+    if unknown_stages:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown_stages))}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="battery-bench-"))
+    _configure_environment(args, workdir)
+    from app.core.config import ENRICH_MAX_WORKERS
+    from app.models.battery import EnrichItem
+    from app.services import sources
+    from app.services.dedup import DedupPlan
+    from app.services.excel_io import read_input
+    from app.services.export_jameco import export_to_jameco
+
+    rng = random.Random(args.seed)
+    rows, catalog = _make_bom(args, rng)
+    sources.set_sources([sources.SimulatedSource("catalog", catalog, latency=args.source_latency_ms / 1000.0)])
+    filename = f"bom.{args.format}"
+    bom = _write_bom(rows, args.format)
+    plan = DedupPlan([EnrichItem(**row) for row in rows])
+    unique_items = plan.unique_items
+
+    results: Dict[str, Any] = {}
+    records: List[Any] = []
+    if "read" in stages:
+        parsed, elapsed = _timed(read_input, bom, filename)
+        results["read"] = _stage(len(parsed), elapsed)
+    if "enrich-cold" in stages or "export" in stages:
+        records, results["enrich-cold"] = _run_enrich(unique_items, ENRICH_MAX_WORKERS)
+    if "enrich-warm" in stages:
+        _, results["enrich-warm"] = _run_enrich(unique_items, ENRICH_MAX_WORKERS)
+    if "export" in stages:
+        exported = plan.fan_out(records)
+        _, elapsed = _timed(export_to_jameco, exported, args.format)
+        results["export"] = _stage(len(exported), elapsed)
+    if "http" in stages:
+        results["http"] = _run_http(bom, filename, [EnrichItem(**row) for row in rows], args.http_batch, args.format)
+
+    return {
+        "params": {
+            "rows": args.rows,
+            "unique": plan.unique,
+            "dup_ratio": args.dup_ratio,
+            "unknown_rate": args.unknown_rate,
+            "format": args.format,
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "source_latency_ms": args.source_latency_ms,
+            "workers": ENRICH_MAX_WORKERS,
+            "seed": args.seed,
+        },
+        "stages": {stage: results[stage] for stage in stages if stage in results},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of `current` against `baseline`: throughput down or p99 up by more than `tolerance`."""
+    problems = []
+    if current["params"] != baseline["params"]:
+        problems.append(f"parameters differ from the baseline ({baseline['params']}); numbers are not comparable")
+        return problems
+    for name, stage in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if not before:
+            continue
+        if before.get("rows_per_s") and stage["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            problems.append(f"{name}: {stage['rows_per_s']:,.0f} rows/s vs baseline {before['rows_per_s']:,.0f}")
+        if before.get("p99_ms") and stage["p99_ms"] and stage["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p99 {stage['p99_ms']}ms vs baseline {before['p99_ms']}ms")
+    return problems
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    params = report["params"]
+    print(
+        f"{params['rows']:,} rows ({params['unique']:,} unique, {params['unknown_rate']:.0%} unknown), {params['format']}, "
+        f"gemini {params['gemini_latency_ms']}ms, source {params['source_latency_ms']}ms, {params['workers']} workers"
+    )
+    print(f"{'stage':<14}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}")
+    for name, stage in report["stages"].items():
+        p50 = "-" if stage["p50_ms"] is None else f"{stage['p50_ms']:.1f}"
+        p99 = "-" if stage["p99_ms"] is None else f"{stage['p99_ms']:.1f}"
+        print(
+            f"{name:<14}{stage['rows']:>10,}{stage['seconds']:>10.2f}{stage['rows_per_s']:>12,.0f}"
+            f"{p50:>10}{p99:>10}{stage['peak_rss_mb']:>13.1f}"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    report = run(args)
+    _print_report(report)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved results to {path}")
+
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if problems:
+            print("REGRESSION:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,8 @@
 #!/bin/bash
+# Development: one auto-reloading process. Production (APP_ENV=production or
+# `./run.sh prod`): several workers, see app/serve.py
+if [ "$1" = "prod" ] || [ "$APP_ENV" = "production" ]; then
+  exec python -m app.serve
+fi
 uvicorn app.main:app --reload --port 8000
 
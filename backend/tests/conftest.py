@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported, so point the databases at a
+# throwaway directory and go offline before any test imports the app
+_DATA_DIR = tempfile.mkdtemp(prefix="battery-tests-")
+os.environ["CACHE_DB_PATH"] = os.path.join(_DATA_DIR, "cache.db")
+os.environ["JOBS_DB_PATH"] = os.path.join(_DATA_DIR, "jobs.db")
+os.environ["GEMINI_FAKE"] = "true"
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["PREWARM"] = "false"
+os.environ["LOG_LEVEL"] = "WARNING"
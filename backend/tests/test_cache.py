@@ -0,0 +1,23 @@
+import pytest
+
+from app.services import cache
+
+
+def test_failed_migration_is_retried(monkeypatch):
+    calls = []
+
+    def failing_once():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return 0
+
+    monkeypatch.setattr(cache, "_migrated", False)
+    monkeypatch.setattr(cache, "migrate_canonical_keys", failing_once)
+    with pytest.raises(RuntimeError):
+        cache._conn()
+    assert not cache._migrated
+
+    cache._conn()
+    assert cache._migrated
+    assert len(calls) == 2
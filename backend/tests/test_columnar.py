@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from app.models.battery import BatteryRecord  # noqa: E402
+from app.services import columnar  # noqa: E402
+from app.services.excel_io import _find_columns  # noqa: E402
+from app.services.export_jameco import EXPORT_COLUMNS, record_to_row  # noqa: E402
+
+RECORDS = [
+    BatteryRecord(
+        mpn="CR2032",
+        manufacturer="Panasonic",
+        chemistry="Lithium",
+        voltage_v=3.0,
+        wh=0.68,
+        rechargeable=False,
+        source_urls=["https://example.com/a", "https://example.com/b"],
+    ),
+    BatteryRecord(mpn="LR44"),
+]
+
+
+class _CountingFile(io.FileIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        self.bytes_read += n or 0
+        return n
+
+
+@pytest.mark.parametrize("kind", columnar.FORMATS)
+def test_export_keeps_the_export_columns_with_typed_values(kind):
+    output = io.BytesIO()
+    assert columnar.write_export(RECORDS, kind, output) == len(RECORDS)
+
+    output.seek(0)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(output)
+    else:
+        table = pa.ipc.open_file(output).read_all()
+    assert table.schema.names == EXPORT_COLUMNS
+    assert table.schema.field("Voltage (V)").type == pa.float64()
+    assert table.schema.field("Rechargeable").type == pa.bool_()
+
+    rows = table.to_pylist()
+    for record, row in zip(RECORDS, rows):
+        text = dict(zip(EXPORT_COLUMNS, record_to_row(record)))
+        for name in EXPORT_COLUMNS:
+            if name not in ("Voltage (V)", "Wh", "Rechargeable"):
+                assert row[name] == (text[name] or None)
+    assert (rows[0]["Voltage (V)"], rows[0]["Wh"], rows[0]["Rechargeable"]) == (3.0, 0.68, False)
+    assert (rows[1]["Voltage (V)"], rows[1]["Wh"], rows[1]["Rechargeable"]) == (None, None, None)
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["file", "stream"])
+def test_feather_upload_reads_only_the_part_columns(tmp_path, stream):
+    n = 2000
+    table = pa.table({
+        "Notes": ["x" * 500] * n,
+        "MPN": [f"CR{i}" for i in range(n)],
+        "Manufacturer": ["Panasonic"] * n,
+    })
+    path = tmp_path / "bom.arrow"
+    with pa.OSFile(str(path), "wb") as sink:
+        writer = pa.ipc.new_stream(sink, table.schema) if stream else pa.ipc.new_file(sink, table.schema)
+        with writer:
+            writer.write_table(table, max_chunksize=500)
+
+    with _CountingFile(str(path)) as fileobj:
+        batches = list(columnar.iter_column_batches(fileobj, "feather", _find_columns))
+        bytes_read = fileobj.bytes_read
+
+    assert [mpn for mpns, _ in batches for mpn in mpns] == [f"CR{i}" for i in range(n)]
+    assert {manufacturer for _, manufacturers in batches for manufacturer in manufacturers} == {"Panasonic"}
+    if not stream:
+        # The ~1 MB Notes column is skipped, not read
+        assert bytes_read < path.stat().st_size / 4
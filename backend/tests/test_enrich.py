@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def _enrich(client, mpn, manufacturer=""):
+    response = client.post("/enrich", json={"items": [{"mpn": mpn, "manufacturer": manufacturer}]})
+    assert response.status_code == 200
+    return response.json()["results"][0]["record"]
+
+
+def test_suffix_variant_inherits_specs_but_not_identity():
+    with TestClient(app) as client:
+        known = _enrich(client, "CR2032", "Panasonic")
+        variant = _enrich(client, "CR2032-BP")
+
+    assert variant["mpn"] == "CR2032-BP"
+    for field in ("chemistry", "voltage_v", "capacity", "form_factor"):
+        assert variant[field] == known[field]
+    assert not variant["manufacturer"]
+    assert not variant["title"]
+    assert not variant["datasheet_url"]
+    assert variant["source_urls"] == []
+    assert any("inherited from CR2032" in warning for warning in variant["warnings"])
+
+
+def test_suffix_variant_keeps_the_callers_manufacturer():
+    with TestClient(app) as client:
+        _enrich(client, "CR2032", "Panasonic")
+        variant = _enrich(client, "CR2032-XY", "Acme")
+
+    assert variant["manufacturer"] == "Acme"
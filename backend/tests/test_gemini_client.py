@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models.battery import BatteryRecord
+from app.services import gemini_client
+from app.services.gemini_client import FakeGeminiModel, OverviewBatcher
+
+
+@pytest.fixture
+def model():
+    def install(**kwargs):
+        fake = FakeGeminiModel(**kwargs)
+        gemini_client.set_model(fake)
+        return fake
+
+    yield install
+    gemini_client.set_model(None)
+
+
+def _record(mpn):
+    return BatteryRecord(mpn=mpn, chemistry="Lithium", voltage_v=3.0)
+
+
+def test_identical_in_flight_requests_share_one_model_call(model):
+    fake = model(latency=0.05)
+    batcher = OverviewBatcher(batch_size=20, window=0.05, concurrency=2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = list(pool.map(lambda _: batcher.submit(_record("CR2032")), range(8)))
+
+    assert len({id(future) for future in futures}) == 1
+    assert futures[0].result(timeout=5) == "CR2032 is a battery."
+    assert futures[0].generated
+    assert fake.calls == 1
+
+
+def test_distinct_requests_are_sent_as_one_batch(model):
+    fake = model()
+    batcher = OverviewBatcher(batch_size=20, window=0.1, concurrency=2)
+
+    futures = [batcher.submit(_record(mpn)) for mpn in ("CR2032", "CR2025", "LR44")]
+
+    assert [future.result(timeout=5).split()[0] for future in futures] == ["CR2032", "CR2025", "LR44"]
+    assert all(future.generated for future in futures)
+    assert fake.calls == 1
+
+
+def test_rate_limited_call_is_retried(model):
+    fake = model(fail_first=1)
+    batcher = OverviewBatcher(batch_size=1, window=0, concurrency=1)
+
+    future = batcher.submit(_record("CR2032"))
+
+    assert future.result(timeout=10) == "CR2032 is a battery."
+    # The model's answer, not the template fallback, after one rejected attempt
+    assert future.generated
+    assert fake.calls == 2
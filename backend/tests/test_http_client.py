@@ -0,0 +1,119 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(1)
+        body = f"{self.client_address[1]}".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    # "battery.test" resolves to the local server; anything else fails like an unknown host
+    seen = []
+
+    async def lookup(self, host, port):
+        seen.append(host)
+        if host != "battery.test":
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return "127.0.0.1"
+
+    monkeypatch.setattr(http_client.CachingResolver, "_lookup", lookup)
+    return seen
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_requests_reuse_one_connection_and_one_lookup(server, lookups):
+    async def run():
+        pool = http_client.HttpClientPool(http2=False)
+        try:
+            ports = [(await pool.get(f"http://battery.test:{server}/")).text for _ in range(5)]
+            return ports, pool.stats()
+        finally:
+            await pool.aclose()
+
+    ports, stats = asyncio.run(run())
+    # Every request came from the same client socket
+    assert len(set(ports)) == 1
+    assert stats["connections"] == 1
+    assert lookups == ["battery.test"]
+    assert stats["dns_cache"] == {"hits": 0, "misses": 1}
+    assert stats["hosts"]["battery.test"]["requests"] == 5
+
+
+def test_read_timeout_is_an_httpx_timeout(server, lookups):
+    async def run():
+        pool = http_client.HttpClientPool(http2=False, timeout=0.2)
+        try:
+            with pytest.raises(httpx.ReadTimeout):
+                await pool.get(f"http://battery.test:{server}/slow")
+            return pool.stats()
+        finally:
+            await pool.aclose()
+
+    assert asyncio.run(run())["hosts"]["battery.test"]["errors"] == 1
+
+
+def test_refused_connection_is_an_httpx_connect_error_and_drops_the_cached_address(lookups):
+    port = _free_port()
+
+    async def run():
+        pool = http_client.HttpClientPool(http2=False)
+        try:
+            for _ in range(2):
+                with pytest.raises(httpx.ConnectError):
+                    await pool.get(f"http://battery.test:{port}/")
+        finally:
+            await pool.aclose()
+
+    asyncio.run(run())
+    # The failed address is not reused: every attempt (two requests, each retried once
+    # by the pool) looks the host up again
+    assert lookups == ["battery.test"] * 4
+
+
+def test_unknown_host_is_an_httpx_connect_error(lookups):
+    async def run():
+        pool = http_client.HttpClientPool(http2=False)
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await pool.get("http://nowhere.test/")
+        finally:
+            await pool.aclose()
+
+    asyncio.run(run())
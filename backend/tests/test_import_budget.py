@@ -0,0 +1,7 @@
+from benchmarks.import_budget import DEFAULT_BUDGET_MS, measure
+
+
+def test_app_import_stays_lazy_and_within_budget():
+    best_ms, loaded, _ = measure(runs=3)
+    assert not loaded, f"imported eagerly, should load on first use: {', '.join(loaded)}"
+    assert best_ms <= DEFAULT_BUDGET_MS, f"import time {best_ms:.0f} ms is over the {DEFAULT_BUDGET_MS:.0f} ms budget (IMPORT_BUDGET_MS)"
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.models.battery import BatteryRecord, EnrichItem, EnrichResult
+from app.services import jobs, leases
+
+
+def _create(*mpns):
+    return jobs.create_job(EnrichItem(mpn=mpn, manufacturer="") for mpn in mpns)
+
+
+def _stream(delay):
+    async def enrich_stream(pairs):
+        for rows, item in pairs:
+            await asyncio.sleep(delay)
+            yield rows, EnrichResult(record=BatteryRecord(mpn=item.mpn), status="success")
+
+    return enrich_stream
+
+
+def test_job_records_nothing_once_its_lease_is_taken_over(monkeypatch):
+    job_id = _create("CR2032", "LR44")
+    monkeypatch.setattr(jobs, "enrich_stream", _stream(0))
+    monkeypatch.setattr(leases, "is_owner", lambda key, token: False)
+
+    asyncio.run(jobs.run_job(job_id))
+
+    assert jobs.get_job(job_id)["completed"] == 0
+    assert jobs.get_job(job_id)["status"] == "running"
+    assert not leases.is_held(f"job:{job_id}")
+
+
+def test_job_is_stopped_when_its_lease_cannot_be_renewed(monkeypatch):
+    job_id = _create("CR2032")
+    monkeypatch.setattr(jobs, "enrich_stream", _stream(60))
+    monkeypatch.setattr(jobs, "LEASE_TTL_SECONDS", 0.03)
+    monkeypatch.setattr(leases, "renew", lambda key, token: False)
+
+    async def run():
+        await asyncio.wait_for(jobs.run_job(job_id), timeout=5)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+    assert jobs.get_job(job_id)["completed"] == 0
+
+
+def test_job_completes_while_it_holds_its_lease(monkeypatch):
+    job_id = _create("CR2032", "LR44", "CR2032")
+    monkeypatch.setattr(jobs, "enrich_stream", _stream(0))
+
+    asyncio.run(jobs.run_job(job_id))
+
+    assert jobs.get_job(job_id)["status"] == "completed"
+    assert [result["result"]["record"]["mpn"] for result in jobs.get_results(job_id)] == ["CR2032", "CR2032", "LR44"]
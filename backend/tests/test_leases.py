@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+from app.services import leases
+
+
+def _enrich_once(key, workdir, start):
+    # Runs in a child process: both children race for the same key
+    result = Path(workdir) / "result"
+    runs = Path(workdir) / "runs"
+
+    def run():
+        with open(runs, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.3)
+        result.write_text("CR2032 record")
+        return "CR2032 record"
+
+    def check():
+        return result.read_text() if result.exists() else None
+
+    start.wait()
+    with open(Path(workdir) / f"got-{os.getpid()}", "w") as f:
+        f.write(leases.single_flight(key, run, check))
+
+
+def test_two_processes_do_the_work_once(tmp_path):
+    # Spawned children inherit the test environment, so they share the test lease table
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    key = f"mpn:CR2032-{os.getpid()}-{time.time()}"
+    workers = [context.Process(target=_enrich_once, args=(key, str(tmp_path), start)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    assert len((tmp_path / "runs").read_text().split()) == 1
+    answers = [path.read_text() for path in tmp_path.glob("got-*")]
+    assert answers == ["CR2032 record", "CR2032 record"]
+    assert not leases.is_held(key)
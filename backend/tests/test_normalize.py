@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from app.services import specs
+from app.services.normalize import _bool_kernel, _float_kernel, _parse_bool, _parse_float, normalize_batch, normalize_candidates
+from app.services.sources import STUB_DATA
+
+ROWS = [
+    {"mpn": "LP-1", "Capacity (Ah)": 2.6, "voltage": "3.7V"},
+    {"mpn": "LP-2", "Capacity (Ah)": "2,6", "Nominal Voltage": 3.7},
+    {"mpn": "LP-3", "Capacity (Ah)": "2600mAh", "voltage": "3.7 V"},
+    {"mpn": "LP-4", "Capacity (mAh)": 225, "Voltage (V)": "3", "Rechargeable": "Yes"},
+    {"mpn": "LP-5", "capacity": "1.2 Ah", "Capacity (Ah)": 9, "wh": "4.4Wh", "rechargeable": "no"},
+    {"mpn": "LP-6", "Capacity (Ah)": None, "voltage": "", "Rechargeable": 1},
+    {"mpn": "LP-7", "Capacity (Ah)": "n/a", "voltage": "abc", "Temp Range": "-20°C to +60°C", "Weight": "45 g"},
+    {"mpn": "LP-8", "manufacturer": "Acme", "Size": "18650", "Dimensions": "18mm x 65mm"},
+] + [dict(data, mpn=mpn) for mpn, data in STUB_DATA.items()]
+
+
+def _per_record(rows):
+    return [
+        normalize_candidates({k: v for k, v in row.items() if v is not None}, row["mpn"], row.get("manufacturer") or "")
+        for row in rows
+    ]
+
+
+def test_batch_matches_per_record():
+    assert normalize_batch(ROWS) == _per_record(ROWS)
+
+
+@pytest.mark.parametrize("kind", ["pandas", "pyarrow"])
+def test_batch_matches_per_record_for_tables(kind):
+    # Supplier tables arrive as text columns, with nulls where a row has no value
+    rows = [{k: (v if v is None else str(v)) for k, v in row.items() if k != "source_urls"} for row in ROWS]
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    columns = {key: [row.get(key) for row in rows] for key in keys}
+    if kind == "pandas":
+        table = pytest.importorskip("pandas").DataFrame(columns)
+    else:
+        table = pytest.importorskip("pyarrow").table(columns)
+    expected = _per_record([{key: row.get(key) for key in keys} for row in rows])
+    assert normalize_batch(table) == expected
+
+
+def test_capacity_in_ah_column_is_converted():
+    record = normalize_candidates({"Capacity (Ah)": 2.6, "voltage": "3.7V"}, "LP-1")
+    assert record["capacity_mah"] == 2600.0
+    assert record["wh"] == 9.62
+    assert normalize_batch([{"mpn": "LP-1", "Capacity (Ah)": 2.6, "voltage": "3.7V"}])[0] == record
+
+
+TRICKY = [
+    "3.7V", "3.7 v", " 3.7\x0b", "+3", "-1.5e2", "4.4Wh", "WVh", "inf", "1_000", "3.", ".5", "", " ", "abc",
+    "３.７", "3.7\xa0", "2600mAh", "2,600 mAh", "2,6", "2,6000 mAh", "2.6 AH", ".5ah", "3.7V 2600mAh", "2600\x1c",
+    "10mAhx", "CR2032 3V 225mAh", "２600mAh", "Yes", "y", "TRUE", "Rechargeable", "no", "1", "0", "İ",
+    3.7, 0, 1, True, None,
+]
+
+
+def _random_strings(n: int) -> list:
+    rng = random.Random(0)
+    alphabet = "0123456789.,+-eEVvWhmAa xX\t\x0b\xa0٣"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 10))) for _ in range(n)]
+
+
+@pytest.mark.parametrize(
+    "scalar, kernel",
+    [
+        (_parse_float, _float_kernel),
+        (_parse_bool, _bool_kernel),
+    ],
+)
+def test_column_kernels_match_scalar_parsers(scalar, kernel):
+    pytest.importorskip("pyarrow")
+    column = TRICKY + _random_strings(5000)
+    assert specs.map_column(column, scalar, kernel) == [scalar(value) for value in column]
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from app.services.sources import CircuitBreaker, SimulatedSource, SourceRunner
+
+
+def _runner(failure_rate):
+    runner = SourceRunner(SimulatedSource(latency=0, failure_rate=failure_rate))
+    runner.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    return runner
+
+
+def test_breaker_opens_after_consecutive_failures():
+    runner = _runner(failure_rate=1.0)
+
+    async def run():
+        return [await runner.call("CR2032", "") for _ in range(5)]
+
+    assert asyncio.run(run()) == [None] * 5
+    assert runner.breaker.state == "open"
+    # The last two calls never reached the source
+    assert runner.stats["failures"] == 3
+    assert runner.stats["rejected"] == 2
+
+
+def test_half_open_breaker_lets_one_trial_through_and_closes_on_success():
+    runner = _runner(failure_rate=1.0)
+
+    async def run():
+        for _ in range(3):
+            await runner.call("CR2032", "")
+        time.sleep(0.11)
+        assert runner.breaker.state == "half-open"
+        runner.source.failure_rate = 0.0
+        runner.source.latency = 0.02
+        # Concurrent callers: one trial call, the rest rejected until it settles
+        return await asyncio.gather(*(runner.call("CR2032", "") for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert sum(result is not None for result in results) == 1
+    assert runner.breaker.state == "closed"
+    assert runner.stats["calls"] == 4
+    assert asyncio.run(runner.call("CR2032", ""))["chemistry"]
+
+
+def test_failed_trial_reopens_the_breaker():
+    runner = _runner(failure_rate=1.0)
+
+    async def run():
+        for _ in range(3):
+            await runner.call("CR2032", "")
+        time.sleep(0.11)
+        await runner.call("CR2032", "")
+        return await runner.call("CR2032", "")
+
+    assert asyncio.run(run()) is None
+    assert runner.breaker.state == "open"
+    assert runner.stats["failures"] == 4
+    assert runner.stats["rejected"] == 1
@@ -0,0 +1,57 @@
+import random
+from functools import partial
+
+import pytest
+
+from app.services import specs
+from benchmarks.bench_specs import CHECKS
+
+TRICKY = [
+    "2600mAh", "2,600 mAh", "2,6", "2,6000 mAh", "2.6 AH", ".5ah", "3.7V 2600mAh", "2600\x1c", "10mAhx", "２600mAh",
+    "18mm x 65mm", "20 x 3.2 mm", "Ø14.5 × 50.5mm", "0.71in x 1.97in", '1" X 2"', "10 x 20 x 3 cm", "5x5", "1,5 x 2,25",
+    "45g", "3.1 grams", "0.05 KG", "1.6oz", "2 lbs", "45", "0-45C", "1/2 AA", "1,234,567 mAh", "12 gx",
+    "-30°C to +60°C", "-20 ~ 60 °C", "-4°F to 140°F", "- 5 to 10", "-\t5 to 10", "0..50", "10 TO 20 f", "1-2-3",
+    "", " ", "abc", 3.7, 0, None,
+]
+
+
+def _random_strings(n: int) -> list:
+    rng = random.Random(0)
+    alphabet = "0123456789.,+- xX*\"\t\x0bmcingkoazlbsuhACF~tT°×Øø⌀−–…—İ٣\xa0"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("parse, text, expected", CHECKS, ids=[f"{parse.__name__}:{text}" for parse, text, _ in CHECKS])
+def test_known_spec_strings(parse, text, expected):
+    assert parse(text) == expected
+
+
+@pytest.mark.parametrize(
+    "scalar, kernel, symbols",
+    [
+        (partial(specs._parse, specs.parse_capacity_mah), specs._capacity_kernel, ""),
+        (partial(specs._parse, specs.parse_weight_g), specs._weight_kernel, ""),
+        (partial(specs._parse_pair, specs.parse_dimensions_mm), specs._dimensions_kernel, specs._DIMENSIONS_SYMBOLS),
+        (partial(specs._parse_pair, specs.parse_temperature_c), specs._temperature_kernel, specs._TEMPERATURE_SYMBOLS),
+        (partial(specs.with_unit, unit="Ah"), partial(specs._unit_kernel, "Ah"), ""),
+    ],
+    ids=["capacity", "weight", "dimensions", "temperature", "unit"],
+)
+def test_column_kernels_match_scalar_parsers(scalar, kernel, symbols):
+    pytest.importorskip("pyarrow")
+    column = TRICKY + _random_strings(20000)
+    assert specs.map_column(column, scalar, kernel, symbols) == [scalar(value) for value in column]
+    # Text-only columns take a faster path
+    text = [value for value in column if value is None or type(value) is str]
+    assert specs.map_column(text, scalar, kernel, symbols) == [scalar(value) for value in text]
+
+
+def test_arrow_rounding_matches_round():
+    pa = pytest.importorskip("pyarrow")
+    rng = random.Random(0)
+    values = [0.125, 0.285, 1.005, 2.675, -0.0, -2.5, 0.05, 1e6 + 0.005, 1e15 / 3, float("inf"), None]
+    values += [rng.randint(-10**6, 10**6) / 1000 for _ in range(20000)]
+    values += [rng.uniform(-1e7, 1e7) for _ in range(20000)]
+    for digits in (1, 2):
+        expected = [None if value is None else round(value, digits) for value in values]
+        assert specs._rounded(pa, pa.array(values, pa.float64()), digits) == expected